@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# ========== 共享动画时钟：所有 GIF 标签共用一个 after()，看不见就不醒 ==========
+# 以前页眉小熊猫和每个结束弹窗各跑一条 after(100) 链，窗口收进托盘后照样每秒醒 10 次，
+# 弹窗关了链也未必断。现在每个 Tk 根窗口一个 AnimationClock：
+#   - 只为“可见”的动画排下一次唤醒（winfo_viewable：窗口 withdraw/最小化/未映射都算不可见）
+#   - 控件销毁即移出；全部不可见时不留任何 after，等所在窗口 <Map> 再恢复
+# 另有 WakeupCounter 统计经它排程的回调次数，用来看托盘待机时每分钟醒几次。
+from collections import deque
+
+from engine import monotonic
+
+# ---------- 唤醒计数 ----------
+class WakeupCounter:
+    """包一层 root.after / after_cancel，记录每次回调的时刻；wakeups_per_minute() 取最近窗口的速率"""
+    def __init__(self, root, window=600):
+        self.root = root
+        self.total = 0
+        self._times = deque(maxlen=window)
+
+    def after(self, ms, fn, *args):
+        def fire():
+            self.total += 1
+            self._times.append(monotonic())
+            fn(*args)
+        return self.root.after(ms, fire)
+
+    def cancel(self, job):
+        self.root.after_cancel(job)
+
+    def wakeups_per_minute(self, span=60.0):
+        """最近 span 秒内的唤醒次数折算到每分钟（窗口最多记 window 次，够覆盖 10 次/秒 × 1 分钟）"""
+        now = monotonic()
+        return sum(1 for t in self._times if now - t <= span) * 60.0 / span
+
+def wakeup_counter(root):
+    """每个根窗口一个共享计数器"""
+    wc = getattr(root, "_panda_wakeups", None)
+    if wc is None:
+        wc = root._panda_wakeups = WakeupCounter(root)
+    return wc
+
+# ---------- 动画 ----------
+class Animation:
+    """
+    一个标签 + 一组 PhotoImage 帧；由 AnimationClock 驱动，自己不排 after。
+    delays：每帧毫秒数列表（GIF 自带），或一个数字表示固定间隔。
+    截止时刻按 due += 本帧延时 累加（不是 now + 延时），事件循环忙时不会越播越慢；
+    落后时直接跳到“现在该显示”的那一帧，跳过的帧计入 dropped。
+    差分帧（有 view() 的帧列表）各取一个 view：同一组帧给几个标签播，各贴各的显示图。
+    """
+    SLACK = 0.002   # 提前 1–2ms 醒来也算到点，免得多醒一次
+
+    def __init__(self, clock, widget, frames, delays):
+        if hasattr(frames, "view"): frames = frames.view()
+        self.clock, self.widget, self.frames = clock, widget, frames
+        if isinstance(delays, (int, float)): delays = [delays] * len(frames)
+        self.delays = [max(1, d) / 1000.0 for d in delays]
+        self.cycle = sum(self.delays)
+        self.index = 0
+        self.due = 0.0
+        self.visible = True
+        self.shown = 0        # 实际换上的帧数
+        self.dropped = 0      # 因为落后被跳过的帧数
+
+    def show(self):
+        """把当前帧重新设到标签上（跨屏/重绘后刷新用）"""
+        if self.frames:
+            try: self.widget.configure(image=self.frames[self.index])
+            except Exception: pass
+
+    def restart(self, now):
+        """从当前帧重新起算（刚注册/从不可见恢复）：不可见期间的进度不补"""
+        self.due = now + self.delays[self.index]
+
+    def advance(self, now):
+        """到点则换帧，返回本次跳过的帧数；未到点返回 None"""
+        if now < self.due - self.SLACK: return None
+        skipped = -1
+        behind = now - self.due
+        if behind > self.cycle:                    # 落后超过一整圈：整圈跳过
+            loops = int(behind // self.cycle)
+            self.due += loops * self.cycle
+            skipped += loops * len(self.frames)
+        while now >= self.due - self.SLACK:
+            self.index = (self.index + 1) % len(self.frames)
+            self.due += self.delays[self.index]
+            skipped += 1
+        self.shown += 1
+        self.dropped += skipped
+        self.show()
+        return skipped
+
+    def stop(self): self.clock.remove(self)
+
+class AnimationClock:
+    """
+    add(widget, frames, delays) 注册动画，立即显示第 0 帧；返回 Animation，stop() 注销。
+    dropped / shown：所有动画（含已注销的）累计跳帧数与实际换帧数。
+    after/cancel 注入宿主调度（默认经 wakeup_counter 计数的 root.after），clock 默认 engine.monotonic。
+    """
+    def __init__(self, root, after=None, cancel=None, clock=None):
+        wc = wakeup_counter(root)
+        self.root, self._clock = root, clock or monotonic
+        self._after, self._cancel = after or wc.after, cancel or wc.cancel
+        self._anims = []
+        self._job, self._job_due = None, None
+        self.wakeups = 0
+        self.shown = self.dropped = 0
+
+    def add(self, widget, frames, delays):
+        anim = Animation(self, widget, frames, delays)
+        if not frames: return anim
+        self._anims.append(anim)
+        anim.show()
+        anim.restart(self._clock())
+        top = widget.winfo_toplevel()
+        # 同一个顶层窗口只绑一次：重新映射（从托盘恢复/取消最小化）时唤醒
+        if not getattr(top, "_panda_anim_bound", False):
+            top._panda_anim_bound = True
+            top.bind("<Map>", lambda e: self.wake(), add="+")
+        widget.bind("<Destroy>", lambda e, a=anim: self.remove(a), add="+")
+        self._reschedule()
+        return anim
+
+    def remove(self, anim):
+        if anim in self._anims:
+            self._anims.remove(anim)
+            self._reschedule()
+
+    def wake(self):
+        """可见性可能变化时调用（<Map> 已自动绑定）：不可见期间落下的进度不补，直接从现在起算"""
+        now = self._clock()
+        for a in self._anims:
+            if not a.visible and self._viewable(a):
+                a.visible = True; a.restart(now)
+        self._reschedule()
+
+    @property
+    def active(self):
+        return sum(1 for a in self._anims if a.visible)
+
+    def __len__(self): return len(self._anims)
+
+    def _viewable(self, anim):
+        try: return bool(anim.widget.winfo_exists() and anim.widget.winfo_viewable())
+        except Exception: return False
+
+    def _reschedule(self):
+        due = min((a.due for a in self._anims if a.visible), default=None)
+        if due == self._job_due and (self._job is not None or due is None): return
+        if self._job is not None:
+            try: self._cancel(self._job)
+            except Exception: pass
+            self._job = None
+        self._job_due = due
+        if due is not None:
+            self._job = self._after(max(1, int((due - self._clock()) * 1000 + 0.5)), self._tick)
+
+    def _tick(self):
+        self._job, self._job_due = None, None
+        self.wakeups += 1
+        now = self._clock()
+        for a in list(self._anims):
+            try: alive = a.widget.winfo_exists()
+            except Exception: alive = False
+            if not alive:
+                self._anims.remove(a); continue
+            if not self._viewable(a):
+                a.visible = False; continue       # 收起/最小化：停在当前帧，等 <Map>
+            skipped = a.advance(now)
+            if skipped is not None:
+                self.shown += 1; self.dropped += skipped
+        self._reschedule()
+
+def animation_clock(root):
+    """每个根窗口一个共享动画时钟"""
+    clk = getattr(root, "_panda_anim", None)
+    if clk is None:
+        clk = root._panda_anim = AnimationClock(root)
+    return clk
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# ========== 提醒音频：后端只探测一次，播放通道提前预热，记录出声延迟 ==========
+# 旧做法每次提醒都 platform.system() + shutil.which + 新起一个播放进程，ffplay 冷启动尤其慢。
+# 现在 prepare() 选定后端并预热（进程内播放器预加载 / 播放进程预先起好挂在 stdin 上），
+# play() 只剩“发指令”这一步；每次 play() 的耗时记进 latencies，stats() 汇总。
+# 非 WAV 源（alert.mp3）后台转码一次存进 PCM 缓存（pcmcache.py），完成后下一次 play()/stop()（UI 线程）把后端换成读 WAV。
+# 环境变量 PANDA_POMODORO_AUDIO=stub|beep|nssound|afplay|winsound|paplay|aplay|ffplay 可强制后端。
+import os, abc, shutil, platform, subprocess, threading
+from collections import deque
+
+from engine import monotonic
+from metrics import histogram, counter
+import pcmcache
+
+PLAY_SECONDS = histogram("panda_audio_play_seconds", "AudioController.play() duration (stop + hand off to backend)")
+PREPARE_SECONDS = histogram("panda_audio_prepare_seconds", "Audio backend probe and warm-up duration")
+FALLBACKS = counter("panda_audio_fallback_total", "Alerts that fell back to the terminal/system beep")
+
+# ---------- 最兜底蜂鸣 ----------
+def beep_fallback():
+    try:
+        if platform.system() == "Windows":
+            import winsound
+            winsound.Beep(1000, 300)
+        else:
+            print('\a', end='', flush=True)
+    except Exception:
+        pass
+
+# ---------- 后端 ----------
+class Backend(abc.ABC):
+    """prepare(path) 预热（失败抛异常，控制器换下一个候选）；play()/stop() 要快；close() 释放预热资源"""
+    name = "none"
+    def prepare(self, path): self.path = path
+    @abc.abstractmethod
+    def play(self): ...
+    def stop(self): pass
+    def close(self): self.stop()
+
+class StubBackend(Backend):
+    """不出声，只记录 play/stop 时刻（engine.monotonic）；无声卡机器上跑延迟测试用"""
+    name = "stub"
+    def __init__(self): self.plays, self.stops = [], []
+    def play(self): self.plays.append(monotonic())
+    def stop(self): self.stops.append(monotonic())
+
+class BeepBackend(Backend):
+    name = "beep"
+    def play(self): beep_fallback()
+
+class WinsoundBackend(Backend):
+    """winsound 进程内异步播放（只认 WAV；SND_MEMORY 不能与 SND_ASYNC 同用，所以仍按文件名播放）"""
+    name = "winsound"
+    def prepare(self, path):
+        import winsound
+        self._ws, self.path = winsound, path
+        with open(path, "rb") as f: f.read()   # 预读一遍，首响不等磁盘
+    def play(self): self._ws.PlaySound(self.path, self._ws.SND_FILENAME | self._ws.SND_ASYNC)
+    def stop(self): self._ws.PlaySound(None, 0)
+
+class NSSoundBackend(Backend):
+    """macOS 进程内 NSSound（pyobjc；装了 pystray 就有），预先把整段音频载入内存"""
+    name = "nssound"
+    def prepare(self, path):
+        from AppKit import NSSound
+        self._snd = NSSound.alloc().initWithContentsOfFile_byReference_(path, False)
+        if self._snd is None: raise RuntimeError("NSSound cannot load " + path)
+    def play(self):
+        if self._snd.isPlaying(): self._snd.stop()
+        self._snd.play()
+    def stop(self): self._snd.stop()
+
+class ProcBackend(Backend):
+    """每次提醒起一个播放进程（afplay / paplay / aplay / ffplay 按文件名播放）"""
+    def __init__(self, name, argv):
+        self.name, self.argv, self.proc = name, argv, None
+    def play(self):
+        self.proc = subprocess.Popen(self.argv + [self.path],
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    def stop(self):
+        if self.proc and self.proc.poll() is None: self.proc.terminate()
+        self.proc = None
+
+class PipeBackend(ProcBackend):
+    """
+    预先起好播放进程，让它阻塞在 stdin 上等数据；play() 把整段音频交给写线程喂进去即出声，
+    随后马上再预起下一个。进程启动、动态库加载、连音频服务器的开销都提前付掉了。
+    我们退出时 stdin 写端关闭，预起的进程读到 EOF 自行结束，不会残留。
+    """
+    CHUNK = 64 * 1024
+    def __init__(self, name, argv):
+        super().__init__(name, argv)
+        self._next, self._data = None, b""
+    def prepare(self, path):
+        self.path = path
+        self._data = pcmcache.map_file(path)   # mmap：不把整段音频复制进 Python 堆
+        if self._data is None:
+            with open(path, "rb") as f: self._data = f.read()
+        self._arm()
+    def _arm(self):
+        self._next = subprocess.Popen(self.argv, stdin=subprocess.PIPE,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    def play(self):
+        p, self._next = self._next, None
+        if p is None or p.poll() is not None: self._arm(); p, self._next = self._next, None
+        self.proc = p
+        threading.Thread(target=self._feed, args=(p, self._data), daemon=True).start()
+        self._arm()
+    @classmethod
+    def _feed(cls, p, data):
+        # 播放器按实时速度读，写完整段要阻塞到快播完，所以放在线程里；按块写，直接从映射切片
+        try:
+            mv = memoryview(data)
+            for i in range(0, len(mv), cls.CHUNK): p.stdin.write(mv[i:i + cls.CHUNK])
+            p.stdin.close()
+        except (OSError, ValueError):
+            pass
+    def close(self):
+        self.stop()
+        p, self._next = self._next, None
+        if p:
+            try: p.stdin.close()
+            except OSError: pass
+            try: p.terminate()
+            except OSError: pass
+
+# 各播放器：(可执行名, 按文件名播放的参数, 文件模式能播的扩展名, 从 stdin 读的参数, stdin 模式能播的扩展名)
+# None=任意格式。aplay 只认 WAV/VOC/AU/raw，paplay 走 libsndfile（老版本不支持 MP3），所以不是 WAV 时只剩 ffplay。
+_LINUX_PLAYERS = (
+    ("paplay", [], (".wav", ".ogg", ".oga", ".flac", ".aiff"), [], (".wav",)),
+    ("aplay",  ["-q"], (".wav", ".voc", ".au"), ["-q", "-"], (".wav",)),
+    ("ffplay", ["-nodisp", "-autoexit", "-loglevel", "quiet"], None,
+               ["-nodisp", "-autoexit", "-loglevel", "quiet", "-i", "pipe:0"], None),
+)
+
+def candidate_backends(path):
+    """按平台与音频格式给出能真正播出来的候选后端（优先级从高到低），只在 prepare 时调用"""
+    ext = os.path.splitext(path or "")[1].lower()
+    sysname = platform.system()
+    out = []
+    if sysname == "Darwin":
+        out.append(NSSoundBackend())
+        out.append(ProcBackend("afplay", ["afplay"]))
+    elif sysname == "Windows":
+        if ext in pcmcache.WAV_EXTS: out.append(WinsoundBackend())
+    elif sysname == "Linux":
+        for name, file_args, file_exts, pipe_args, pipe_exts in _LINUX_PLAYERS:
+            exe = shutil.which(name)
+            if not exe: continue
+            if pipe_args is not None and (pipe_exts is None or ext in pipe_exts):
+                out.append(PipeBackend(name, [exe] + pipe_args))
+            elif file_exts is None or ext in file_exts:
+                out.append(ProcBackend(name, [exe] + file_args))
+    return out
+
+def backend_by_name(name):
+    if name == "stub": return StubBackend()
+    if name == "beep": return BeepBackend()
+    return None
+
+# ---------- 控制器：对外接口与旧 AudioController 一致（play/stop/backend），另有 prepare/stats/close ----------
+class AudioController:
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.play_path = None        # 实际交给后端的文件：源本身或 PCM 缓存里的 WAV
+        self.impl = backend          # 选定的后端实例；None=尚未 prepare
+        self.backend = None          # 当前在响的后端名（兼容旧字段）：'nssound' | 'paplay' | ... | 'beep' | None
+        self.prepare_ms = None
+        self.latencies = deque(maxlen=64)   # 最近若干次 play() 的耗时（ms）
+        self._lock = threading.RLock()    # play()/stop() 整段持有：换后端（_swap）和 play() 互斥，不会关掉正在 play() 的后端
+        self._transcoding = False
+        self._stale = False          # 转码完成、后端还在用源文件：不在响时重建后端
+        self._pinned = False         # set_backend() 指定的后端不自动替换
+
+    def set_backend(self, backend):
+        """替换后端（测试/基准用，例如 StubBackend()）；旧后端的预热资源会释放"""
+        with self._lock:
+            if self.impl is not None:
+                try: self.impl.close()
+                except Exception: pass
+            self.impl, self._pinned = backend, backend is not None
+            if backend is not None: backend.prepare(self._resolve() or self.path)
+
+    def prepare(self):
+        """探测一次并预热；启动后空闲时调用，play() 首次也会兜底调用"""
+        with self._lock:
+            if self.impl is not None: return self.impl
+            t0 = monotonic()
+            forced = os.environ.get("PANDA_POMODORO_AUDIO", "").strip().lower()
+            named = backend_by_name(forced)
+            if named: cands = [named]
+            elif not self.path or not os.path.exists(self.path): cands = [BeepBackend()]
+            else:
+                src = self._resolve()
+                cands = [b for b in candidate_backends(src) if not forced or b.name == forced]
+                cands.append(BeepBackend())
+            for b in cands:
+                try:
+                    b.prepare(self.play_path or self.path); self.impl = b; break
+                except Exception:
+                    continue
+            self.prepare_ms = (monotonic() - t0) * 1e3
+            PREPARE_SECONDS.observe(self.prepare_ms / 1e3)
+            return self.impl
+
+    def _resolve(self):
+        """选播放文件：已有 WAV 缓存直接用；没有就先用源文件，同时后台转码，好了再换后端"""
+        if self.play_path is None and self.path and os.path.exists(self.path):
+            self.play_path = pcmcache.cached_wav(self.path)
+            if self.play_path is None:
+                self.play_path = self.path
+                if not self._transcoding and pcmcache.find_converter():
+                    self._transcoding = True
+                    threading.Thread(target=self._transcode_worker, daemon=True).start()
+        return self.play_path
+
+    def transcode(self):
+        """同步确保 WAV 缓存（基准/预构建用）；返回 WAV 路径或 None"""
+        return pcmcache.transcode_to_wav(self.path) if self.path and os.path.exists(self.path) else None
+
+    def _transcode_worker(self):
+        """后台线程只转码、记下新文件并标记 stale；换后端（关旧的、重新 prepare）留给 UI 线程下次 play()/stop() 时做，
+        后端对象只在一个线程上碰（macOS 的 NSSound 也必须在主线程）"""
+        wav = self.transcode()
+        with self._lock:
+            self._transcoding = False
+            if not wav or wav == self.play_path: return
+            self.play_path, self._stale = wav, self.impl is not None and not self._pinned
+
+    def _swap(self):
+        """只在 stop() 里、已停声之后调用（持锁）：关旧后端、按新文件重新 prepare"""
+        with self._lock:
+            if not self._stale: return
+            self._stale = False
+            old, self.impl = self.impl, None
+            try: old.close()
+            except Exception: pass
+            self.prepare()
+
+    def play(self):
+        t0 = monotonic()
+        with self._lock:
+            self.stop()
+            impl = self.prepare()
+            try:
+                impl.play(); self.backend = impl.name
+            except Exception:
+                self.backend = 'beep'; beep_fallback(); FALLBACKS.inc()
+        dt = monotonic() - t0
+        self.latencies.append(dt * 1e3)
+        PLAY_SECONDS.observe(dt)
+
+    def stop(self):
+        with self._lock:
+            try:
+                if self.backend and self.impl: self.impl.stop()
+            except Exception:
+                pass
+            finally:
+                self.backend = None
+            if self._stale: self._swap()
+
+    def close(self):
+        """退出前调用：结束预热的播放进程"""
+        try:
+            if self.impl: self.impl.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        return {"backend": self.impl.name if self.impl else None, "prepare_ms": self.prepare_ms,
+                "plays": len(lat), "latency_ms_p50": lat[len(lat) // 2] if lat else None,
+                "latency_ms_max": lat[-1] if lat else None}
@@ -0,0 +1,1237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ========== 性能基准（需要图形环境的用例可在 Linux 上用 xvfb-run 运行） ==========
+#   python bench.py decode            # GIF 多帧解码：逐 index 重解析 vs 单遍切帧
+#   python bench.py scale             # 缩放：整数 zoom→subsample vs 两趟最近邻（耗时 + 峰值内存）
+#   python bench.py tray              # 托盘图标：整张解码原图 vs 预缩放缓存（冷/热），角标每 tick 开销（需 Pillow）
+#   python bench.py audio             # 提醒出声延迟：各可用后端（预热）vs 旧的每次探测+起进程；--backend stub 无声卡可跑
+#   python bench.py drift             # 倒计时结束误差：注入事件循环延迟/卡顿/休眠（无需图形环境）
+#   python bench.py anim              # GIF 播放节奏：固定 after 链 vs 按帧延时 + 跳帧（模拟事件循环，无需图形环境）
+#   python bench.py timers            # 命名计时器数量 vs 每次操作 CPU、挂起的 after() 数（无需图形环境）
+#   python bench.py history           # 会话历史：百万级记录的追加吞吐、流式全量汇总、按时间区间查询、读取峰值内存（无需图形环境）
+#   python bench.py stats             # 统计面板：从头折叠 vs 快照续读，面板查询耗时与历史长度无关（无需图形环境）
+#   python bench.py framestore        # 1000 帧 GIF 放大播放两圈：帧内存/RSS 不超过预算（--raw 无需图形环境）
+#   python bench.py delta             # 差分帧：关键帧 + 脏矩形补丁 vs 整帧列表的内存与每帧切换耗时
+#   python bench.py metrics           # 指标埋点：每次 observe 的开销（开/关）、真实循环上 tick 迟到分布、Prometheus 文本（无需图形环境）
+#   python bench.py dispatch          # 托盘动作压测：每秒数千次跨线程 post，检查不丢、不乱序、排队延迟；--tk 用真实 Tk
+#   python bench.py control           # 控制套接字：命令往返延迟、并发客户端吞吐、大量订阅者扇出（无需图形环境）
+#   python bench.py instance          # 第二次启动：转发参数给已在跑的实例并退出的耗时，确认不导入 tkinter（无需图形环境）
+#   python bench.py tui               # 终端前端：差分重画 vs 整行重画的字节数，pty 中运行/暂停时的 CPU（无需图形环境）
+#   python bench.py startup           # 冷启动到主窗口首次绘制：延后初始化 vs 一次性初始化
+#   python bench.py startup --cmd dist/PandaPomodoro   # 同上，测 PyInstaller 打包产物
+#   python bench.py popup             # 无人值守连续到点：结束弹窗复用、合并计数，窗口/after/动画/音频不随次数增长
+#   python bench.py suite -o a.json   # 固定指标集，结果写 JSON；音频播放器全部打桩
+#   python bench.py compare a.json b.json
+# 无显示器的 Linux：xvfb-run -a python bench.py suite -o results.json
+import os, sys, json, random, argparse, platform, subprocess, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ---------- 合成测试 GIF：双色调色板 + 纯色块，LZW 用“每 2 像素一个 clear”的免压缩写法 ----------
+def _lzw_solid(count, color):
+    bits, nbits, out = 0, 0, bytearray()
+    def emit(code):
+        nonlocal bits, nbits
+        bits |= code << nbits; nbits += 3
+        while nbits >= 8:
+            out.append(bits & 0xFF); bits >>= 8; nbits -= 8
+    for i in range(count):
+        if i % 2 == 0: emit(4)  # clear：码宽保持 3 位
+        emit(color)
+    emit(5)                     # end
+    if nbits: out.append(bits & 0xFF)
+    blocks = bytearray([2])     # LZW 最小码长
+    for p in range(0, len(out), 255):
+        chunk = out[p:p + 255]
+        blocks.append(len(chunk)); blocks += chunk
+    blocks.append(0)
+    return bytes(blocks)
+
+def _gif_head(w, h):
+    le = lambda v: v.to_bytes(2, "little")
+    return bytearray(b"GIF89a" + le(w) + le(h) + bytes([0x81, 0, 0])
+                     + bytes([0, 0, 0, 255, 255, 255, 255, 0, 0, 0, 255, 0]))   # 4 色全局调色板
+
+def _gif_frame(x, y, w, h, color, disposal=0):
+    le = lambda v: v.to_bytes(2, "little")
+    return (bytes([0x21, 0xF9, 4, disposal << 2, 10, 0, 0, 0])                # 100ms
+            + bytes([0x2C]) + le(x) + le(y) + le(w) + le(h) + bytes([0]) + _lzw_solid(w * h, color))
+
+def make_gif(n_frames, w=64, h=64):
+    """n 帧、w×h，每帧整幅换一种颜色"""
+    gif = _gif_head(w, h)
+    for i in range(n_frames): gif += _gif_frame(0, 0, w, h, i % 4)
+    return bytes(gif + b";")
+
+def make_sprite_gif(n_frames, w=200, h=200, block=16):
+    """第 0 帧整幅底色，之后每帧只在移动的位置画一个 block×block 小块（保留处置：相邻帧只差这一块）"""
+    gif = _gif_head(w, h) + _gif_frame(0, 0, w, h, 1, disposal=1)
+    for i in range(1, n_frames):
+        x = (i * block) % (w - block); y = (i * block // (w - block) * block) % (h - block)
+        gif += _gif_frame(x, y, block, block, 2 + i % 2, disposal=1)
+    return bytes(gif + b";")
+
+# ---------- 用例：多帧解码 ----------
+def bench_decode(counts):
+    import tkinter as tk
+    from gifframes import parse_gif, gif_photo_frames
+
+    root = tk.Tk(); root.withdraw()
+
+    def per_index(data):
+        frames, i = [], 0
+        while True:
+            try: frames.append(tk.PhotoImage(data=data, format=f"gif -index {i}", master=root))
+            except Exception: return frames
+            i += 1
+
+    def single_pass(data):
+        return list(gif_photo_frames(parse_gif(data), root))
+
+    print(f"{'frames':>7} {'per-index ms':>13} {'single-pass ms':>15} {'parse-only ms':>14}")
+    for n in counts:
+        data = make_gif(n)
+        t0 = time.perf_counter(); a = per_index(data)
+        t1 = time.perf_counter(); b = single_pass(data)
+        t2 = time.perf_counter(); parse_gif(data)
+        t3 = time.perf_counter()
+        assert len(a) == len(b) == n, (len(a), len(b), n)
+        print(f"{n:>7} {(t1 - t0) * 1e3:>13.1f} {(t2 - t1) * 1e3:>15.1f} {(t3 - t2) * 1e3:>14.2f}")
+    root.destroy()
+
+# ---------- 用例：缩放（每种方法单独起子进程，峰值 RSS 互不干扰） ----------
+SCALE_METHODS = ("int-subsample", "zoom-subsample", "two-pass")
+
+def _scale_child(method, path, target):
+    import resource
+    from fractions import Fraction
+    import tkinter as tk
+    from gifframes import read_gif, gif_photo_frames, pick_scaled_size, scale_photo, scale_runs
+
+    root = tk.Tk(); root.withdraw()
+    info = read_gif(path)
+    raw = list(gif_photo_frames(info, root))
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if method == "int-subsample":     # 旧默认：只能取整数因子，尺寸偏离目标
+        s = max(1, int(round(max(info.width, info.height) / float(target))))
+        out = [img.subsample(s) for img in raw]
+    elif method == "zoom-subsample":  # 旧写法逼近任意比例：先 zoom(z) 再 subsample(s)
+        r = Fraction(target, max(info.width, info.height)).limit_denominator(8)
+        out = [img.zoom(r.numerator).subsample(r.denominator) for img in raw]
+    else:
+        w, h = pick_scaled_size(info.width, info.height, None, target)
+        out, plans = [], {}             # 映射按源尺寸各算一次（未合成的原始帧尺寸可能不同）
+        for img in raw:
+            sz = (img.width(), img.height())
+            if sz not in plans: plans[sz] = scale_runs(*sz, w, h)
+            out.append(scale_photo(img, w, h, root, plans[sz]))
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{method},{len(out)},{out[0].width()}x{out[0].height()},{elapsed * 1e3:.1f},{(peak - base) / 1024:.1f}")
+
+def bench_scale(path, target):
+    print(f"{'method':>15} {'frames':>6} {'size':>10} {'ms':>8} {'peak +MB':>9}")
+    for m in SCALE_METHODS:
+        r = subprocess.run([sys.executable, os.path.abspath(__file__), "scale", "--child", m,
+                            "--gif", path, "--target", str(target)], capture_output=True, text=True)
+        if r.returncode != 0:
+            print(f"{m:>15} failed: {r.stderr.strip().splitlines()[-1:]}"); continue
+        name, n, size, ms, mb = r.stdout.strip().split(",")
+        print(f"{name:>15} {n:>6} {size:>10} {ms:>8} {mb:>9}")
+
+# ---------- 用例：托盘图标（每种方式一个子进程，峰值内存互不干扰） ----------
+TRAY_METHODS = ("full-decode", "cache-cold", "cache-warm")
+
+def _tray_child(method, path):
+    import resource, shutil
+    from PIL import Image
+    import trayicon
+    if method == "cache-cold": shutil.rmtree(trayicon.user_cache_dir("tray"), ignore_errors=True)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if method == "full-decode":   # 旧写法
+        img = Image.open(path).convert("RGBA")
+    else:
+        img = trayicon.load_tray_icon(path)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{method},{img.size[0]}x{img.size[1]},{elapsed * 1e3:.1f},{(peak - base) / 1024:.1f}")
+
+def bench_tray(path):
+    os.environ.setdefault("PANDA_POMODORO_CACHE", tempfile.mkdtemp(prefix="pp-bench-"))
+    print(f"{'method':>12} {'size':>10} {'ms':>8} {'peak +MB':>9}")
+    for m in TRAY_METHODS:
+        r = subprocess.run([sys.executable, os.path.abspath(__file__), "tray", "--child", m, "--png", path],
+                           capture_output=True, text=True)
+        if r.returncode != 0:
+            print(f"{m:>12} failed: {r.stderr.strip().splitlines()[-1:]}"); continue
+        name, size, ms, mb = r.stdout.strip().split(",")
+        print(f"{name:>12} {size:>10} {ms:>8} {mb:>9}")
+    # 角标：一次 25 分钟番茄按秒 tick，分钟数变化才 render；对比每 tick 从头画
+    sys.path.insert(0, HERE)
+    from trayicon import load_tray_icon, TrayBadge
+    base = load_tray_icon(path)
+    ticks = list(range(25 * 60, 0, -1))
+    t0 = time.perf_counter()
+    for sec in ticks: TrayBadge(base, max_cached=0).render(-(-sec // 60))
+    t1 = time.perf_counter()
+    badge, last, renders = TrayBadge(base), None, 0
+    for sec in ticks:
+        mins = -(-sec // 60)
+        if mins != last: badge.render(mins); last = mins; renders += 1
+    t2 = time.perf_counter()
+    for sec in ticks: badge.render(-(-sec // 60))   # 第二个番茄：全部命中结果缓存
+    t3 = time.perf_counter()
+    print(f"badge over {len(ticks)} ticks: redraw-every-tick {(t1 - t0) * 1e3:.1f} ms, "
+          f"glyph cache {(t2 - t1) * 1e3:.1f} ms ({renders} renders), warm {(t3 - t2) * 1e3:.1f} ms")
+
+# ---------- 用例：提醒出声延迟 ----------
+# 延迟 = play() 调用到“播放指令已交给播放器”为止（进程已起/数据已开始喂/进程内播放器已开始）；
+# 声卡真正出声还要加上播放器自身缓冲，这部分需要外部回录才能测，不在此列。
+def _legacy_play(path):
+    """旧 AudioController.play 的路径：每次 platform.system() + shutil.which + 新起进程"""
+    import shutil
+    sysname = platform.system()
+    if sysname == "Darwin": argv = ["afplay"]
+    elif sysname == "Linux":
+        player = shutil.which("paplay") or shutil.which("aplay") or shutil.which("ffplay")
+        if not player: return None
+        argv = [player, "-nodisp", "-autoexit"] if os.path.basename(player) == "ffplay" else [player]
+    else: return None
+    return subprocess.Popen(argv + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def bench_audio(path, backend, runs, gap):
+    sys.path.insert(0, HERE)
+    from audio import AudioController, StubBackend, candidate_backends
+    if backend != "stub":
+        # PCM 缓存：冷（转码）/ 热（命中）各一次；之后的后端都按 WAV 预热
+        os.environ.setdefault("PANDA_POMODORO_CACHE", tempfile.mkdtemp(prefix="pp-bench-"))
+        for label in ("cold", "warm"):
+            t0 = time.perf_counter(); wav = AudioController(path).transcode()
+            print(f"pcm cache {label}: {(time.perf_counter() - t0) * 1e3:.1f} ms -> {wav or 'no converter'}")
+        path = wav or path
+    print(f"{'backend':>10} {'prepare ms':>10} {'p50 ms':>8} {'p90 ms':>8} {'max ms':>8}")
+    backends = [StubBackend()] if backend == "stub" else \
+               [b for b in candidate_backends(path) if backend in ("auto", b.name)]
+    for b in backends:
+        ctl = AudioController(path)
+        t0 = time.perf_counter()
+        try: ctl.set_backend(b)
+        except Exception as e:
+            print(f"{b.name:>10} unavailable: {e}"); continue
+        prep = (time.perf_counter() - t0) * 1e3
+        for _ in range(runs):
+            ctl.play(); time.sleep(gap); ctl.stop()
+        lat = list(ctl.latencies); ctl.close()
+        print(f"{b.name:>10} {prep:>10.1f} {_pct(lat, 0.5):>8.2f} {_pct(lat, 0.9):>8.2f} {max(lat):>8.2f}")
+    if backend == "auto":
+        lat = []
+        for _ in range(runs):
+            t0 = time.perf_counter(); p = _legacy_play(path); lat.append((time.perf_counter() - t0) * 1e3)
+            if p is None: break
+            time.sleep(gap); p.terminate(); p.wait()
+        if lat and p is not None:
+            print(f"{'legacy':>10} {'-':>10} {_pct(lat, 0.5):>8.2f} {_pct(lat, 0.9):>8.2f} {max(lat):>8.2f}")
+
+# ---------- 用例：倒计时漂移（模拟时钟 + 模拟事件循环，可注入延迟） ----------
+def _sim_loop(lag, suspend_at=None, suspend_for=0.0):
+    """
+    engine.SimScheduler + 一次模拟休眠：虚拟时间到 suspend_at 时整体前跳 suspend_for 秒
+    （休眠期间不跑回调，醒来后补跑）。
+    """
+    from engine import SimScheduler
+
+    class SimLoop(SimScheduler):
+        def step(self):
+            nonlocal suspend_at
+            if suspend_at is not None and self._q and self._q[0][0] >= suspend_at:
+                self.now = max(self.now, suspend_at) + suspend_for; suspend_at = None
+            return super().step()
+    return SimLoop(lag)
+
+def _legacy_countdown(loop, seconds, done):
+    """旧实现：after(1000) + remaining -= 1"""
+    state = {"remaining": seconds}
+    def tick():
+        state["remaining"] -= 1
+        if state["remaining"] <= 0: done(); return
+        loop.after(1000, tick)
+    loop.after(1000, tick)
+
+def bench_drift(seconds, runs, mean_lag_ms, stall_p, stall_ms, suspend):
+    from engine import Countdown
+
+    def scenario(seed, impl):
+        rng = random.Random(seed)
+        def lag():
+            d = rng.expovariate(1000.0 / mean_lag_ms) if mean_lag_ms > 0 else 0.0
+            if rng.random() < stall_p: d += stall_ms / 1000.0
+            return d
+        loop = _sim_loop(lag, suspend_at=seconds / 2 if suspend else None, suspend_for=suspend)
+        end = []
+        if impl == "legacy":
+            _legacy_countdown(loop, seconds, lambda: end.append(loop.now))
+        else:
+            cd = Countdown(loop.after, loop.cancel, on_done=lambda: end.append(loop.now), clock=loop.clock)
+            cd.set(seconds); cd.start()
+        loop.run(lambda: end)
+        return end[0] - seconds   # 正数 = 晚结束
+
+    print(f"{seconds}s countdown, {runs} runs, lag~exp({mean_lag_ms}ms), "
+          f"stall {stall_p:.0%}x{stall_ms}ms, suspend {suspend}s")
+    print(f"{'impl':>10} {'mean err s':>11} {'p50 s':>8} {'p99 s':>8} {'max s':>8}")
+    for impl in ("legacy", "deadline"):
+        errs = sorted(scenario(i, impl) for i in range(runs))
+        pct = lambda q: errs[min(len(errs) - 1, int(q * len(errs)))]
+        print(f"{impl:>10} {sum(errs) / len(errs):>11.3f} {pct(0.5):>8.3f} {pct(0.99):>8.3f} {errs[-1]:>8.3f}")
+
+# ---------- 用例：GIF 播放节奏（假控件 + 模拟事件循环） ----------
+class _FakeLabel:
+    def __init__(self): self.changes = 0
+    def configure(self, image=None): self.changes += 1
+    def winfo_exists(self): return True
+    def winfo_viewable(self): return True
+    def winfo_toplevel(self): return self
+    def bind(self, *a, **k): pass
+
+def bench_anim(seconds, mean_lag_ms, stall_p, stall_ms, path):
+    from animclock import AnimationClock
+    from gifframes import read_gif, frame_delay
+    if path:
+        delays = [frame_delay(f.delay_ms) for f in read_gif(path).frames]
+    else:
+        delays = [100, 40, 40, 40, 300, 100]
+    cycle = sum(delays) / 1000.0
+    rng = random.Random(7)
+    def lag():
+        d = rng.expovariate(1000.0 / mean_lag_ms) if mean_lag_ms > 0 else 0.0
+        if rng.random() < stall_p: d += stall_ms / 1000.0
+        return d
+
+    def legacy():
+        """旧写法：显示一帧后 after(100) 再排下一帧，忽略 GIF 延时，迟到累计"""
+        loop, lbl, state = _sim_loop(lag), _FakeLabel(), {"i": 0}
+        def animate():
+            lbl.configure(image=state["i"]); state["i"] += 1
+            loop.after(100, animate)
+        animate(); loop.advance(seconds)
+        return state["i"] / len(delays), lbl.changes, 0
+
+    def clock():
+        loop, lbl = _sim_loop(lag), _FakeLabel()
+        clk = AnimationClock(lbl, loop.after, loop.cancel, clock=loop.clock)
+        a = clk.add(lbl, list(range(len(delays))), delays)
+        loop.advance(seconds)
+        return (a.shown + a.dropped) / len(delays), a.shown, a.dropped
+
+    print(f"{len(delays)} frames, cycle {cycle * 1e3:.0f} ms, {seconds}s, lag~exp({mean_lag_ms}ms), "
+          f"stall {stall_p:.0%}x{stall_ms}ms; expected {seconds / cycle:.1f} loops")
+    print(f"{'impl':>8} {'loops':>8} {'speed':>7} {'shown':>7} {'dropped':>8}")
+    for name, fn in (("legacy", legacy), ("clock", clock)):
+        loops, shown, dropped = fn()
+        print(f"{name:>8} {loops:>8.1f} {loops * cycle / seconds:>7.2f} {shown:>7} {dropped:>8}")
+
+# ---------- 用例：大量命名计时器 ----------
+def _counting_loop():
+    """SimScheduler + 统计同时挂起的 after() 数"""
+    from engine import SimScheduler
+
+    class CountingLoop(SimScheduler):
+        pending = max_pending = 0
+
+        def after(self, ms, fn, *args):
+            self.pending += 1; self.max_pending = max(self.max_pending, self.pending)
+            def call():
+                self.pending -= 1; fn(*args)
+            return super().after(ms, call)
+
+        def cancel(self, job):
+            if job not in self._dead: self.pending -= 1
+            super().cancel(job)
+    return CountingLoop()
+
+def bench_timers(counts):
+    from engine import TimerRegistry
+
+    print(f"{'timers':>7} {'add us':>7} {'pause us':>9} {'cancel us':>10} {'fire us':>8} {'wakeups':>8} {'max after()':>12}")
+    for n in counts:
+        rng = random.Random(n)
+        loop = _counting_loop()
+        fired = []
+        reg = TimerRegistry(loop.after, loop.cancel, on_fire=fired.extend, clock=loop.clock)
+        t0 = time.process_time()
+        ids = [reg.add(f"t{i}", rng.uniform(1, 3600)) for i in range(n)]
+        t1 = time.process_time()
+        some = rng.sample(ids, n // 4)
+        for tid in some: reg.pause(tid)
+        t2 = time.process_time()
+        for tid in some: reg.cancel(tid)
+        t3 = time.process_time()
+        loop.run(lambda: len(reg) == 0)
+        t4 = time.process_time()
+        k = max(1, len(some))
+        print(f"{n:>7} {(t1 - t0) / n * 1e6:>7.2f} {(t2 - t1) / k * 1e6:>9.2f} {(t3 - t2) / k * 1e6:>10.2f} "
+              f"{(t4 - t3) / max(1, len(fired)) * 1e6:>8.2f} {reg.wakeups:>8} {loop.max_pending:>12}")
+
+# ---------- 用例：会话历史日志 ----------
+def _synthetic_sessions(n, seed=0):
+    """按“每天若干轮 25/5/15 番茄”从过去往现在排出 n 条记录，约 12 条/天（n=1e6 ≈ 230 年，够覆盖任何真实用户）"""
+    from history import Session
+    rng = random.Random(seed)
+    t = time.time() - n / 12.0 * 86400
+    cycle = 0
+    for i in range(n):
+        if i % 12 == 0: t += 86400 - 12 * 1200; cycle = 0       # 新的一天
+        phase = "Focus" if i % 2 == 0 else ("LongBreak" if cycle % 4 == 0 else "ShortBreak")
+        planned = {"Focus": 1500.0, "ShortBreak": 300.0, "LongBreak": 900.0}[phase]
+        skipped = rng.random() < 0.1
+        actual = planned * rng.random() if skipped else planned
+        if phase == "Focus": cycle += 1
+        yield Session(phase, planned, actual, skipped, cycle, t, t + actual)
+        t += actual + rng.uniform(5, 120)
+
+def bench_history(records, path):
+    import itertools, tracemalloc
+    from history import HistoryLog, iter_sessions, summarize, count_sessions, decode, RECORD_SIZE
+    tmpdir = None
+    if not path:
+        tmpdir = tempfile.mkdtemp(prefix="panda-hist-")
+        path = os.path.join(tmpdir, "history.bin")
+    try:
+        if os.path.exists(path): os.unlink(path)
+        sessions = _synthetic_sessions(records)
+        t0 = time.perf_counter()
+        with HistoryLog(path, flush_every=4096) as log:
+            for s in sessions: log.append(s)
+        t_write = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        # 应用内的真实写法：每条 append 后立即 flush + fsync
+        t0 = time.perf_counter()
+        with HistoryLog(path + ".sync", flush_every=1) as log:
+            for s in _synthetic_sessions(200, seed=1): log.append(s)
+        t_sync = (time.perf_counter() - t0) / 200
+        os.unlink(path + ".sync")
+        t0 = time.perf_counter()
+        agg = summarize(iter_sessions(path))
+        t_read = time.perf_counter() - t0
+        with open(path, "rb") as f:
+            f.seek(-RECORD_SIZE, os.SEEK_END); last = decode(f.read()).ended_at
+        t0 = time.perf_counter()
+        week = summarize(iter_sessions(path, since=last - 7 * 86400))
+        t_week = time.perf_counter() - t0
+        tracemalloc.start()   # 峰值与文件大小无关，取前 20 万条即可（tracemalloc 下很慢）
+        summarize(itertools.islice(iter_sessions(path), 200000))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        n = count_sessions(path)
+        print(f"{n} records x {RECORD_SIZE} B = {size / 1e6:.1f} MB")
+        print(f"append (buffered 4096, one fsync per flush): {records / t_write / 1e3:>8.0f} k rec/s")
+        print(f"append (flush+fsync per record, as in app):  {t_sync * 1e3:>8.2f} ms/rec")
+        print(f"stream full summarize:                       {n / t_read / 1e3:>8.0f} k rec/s  ({t_read:.2f} s)")
+        print(f"last 7 days (bisect + stream):               {t_week * 1e3:>8.2f} ms  "
+              f"({sum(a['count'] for a in week.values())} records)")
+        print(f"read peak python memory:                     {peak / 1024:>8.0f} KiB")
+        for phase, a in sorted(agg.items()):
+            print(f"  {phase:>10}: {a['count']:>8} sessions, {a['skipped'] / a['count']:.0%} skipped, "
+                  f"{a['actual'] / 3600:.0f} h")
+    finally:
+        if tmpdir:
+            import shutil
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+# ---------- 用例：统计面板 ----------
+def bench_stats(records):
+    from history import HistoryLog, iter_sessions, summarize
+    from stats import load_stats, save_stats, day_of, week_of
+    import datetime
+    tmpdir = tempfile.mkdtemp(prefix="panda-stats-")
+    hp, sp = os.path.join(tmpdir, "history.bin"), os.path.join(tmpdir, "stats.bin")
+    try:
+        with HistoryLog(hp, flush_every=4096) as log:
+            for s in _synthetic_sessions(records): log.append(s)
+        now = time.time()
+        t0 = time.perf_counter(); st, n = load_stats(hp, sp); t_cold = time.perf_counter() - t0
+        save_stats(st, sp)
+        t0 = time.perf_counter(); st, _ = load_stats(hp, sp); t_warm = time.perf_counter() - t0
+        with HistoryLog(hp) as log:
+            for s in _synthetic_sessions(100, seed=2): log.append(s._replace(ended_at=now, started_at=now - s.actual))
+        t0 = time.perf_counter(); st, tail = load_stats(hp, sp); t_tail = time.perf_counter() - t0
+        k = 10000
+        t0 = time.perf_counter()
+        for _ in range(k): st.dashboard(now)
+        t_dash = (time.perf_counter() - t0) / k
+        monday = datetime.date.fromordinal(week_of(day_of(now)) * 7 + 1)
+        t0 = time.perf_counter()
+        summarize(iter_sessions(hp, since=time.mktime(monday.timetuple())))
+        t_since = time.perf_counter() - t0
+        t0 = time.perf_counter(); summarize(iter_sessions(hp)); t_scan = time.perf_counter() - t0
+        print(f"{n} records, {len(st.days)} days, snapshot {os.path.getsize(sp) / 1024:.0f} KiB")
+        print(f"open: rebuild from history (first run)   {t_cold * 1e3:>9.1f} ms")
+        print(f"open: snapshot, nothing new              {t_warm * 1e3:>9.1f} ms")
+        print(f"open: snapshot + {tail} new records        {t_tail * 1e3:>9.1f} ms")
+        print(f"dashboard() query                        {t_dash * 1e6:>9.1f} us")
+        print(f"naive: rescan this week (bisect)         {t_since * 1e3:>9.1f} ms")
+        print(f"naive: rescan whole history              {t_scan * 1e3:>9.1f} ms")
+    finally:
+        import shutil
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+# ---------- 用例：有内存上限的帧存储 ----------
+def bench_framestore(frames, src_px, max_size, budget_mb, raw):
+    """
+    1000 帧 GIF 放大到 max_size 播两圈，每 50 帧采样 RSS：驻留帧内存与 RSS 增长都不超过预算才算通过。
+    --raw：不需要图形环境，用 bytearray 当帧（只验证窗口/淘汰/预读的记账与 RSS）。
+    """
+    import gc
+    from engine import SelectLoop
+    from framestore import FrameStore
+    budget = int(budget_mb * 1024 * 1024)
+    if raw:
+        loop = SelectLoop()
+        fb = max_size * max_size * 4
+        store = FrameStore(frames, fb, lambda i: bytearray(fb), budget=budget, after=loop.after, cancel=loop.cancel)
+        pump = lambda: (loop.after(2, loop.stop), loop.run())
+        full_mb = frames * fb / 2**20
+    else:
+        import tkinter as tk
+        from gifframes import load_bounded_frames, clear_frame_cache
+        root = tk.Tk(); root.withdraw()
+        tmp = tempfile.mkdtemp(prefix="panda-fs-")
+        os.environ["PANDA_POMODORO_CACHE"] = tmp
+        path = os.path.join(tmp, "long.gif")
+        with open(path, "wb") as f: f.write(make_gif(frames, src_px, src_px))
+        clear_frame_cache()
+        t0 = time.perf_counter()
+        store = load_bounded_frames(path, root, None, max_size, budget)
+        print(f"load_bounded_frames: {(time.perf_counter() - t0) * 1e3:.1f} ms -> {type(store).__name__} "
+              f"{store.width}x{store.height}, {len(store)} frames")
+        def pump():
+            root.update()
+            end = time.perf_counter() + 0.002
+            while time.perf_counter() < end: root.update()
+        full_mb = frames * store.width * store.height * 4 / 2**20
+    gc.collect()
+    base = _rss_mb()
+    peak, t0, worst = base, time.perf_counter(), 0.0
+    for lap in range(2):                   # 第一圈（首次运行时边播边建磁盘条目）+ 第二圈（全部从磁盘按需载入）
+        for i in range(len(store)):
+            t1 = time.perf_counter()
+            store[i]
+            worst = max(worst, time.perf_counter() - t1)
+            pump()
+            if i % 50 == 0: peak = max(peak, _rss_mb())
+        print(f"lap {lap + 1}: {store.stats()}")
+    gc.collect()
+    grew = peak - base
+    print(f"{len(store)} frames, budget {budget_mb:g} MiB (capacity {store.capacity} frames); "
+          f"all frames resident would be {full_mb:.0f} MiB")
+    print(f"RSS base {base:.1f} MiB, peak {peak:.1f} MiB (+{grew:.1f}); resident frames peak "
+          f"{store.peak * store.frame_bytes / 2**20:.1f} MiB; slowest frame fetch {worst * 1e3:.1f} ms "
+          f"({(time.perf_counter() - t0):.1f} s total)")
+    ok = store.peak * store.frame_bytes <= budget and grew <= budget_mb
+    print(f"PASS: resident frames and RSS growth stayed within {budget_mb:g} MiB" if ok
+          else f"FAIL: exceeded the {budget_mb:g} MiB budget")
+    if not raw:
+        store.close(); root.destroy()
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ok
+
+# ---------- 用例：差分帧（关键帧 + 脏矩形补丁）vs 整帧列表 ----------
+def _delta_tk(name, data, max_size, laps):
+    """真实 Tk：load_gif_frames 冷解码 → 空闲写盘后压缩；对比同一组帧整幅 configure 与贴补丁的每帧耗时"""
+    import tkinter as tk
+    import gifframes
+    root = tk.Tk(); root.withdraw()
+    gifframes.clear_frame_cache()
+    fs = gifframes.load_gif_frames(data, root, None, max_size)
+    root.update()                            # 空闲：写磁盘条目 → 算脏矩形 → 压缩
+    w, h = fs.width, fs.height
+    full = gifframes._disk_load(gifframes._disk_key(data, (w, h)), root).frames
+    delta = fs.frames
+    print(f"{name}: {len(full)} frames {w}x{h}; compacted={delta.compacted} "
+          f"(full {len(full) * w * h * 4 / 2**20:.2f} MiB -> {delta.nbytes() / 2**20:.2f} MiB)")
+    top = tk.Toplevel(root); lbl = tk.Label(top); lbl.pack(); root.update()
+    for label, seq in (("full frames", full), ("delta blit", delta)):
+        per = []
+        for _ in range(laps):
+            for i in range(len(seq)):
+                t0 = time.perf_counter()
+                lbl.configure(image=seq[i]); root.update_idletasks()
+                per.append((time.perf_counter() - t0) * 1e3)
+        print(f"  {label:<12} per frame p50 {_pct(per, 0.5):.3f} ms  p99 {_pct(per, 0.99):.3f} ms")
+    if delta.compacted: print(f"  patches blitted {delta.blits}, keyframe resets {delta.resets}")
+    root.destroy()
+
+def bench_delta(path, max_size, sprite_frames, laps):
+    """
+    自带 GIF 与合成的小块动画 GIF（相邻帧只差一个 16×16 块）：差分帧省下的帧内存、每帧贴补丁 vs 整幅切换的耗时。
+    帧走运行时同一条路径（load_gif_frames：parse_gif + iter_composited → 磁盘 PNG → rects_from_pngs），需要图形环境。
+    """
+    with open(path, "rb") as f: cases = [(os.path.basename(path), f.read())]
+    cases.append((f"sprite {sprite_frames}f", make_sprite_gif(sprite_frames, 400, 400)))
+    tmp = tempfile.mkdtemp(prefix="panda-delta-")
+    os.environ["PANDA_POMODORO_CACHE"] = tmp
+    try:
+        for name, data in cases: _delta_tk(name, data, max_size, laps)
+    finally:
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# ---------- 用例：指标埋点开销 ----------
+def bench_metrics(n, seconds):
+    import metrics
+    from engine import SelectLoop, TimerEngine
+    h = metrics.Histogram("bench_seconds", "bench")
+    null = metrics._NULL
+    def per_call(fn):
+        t0 = time.perf_counter()
+        for _ in range(n): fn(0.003)
+        return (time.perf_counter() - t0) / n * 1e9
+    def timed(h):
+        def run(_):
+            with h.time(): pass
+        return run
+    base = per_call(lambda v: None)
+    print(f"per call over {n}: empty call {base:.0f} ns; observe {per_call(h.observe) - base:.0f} ns; "
+          f"disabled observe {per_call(null.observe) - base:.0f} ns; "
+          f"with time() {per_call(timed(h)) - base:.0f} ns (disabled {per_call(timed(null)) - base:.0f} ns)")
+    # 真实事件循环上跑一段倒计时：每秒一次 tick 的迟到分布
+    loop = SelectLoop()
+    e = TimerEngine(loop.after, loop.cancel)
+    e.start(seconds)
+    loop.run()
+    from engine import TICK_LATENESS
+    if not metrics.ENABLED:
+        print(f"metrics disabled (PANDA_POMODORO_METRICS=0): done late by {e.countdown.overdue * 1e3:.2f} ms, "
+              f"exposition {len(metrics.render())} bytes")
+        return
+    print(f"{seconds:g}s countdown on SelectLoop: {TICK_LATENESS.count} ticks, lateness "
+          f"p50 <= {TICK_LATENESS.quantile(0.5) * 1e3:g} ms, p99 <= {TICK_LATENESS.quantile(0.99) * 1e3:g} ms; "
+          f"done late by {e.countdown.overdue * 1e3:.2f} ms")
+    text = metrics.render()
+    print(f"exposition: {len(text.splitlines())} lines, {len(text)} bytes, "
+          f"render {min(_time_call(metrics.render) for _ in range(20)) * 1e6:.0f} us")
+    print("\n".join(l for l in text.splitlines() if l.startswith("panda_tick_lateness_seconds")))
+
+def _time_call(fn):
+    t0 = time.perf_counter(); fn(); return time.perf_counter() - t0
+
+# ---------- 用例：托盘动作压测（跨线程调度器） ----------
+def bench_dispatch(rate, seconds, producers, busy_ms, use_tk):
+    import threading
+    from engine import TimerEngine, SelectLoop
+    from dispatch import Dispatcher, tk_dispatcher
+    from control import engine_commands
+    # 宿主：默认 SelectLoop（无需图形环境）；--tk 时挂真实 Tk 根窗口（createfilehandler / 虚拟事件）
+    if use_tk:
+        import tkinter
+        root = tkinter.Tk(); root.withdraw()
+        d, after, cancel, run, quit_ = tk_dispatcher(root), root.after, root.after_cancel, root.mainloop, root.quit
+    else:
+        host = SelectLoop(); d = Dispatcher()
+        host.add_reader(d.fileno(), d.drain)
+        after, cancel, run, quit_ = host.after, host.cancel, host.run, host.stop
+    engine = TimerEngine(after, cancel)
+    toggle = engine_commands(engine)["toggle"]
+    seen = [[] for _ in range(producers)]
+    toggles = [0]
+    def on_action(p, k):                       # 宿主线程：记录到达顺序；每 4 个动作里一个是“暂停/继续”
+        seen[p].append(k)
+        if k % 4 == 0: toggle(); toggles[0] += 1
+    def busy():                                # 模拟 Tk 重绘等长任务，看排队延迟受多大影响
+        end = time.perf_counter() + busy_ms / 1000.0
+        while time.perf_counter() < end: pass
+        after(16, busy)
+    if busy_ms > 0: after(16, busy)
+    engine.start(3600); engine.pause()
+    per = int(rate * seconds / producers)
+    def producer(p):                           # 扮演 pystray 线程：按节奏 post，每 1ms 一批
+        t0, k = time.perf_counter(), 0
+        while k < per:
+            due = min(per, int((time.perf_counter() - t0) * rate / producers) + 1)
+            while k < due: d.post(on_action, p, k); k += 1
+            time.sleep(0.001)
+    ts = [threading.Thread(target=producer, args=(p,), daemon=True) for p in range(producers)]
+    def stop_when_done():
+        for t in ts: t.join()
+        d.post(quit_)
+    for t in ts: t.start()
+    threading.Thread(target=stop_when_done, daemon=True).start()
+    t0, c0 = time.perf_counter(), time.process_time()
+    run()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    st = d.latency_stats()
+    lost = producers * per - sum(len(s) for s in seen)
+    in_order = all(s == list(range(len(s))) for s in seen)
+    print(f"{producers} producer thread(s), {producers * per} actions in {wall:.2f} s "
+          f"({producers * per / wall:.0f}/s), host {'Tk' if use_tk else 'SelectLoop'}, busy {busy_ms} ms/16 ms")
+    print(f"lost {lost}, per-producer order kept: {in_order}, "
+          f"pause/resume state consistent: {engine.running == bool(toggles[0] % 2)} ({toggles[0]} toggles)")
+    print(f"queue latency: mean {st['mean_ms']:.3f} ms  p50 {st['p50_ms']:.3f} ms  p99 {st['p99_ms']:.3f} ms  "
+          f"max {st['max_ms']:.2f} ms; max depth {st['depth_max']}")
+    print(f"host wakeups {st['wakeups']} for {st['executed']} commands "
+          f"({st['executed'] / max(1, st['wakeups']):.1f}/wakeup); process CPU {cpu:.2f} s")
+    if use_tk: root.destroy()
+    d.close()
+
+# ---------- 用例：控制套接字负载 ----------
+def bench_control(calls, clients, subscribers, rate, seconds):
+    import threading, selectors
+    from engine import TimerEngine, SelectLoop
+    from dispatch import Dispatcher
+    from control import ControlClient, engine_commands
+    from controlserver import ControlServer
+    tmpdir = tempfile.mkdtemp(prefix="panda-ctl-")
+    os.environ["XDG_RUNTIME_DIR"] = tmpdir
+    # 宿主线程用 SelectLoop 代替 Tk：Dispatcher 的管道读端挂在 add_reader 上，与 createfilehandler 同一机制
+    d, host = Dispatcher(), SelectLoop()
+    host.add_reader(d.fileno(), d.drain)
+    engine = TimerEngine(host.after, host.cancel)
+    server = ControlServer(engine_commands(engine), d.call)
+    for ev in ("tick", "phase", "state"):
+        engine.on(ev, lambda *_, ev=ev: server.publish(ev, engine.snapshot()))
+    ht = threading.Thread(target=host.run, daemon=True); ht.start()
+    try:
+        print("endpoint:", server.start())
+        # 1) 单连接顺序往返
+        with ControlClient() as c:
+            c.call("start", seconds=3600)
+            for _ in range(200): c.call("status")                   # 预热
+            lat = []
+            for i in range(calls):
+                t0 = time.perf_counter()
+                c.call("toggle" if i % 2 else "status")
+                lat.append((time.perf_counter() - t0) * 1e6)
+        print(f"round-trip ({calls} calls, 1 client): p50 {_pct(lat, 0.5):.0f} us  p99 {_pct(lat, 0.99):.0f} us  "
+              f"max {max(lat):.0f} us")
+        # 2) 多客户端并发
+        per, lats = max(1, calls // clients), []
+        def worker():
+            out = []
+            with ControlClient() as c:
+                for _ in range(per):
+                    t0 = time.perf_counter(); c.call("status"); out.append((time.perf_counter() - t0) * 1e6)
+            lats.extend(out)
+        ts = [threading.Thread(target=worker) for _ in range(clients)]
+        t0 = time.perf_counter()
+        for t in ts: t.start()
+        for t in ts: t.join()
+        wall = time.perf_counter() - t0
+        print(f"concurrent ({clients} clients x {per}): {len(lats) / wall:.0f} calls/s  "
+              f"p50 {_pct(lats, 0.5):.0f} us  p99 {_pct(lats, 0.99):.0f} us  (host wakeups {d.wakeups}, "
+              f"commands {d.executed})")
+        # 3) 订阅者扇出：宿主线程以 rate Hz 发布，统计每个订阅者收到的条数与延迟
+        socks = []
+        for _ in range(subscribers):
+            c = ControlClient(); c.call("subscribe"); c.sock.setblocking(False); socks.append(c)
+        while server.subscribers < subscribers: time.sleep(0.01)
+        sel = selectors.DefaultSelector()
+        got, delay, stop = [0] * subscribers, [], threading.Event()
+        for i, c in enumerate(socks): sel.register(c.sock, selectors.EVENT_READ, [i, b""])
+        def reader():
+            while not stop.is_set():
+                for key, _ in sel.select(0.1):
+                    i, buf = key.data
+                    try: chunk = key.fileobj.recv(65536)
+                    except BlockingIOError: continue
+                    if not chunk: sel.unregister(key.fileobj); continue
+                    *lines, key.data[1] = (buf + chunk).split(b"\n")
+                    now = time.perf_counter()
+                    for line in lines:
+                        ev = json.loads(line)
+                        if ev.get("event") == "bench":
+                            got[i] += 1; delay.append((now - ev["t"]) * 1e3)
+        rt = threading.Thread(target=reader, daemon=True); rt.start()
+        n_pub = int(rate * seconds)
+        for k in range(n_pub):
+            d.post(lambda k=k: server.publish("bench", {"n": k, "t": time.perf_counter()}))
+            time.sleep(1.0 / rate)
+        time.sleep(0.5); stop.set(); rt.join()
+        print(f"subscribers: {subscribers} x {n_pub} events @ {rate:.0f} Hz -> delivered/sub "
+              f"min {min(got)} p50 {_pct(got, 0.5)}; latency p50 {_pct(delay, 0.5):.2f} ms "
+              f"p99 {_pct(delay, 0.99):.2f} ms (slow readers see only the newest event)")
+        for c in socks: c.close()
+    finally:
+        server.stop(); d.post(host.stop); ht.join(1.0); d.close()
+        import shutil
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+# ---------- 用例：单实例转发 ----------
+def bench_instance(runs, app):
+    import threading
+    from engine import TimerEngine, SelectLoop
+    from dispatch import Dispatcher
+    from control import engine_commands
+    from controlserver import ControlServer
+    from instance import InstanceLock
+    tmpdir = tempfile.mkdtemp(prefix="panda-inst-")
+    env = dict(os.environ, XDG_RUNTIME_DIR=tmpdir)
+    os.environ["XDG_RUNTIME_DIR"] = tmpdir
+    # 本进程扮演主实例：持锁 + 控制套接字 + 无界面宿主循环
+    lock = InstanceLock()
+    assert lock.acquire()
+    d, host = Dispatcher(), SelectLoop()
+    host.add_reader(d.fileno(), d.drain)
+    engine = TimerEngine(host.after, host.cancel)
+    cmds = engine_commands(engine); shows = []
+    cmds["show"] = lambda: shows.append(1) or engine.snapshot()
+    server = ControlServer(cmds, d.call)
+    ht = threading.Thread(target=host.run, daemon=True); ht.start()
+    script = os.path.join(HERE, f"{app}.py")
+    def spawn(*argv):
+        t0 = time.perf_counter()
+        r = subprocess.run([sys.executable, *argv], cwd=HERE, env=env, capture_output=True, text=True)
+        return (time.perf_counter() - t0) * 1e3, r
+    try:
+        server.start()
+        base = [spawn("-c", "pass")[0] for _ in range(runs)]
+        fwd = []
+        for i in range(runs):
+            ms, r = spawn(script, "--start", f"{i + 1}m", "--pause")
+            if r.returncode != 0: raise RuntimeError(r.stderr.strip())
+            fwd.append(ms)
+        ok = engine.phase == "Manual" and not engine.running and engine.remaining == runs * 60
+        show_ms, _ = spawn(script)
+        _, r = spawn("-X", "importtime", script, "--toggle")
+        mods = {line.rsplit("|", 1)[-1].strip() for line in r.stderr.splitlines() if "|" in line}
+        heavy = sorted(m for m in mods if m.split(".")[0] in ("tkinter", "_tkinter", "PIL", "asyncio", "pystray"))
+        print(f"interpreter baseline (python -c pass): p50 {_pct(base, 0.5):.1f} ms")
+        print(f"{app}.py --start Nm --pause (forwarded): p50 {_pct(fwd, 0.5):.1f} ms  p90 {_pct(fwd, 0.9):.1f} ms  "
+              f"max {max(fwd):.1f} ms; state applied: {ok}")
+        print(f"{app}.py (no args -> show):            {show_ms:.1f} ms; show received: {len(shows)}")
+        print(f"heavy modules imported on the forward path: {heavy or 'none'}")
+    finally:
+        server.stop(); d.post(host.stop); ht.join(1.0); d.close(); lock.release()
+        import shutil
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def _proc_cpu_s(pid):
+    """Linux：/proc/<pid>/stat 的 utime+stime（秒）；其他系统返回 None"""
+    try:
+        with open(f"/proc/{pid}/stat") as f: fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def bench_tui(minutes, seconds):
+    import io, pty, select
+    from engine import SimScheduler
+    from tui import TerminalApp
+    # 1) 虚拟时间跑完整个倒计时：差分重画 vs 每秒整行重画的输出字节
+    sim, out = SimScheduler(), io.StringIO()
+    app = TerminalApp(sim, out=out, bell=lambda: None)
+    full = [0]
+    def count_full(*_):
+        full[0] += len(("\r" + app._line()[0].rstrip() + "\x1b[K").encode("utf-8"))
+    app.engine.on("tick", count_full)
+    app.commands["start"](seconds=minutes * 60)
+    app.show()
+    sim.run()
+    r = app.renderer
+    print(f"{minutes} min countdown, {r.renders} renders: diff redraw {r.bytes_out} B "
+          f"({r.bytes_out / max(1, r.renders):.1f} B/update) vs full-line redraw {full[0]} B "
+          f"({full[0] / max(1, r.renders):.1f} B/update)")
+    # 2) 真实终端（pty）里的子进程：运行中 / 暂停时的 CPU 与输出字节
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(HERE)
+        os.execv(sys.executable, [sys.executable, "tui.py", "--start", f"{minutes}m"])
+    got = [0]
+    def pump(t):
+        end = time.monotonic() + t
+        while (left := end - time.monotonic()) > 0:
+            if select.select([fd], [], [], left)[0]:
+                try: got[0] += len(os.read(fd, 65536))
+                except OSError: return
+    try:
+        pump(1.0)                                  # 启动、首帧
+        res = {}
+        for label, key in (("running", None), ("paused", b" ")):
+            if key: os.write(fd, key); pump(0.3)
+            b0, c0 = got[0], _proc_cpu_s(pid)
+            pump(seconds)
+            c1 = _proc_cpu_s(pid)
+            cpu = None if c0 is None or c1 is None else (c1 - c0) / seconds * 60e3
+            res[label] = ((got[0] - b0) / seconds, cpu)
+        os.write(fd, b"q"); pump(0.3)
+    finally:
+        _, status, ru = os.wait4(pid, 0)
+        os.close(fd)
+    for label, (bps, cpu) in res.items():
+        cpu_s = "n/a" if cpu is None else f"{cpu:.1f} ms CPU/min"
+        print(f"pty {label:<8}: {bps:6.1f} B/s written, {cpu_s}")
+    print(f"child exit {os.waitstatus_to_exitcode(status)}; total CPU {(ru.ru_utime + ru.ru_stime) * 1e3:.0f} ms "
+          f"(incl. interpreter start); terminal restored by child on 'q'")
+
+# ---------- 固定指标集 ----------
+# 启动：import 耗时在子进程里单独测；首帧由应用自身的 PANDA_POMODORO_STARTUP_PROBE 钩子报告
+_IMPORT_SNIPPET = r"""
+import sys, time
+t0 = time.perf_counter()
+__import__(sys.argv[1])
+print((time.perf_counter() - t0) * 1e3)
+"""
+
+def _first_paint(cmd, env, timeout=60.0):
+    """启动 cmd 直到它往 stderr 打印 first-paint 行；返回 (外部墙钟 ms, 进程内 ms)。打包产物也适用"""
+    env = dict(env, PANDA_POMODORO_STARTUP_PROBE="1", PANDA_POMODORO_SINGLE_INSTANCE="0", PANDA_POMODORO_CONTROL="0")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    last = "no first-paint line"
+    try:
+        for line in proc.stderr:
+            if line.startswith("first-paint "):
+                wall = (time.perf_counter() - t0) * 1e3
+                proc.wait(timeout=timeout)
+                return wall, float(line.split()[1])
+            if line.strip(): last = line.strip()
+        proc.wait(timeout=timeout)
+        raise RuntimeError(last)
+    finally:
+        if proc.poll() is None: proc.kill()
+
+def _startup_modes(cmd, repeats, env):
+    """延后初始化（默认）与 PANDA_POMODORO_EAGER=1 交替运行，减少缓存/调度对两组的偏差"""
+    res = {"lazy": [], "eager": []}
+    lazy_env = {k: v for k, v in env.items() if k != "PANDA_POMODORO_EAGER"}
+    for _ in range(repeats):
+        res["lazy"].append(_first_paint(cmd, lazy_env))
+        res["eager"].append(_first_paint(cmd, dict(env, PANDA_POMODORO_EAGER="1")))
+    return res
+
+def bench_startup(cmd, repeats):
+    cmd = cmd or [sys.executable, os.path.join(HERE, "timer.py")]
+    print("cmd:", " ".join(cmd))
+    res = _startup_modes(cmd, repeats, dict(os.environ))
+    print(f"{'mode':>6} {'wall p50':>9} {'wall p90':>9} {'in-proc p50':>12}   (ms, spawn → first paint)")
+    for mode, runs in res.items():
+        print(f"{mode:>6} {_pct([r[0] for r in runs], 0.5):>9.1f} {_pct([r[0] for r in runs], 0.9):>9.1f} "
+              f"{_pct([r[1] for r in runs], 0.5):>12.1f}")
+
+def _pct(values, q):
+    v = sorted(values)
+    return v[min(len(v) - 1, int(q * len(v)))] if v else None
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def _stub_audio(mod):
+    """应用模块的音频换成 StubBackend（基准机器不需要声卡/播放器），返回它以便读出声时刻"""
+    from audio import StubBackend
+    stub = StubBackend()
+    mod.AUDIO.set_backend(stub)
+    return stub
+
+def _startup(app_mod, repeats, env):
+    imports = []
+    for _ in range(repeats):
+        r = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET, app_mod], cwd=HERE, env=env,
+                           capture_output=True, text=True)
+        if r.returncode != 0: raise RuntimeError(r.stderr.strip().splitlines()[-1])
+        imports.append(float(r.stdout.strip().splitlines()[-1]))
+    modes = _startup_modes([sys.executable, os.path.join(HERE, app_mod + ".py")], repeats, env)
+    return {"import_ms_p50": _pct(imports, 0.5),
+            "first_paint_ms_p50": _pct([r[0] for r in modes["lazy"]], 0.5),
+            "first_paint_eager_ms_p50": _pct([r[0] for r in modes["eager"]], 0.5)}
+
+def _close_popups(root):
+    import tkinter as tk
+    for w in list(root.winfo_children()):
+        if isinstance(w, tk.Toplevel):
+            w.event_generate("<Escape>"); root.update()
+            if w.winfo_exists() and w.winfo_ismapped(): w.destroy()   # 结束弹窗关闭只隐藏（复用），没关掉的才销毁
+
+def _popup_latency(mod, root, app, runs, stub):
+    """计时到 0（截止时刻）→ 弹窗首次映射到屏幕（<Map>）的间隔；以及 → 发出播放指令的间隔"""
+    cd, mapped, out, alert = app.engine.countdown, [], [], []
+    root.bind_class("Toplevel", "<Map>", lambda e: mapped.append(cd.clock()), add="+")
+    for _ in range(runs):
+        mapped.clear()
+        app.engine.reset()
+        app.engine.start(1)
+        deadline = cd.clock() + cd.remaining
+        while not mapped:
+            root.update(); time.sleep(0.001)
+        out.append((mapped[0] - deadline) * 1e3)
+        alert.append((stub.plays[-1] - deadline) * 1e3)
+        _close_popups(root)
+    return {"popup_first_ms": out[0], "popup_warm_ms_p50": _pct(out[1:] or out, 0.5),
+            "alert_ms_p50": _pct(alert, 0.5)}
+
+def _idle_wakeups(root, app, seconds):
+    """待机唤醒：窗口可见（页眉动画在跑）vs 收进托盘（withdraw），均不计时；折算为每分钟"""
+    def measure():
+        n0, t0 = app.wake.total, time.perf_counter()
+        while time.perf_counter() - t0 < seconds:
+            root.update(); time.sleep(0.01)
+        return (app.wake.total - n0) * 60.0 / seconds
+    t0 = time.perf_counter()
+    while app._deferred and time.perf_counter() - t0 < 5:   # 等页眉 GIF 等延后项做完
+        root.update(); time.sleep(0.01)
+    root.deiconify(); root.update()
+    shown = measure()
+    root.withdraw(); root.update()
+    hidden = measure()
+    root.deiconify(); root.update()
+    return {"idle_wakeups_per_min_shown": shown, "idle_wakeups_per_min_tray": hidden}
+
+def _decode(mod, root):
+    import gifframes
+    with open(mod.END_GIF_PATH, "rb") as f: data = f.read()
+    res = {}
+    for name in ("cold", "disk"):       # 第一次：空磁盘缓存；第二次：命中磁盘缓存
+        gifframes.clear_frame_cache()
+        t0 = time.perf_counter()
+        fs = gifframes.load_gif_frames(data, root, mod.SCALE, mod.MAX_GIF_SIZE)
+        res[f"decode_{name}_ms"] = (time.perf_counter() - t0) * 1e3
+        root.update()                   # 让空闲时的磁盘写入完成
+    res["frames"] = len(fs)
+    return res
+
+def _tick_jitter(root, seconds):
+    """真实 Tk 事件循环下，每个秒边界到 on_tick 实际执行的迟到量"""
+    from engine import Countdown
+    late, done = [], []
+    cd = Countdown(root.after, root.after_cancel, on_done=lambda: done.append(1))
+    def on_tick(secs):
+        if cd.running: late.append((cd.clock() - (deadline - secs)) * 1e3)
+    cd.on_tick = on_tick
+    cd.set(seconds); deadline = cd.clock() + seconds; cd.start()
+    while not done: root.update(); time.sleep(0.0005)
+    return {"tick_late_ms_p50": _pct(late, 0.5), "tick_late_ms_p90": _pct(late, 0.9),
+            "tick_late_ms_p99": _pct(late, 0.99), "tick_late_ms_max": max(late) if late else None}
+
+def _view_ticks(root, app, seconds):
+    """应用自己的倒计时跑 seconds 秒：每个 tick 实际发出的 configure 次数（稳态应为 1）"""
+    app.engine.reset(); root.update()
+    app.view.reset_stats()
+    app.engine.start(seconds)
+    while app.engine.running: root.update(); time.sleep(0.001)
+    _close_popups(root)
+    st = app.view.tick_stats()
+    return {"tk_calls_per_tick_p50": st["tk_calls_per_tick_p50"], "tk_calls_per_tick_max": st["tk_calls_per_tick_max"]}
+
+def _popup_rss(mod, root, n):
+    before = _rss_mb()
+    for _ in range(n):
+        mod.show_end_gif_popup(root); root.update()
+        _close_popups(root)
+    root.update()
+    return {"rss_mb_before_popups": before, f"rss_mb_after_{n}_popups": _rss_mb()}
+
+def _isolate(tmp):
+    """进程内建 TimerApp 前调用（在 import 应用模块之前）：缓存、数据目录都进 tmp，不开控制套接字"""
+    os.environ["PANDA_POMODORO_CACHE"] = tmp
+    os.environ["PANDA_POMODORO_DATA"] = os.path.join(tmp, "data")
+    os.environ["PANDA_POMODORO_CONTROL"] = "0"
+
+def bench_popup(app_mod, alerts):
+    """
+    无人值守的自动循环：连续 alerts 次到点都没人关弹窗。顶层窗口/控件数、挂起的 after、动画数、
+    音频起播次数应与 alerts 无关（第 1 次之后不再增长）；最后关一次，窗口隐藏、动画不再唤醒。
+    """
+    cache = tempfile.mkdtemp(prefix="pp-popup-")
+    _isolate(cache)
+    sys.path.insert(0, HERE)
+    mod = __import__(app_mod)
+    stub = _stub_audio(mod)
+    root = mod.tk.Tk()
+    mod.TimerApp(root); root.update()          # 应用靠 Tk 回调引用存活
+    def widgets(w): return 1 + sum(widgets(c) for c in w.winfo_children())
+    def census():
+        return {"toplevels": sum(isinstance(w, mod.tk.Toplevel) for w in root.winfo_children()),
+                "widgets": widgets(root), "after_jobs": len(root.tk.splitlist(root.tk.call("after", "info"))),
+                "animations": len(mod.animation_clock(root)), "visible_anims": mod.animation_clock(root).active,
+                "audio_plays": len(stub.plays), "rss_mb": round(_rss_mb(), 1)}
+    rows = [("before", census())]
+    t0, per = time.perf_counter(), []
+    for i in range(1, alerts + 1):
+        t1 = time.perf_counter()
+        mod.show_end_gif_popup(root); root.update()
+        per.append((time.perf_counter() - t1) * 1e3)
+        if i in (1, 10, alerts): rows.append((f"after {i}", census()))
+    for w in root.winfo_children():
+        if isinstance(w, mod.tk.Toplevel) and w.winfo_ismapped(): w.event_generate("<Escape>")
+    for _ in range(20): root.update(); time.sleep(0.01)   # 让动画时钟发现窗口已隐藏
+    rows.append(("closed", census()))
+    keys = list(rows[0][1])
+    print(f"{'':<12}" + "".join(f"{k:>14}" for k in keys))
+    for name, c in rows: print(f"{name:<12}" + "".join(f"{c[k]:>14}" for k in keys))
+    print(f"{alerts} alerts in {(time.perf_counter() - t0):.2f} s; per alert: first {per[0]:.1f} ms, "
+          f"coalesced p50 {_pct(per[1:] or per, 0.5):.2f} ms")
+    first, last = rows[2][1], rows[-2][1]
+    ok = (all(first[k] == last[k] for k in ("toplevels", "widgets", "after_jobs", "animations"))
+          and last["audio_plays"] == 1 and rows[-1][1]["visible_anims"] <= first["visible_anims"] - 1)
+    print("PASS: widgets/timers/audio bounded" if ok else "FAIL: popup resources grew with alerts")
+    root.destroy()
+    import shutil
+    shutil.rmtree(cache, ignore_errors=True)
+    return ok
+
+def bench_suite(app_mod, out, popups, tick_seconds, repeats):
+    # 缓存/数据目录指向临时目录：结果不受本机已有缓存影响，跑出来的会话也不写进真实历史
+    cache = tempfile.mkdtemp(prefix="pp-bench-")
+    _isolate(cache)
+    sys.path.insert(0, HERE)
+    res = {"meta": {"app": app_mod, "python": platform.python_version(), "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "rev": _git_rev()}}
+    res.update(_startup(app_mod, repeats, dict(os.environ)))
+
+    mod = __import__(app_mod)
+    stub = _stub_audio(mod)
+    root = mod.tk.Tk()
+    app = mod.TimerApp(root); root.update()
+    res.update(_decode(mod, root))
+    res.update(_popup_latency(mod, root, app, repeats, stub))
+    res.update(_tick_jitter(root, tick_seconds))
+    res.update(_idle_wakeups(root, app, tick_seconds))
+    res.update(_view_ticks(root, app, tick_seconds))
+    res.update(_popup_rss(mod, root, popups))
+    root.destroy()
+
+    text = json.dumps(res, indent=2, sort_keys=True)
+    if out:
+        with open(out, "w") as f: f.write(text + "\n")
+    print(text)
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def bench_compare(a, b):
+    with open(a) as f: ra = json.load(f)
+    with open(b) as f: rb = json.load(f)
+    print(f"{'metric':>28} {'A':>10} {'B':>10} {'B/A':>7}")
+    for k in sorted(set(ra) | set(rb)):
+        if k == "meta": continue
+        va, vb = ra.get(k), rb.get(k)
+        ratio = f"{vb / va:.2f}" if isinstance(va, (int, float)) and isinstance(vb, (int, float)) and va else "-"
+        fmt = lambda v: f"{v:.2f}" if isinstance(v, float) else str(v)
+        print(f"{k:>28} {fmt(va):>10} {fmt(vb):>10} {ratio:>7}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Panda Pomodoro benchmarks")
+    sub = ap.add_subparsers(dest="case", required=True)
+    p = sub.add_parser("decode", help="GIF 多帧解码耗时随帧数的变化")
+    p.add_argument("--frames", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    p = sub.add_parser("scale", help="缩放到任意目标尺寸的耗时与峰值内存")
+    p.add_argument("--gif", default=os.path.join(HERE, "timer Lee.gif"))
+    p.add_argument("--target", type=int, default=500, help="最长边目标像素")
+    p.add_argument("--child", choices=SCALE_METHODS, help=argparse.SUPPRESS)
+    p = sub.add_parser("tray", help="托盘图标加载耗时/内存与角标开销")
+    p.add_argument("--png", default=os.path.join(HERE, "tray.png"))
+    p.add_argument("--child", choices=TRAY_METHODS, help=argparse.SUPPRESS)
+    p = sub.add_parser("audio", help="提醒出声延迟（play() 到交给播放器）")
+    p.add_argument("--file", default=os.path.join(HERE, "alert.mp3"))
+    p.add_argument("--backend", default="auto", help="auto=本机全部可用后端；stub=无声卡打桩；或指定名字")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--gap", type=float, default=0.3, help="每次播放后等待多久再停（秒）")
+    p = sub.add_parser("drift", help="倒计时结束时刻误差（注入事件循环延迟）")
+    p.add_argument("--seconds", type=int, default=25 * 60)
+    p.add_argument("--runs", type=int, default=50)
+    p.add_argument("--lag-ms", type=float, default=4.0, help="每次回调平均迟到（指数分布）")
+    p.add_argument("--stall-p", type=float, default=0.01, help="回调遇到卡顿的概率")
+    p.add_argument("--stall-ms", type=float, default=250.0)
+    p.add_argument("--suspend", type=float, default=0.0, help="中途模拟休眠秒数")
+    p = sub.add_parser("anim", help="GIF 播放节奏与跳帧（模拟事件循环）")
+    p.add_argument("--seconds", type=int, default=60)
+    p.add_argument("--lag-ms", type=float, default=15.0)
+    p.add_argument("--stall-p", type=float, default=0.02)
+    p.add_argument("--stall-ms", type=float, default=300.0)
+    p.add_argument("--gif", help="取该 GIF 的真实帧延时（默认用一组混合延时）")
+    p = sub.add_parser("timers", help="命名计时器规模 vs CPU")
+    p.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    p = sub.add_parser("history", help="会话历史：追加吞吐、流式汇总、区间查询、读取内存")
+    p.add_argument("--records", type=int, default=1000000)
+    p.add_argument("--path", help="日志文件路径（默认临时目录，跑完删除）")
+    p = sub.add_parser("stats", help="统计面板：快照续读 vs 从头折叠，面板查询耗时")
+    p.add_argument("--records", type=int, default=1000000)
+    p = sub.add_parser("framestore", help="有内存上限的帧存储：1000 帧 GIF 播放时 RSS 不超过预算")
+    p.add_argument("--frames", type=int, default=1000)
+    p.add_argument("--src-px", type=int, default=100, help="合成 GIF 的边长")
+    p.add_argument("--max-size", type=int, default=500, help="播放尺寸（同 MAX_GIF_SIZE）")
+    p.add_argument("--budget-mb", type=float, default=16.0)
+    p.add_argument("--raw", action="store_true", help="不用 Tk，bytearray 当帧（无图形环境可跑）")
+    p = sub.add_parser("delta", help="差分帧：帧内存与每帧贴补丁耗时 vs 整帧列表")
+    p.add_argument("--gif", default=os.path.join(HERE, "timer Lee.gif"))
+    p.add_argument("--max-size", type=int, default=500)
+    p.add_argument("--sprite-frames", type=int, default=60)
+    p.add_argument("--laps", type=int, default=20)
+    p = sub.add_parser("metrics", help="指标埋点：每次记录的开销、真实循环上的 tick 迟到分布、导出文本")
+    p.add_argument("-n", type=int, default=1000000)
+    p.add_argument("--seconds", type=float, default=3.0)
+    p = sub.add_parser("dispatch", help="托盘动作压测：跨线程调度器的顺序、丢失、排队延迟")
+    p.add_argument("--rate", type=float, default=5000.0, help="每秒动作数（所有生产线程合计）")
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--producers", type=int, default=2)
+    p.add_argument("--busy-ms", type=float, default=4.0, help="宿主线程每 16ms 忙多少毫秒")
+    p.add_argument("--tk", action="store_true", help="用真实 Tk 根窗口做宿主（需要图形环境）")
+    p = sub.add_parser("control", help="控制套接字：往返延迟、并发客户端、订阅者扇出")
+    p.add_argument("--calls", type=int, default=5000)
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--subscribers", type=int, default=200)
+    p.add_argument("--rate", type=float, default=50.0, help="发布频率（Hz）")
+    p.add_argument("--seconds", type=float, default=3.0)
+    p = sub.add_parser("instance", help="第二次启动转发参数的耗时")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--app", default="timer", choices=["timer", "timerMac"])
+    p = sub.add_parser("tui", help="终端前端：差分重画的输出量、运行/暂停时的 CPU")
+    p.add_argument("--minutes", type=int, default=25)
+    p.add_argument("--seconds", type=float, default=5.0, help="pty 中每种状态观测的秒数")
+    p = sub.add_parser("startup", help="冷启动到首次绘制：延后 vs 一次性初始化")
+    p.add_argument("--cmd", nargs="+", help="被测命令（默认 python timer.py；可填 PyInstaller 产物路径）")
+    p.add_argument("--repeats", type=int, default=10)
+    p = sub.add_parser("popup", help="无人值守连续到点：弹窗/控件/after/动画/音频是否有界")
+    p.add_argument("--app", default="timer", choices=["timer", "timerMac"])
+    p.add_argument("--alerts", type=int, default=200)
+    p = sub.add_parser("suite", help="固定指标集：启动/弹窗延迟/解码/tick 抖动/内存，输出 JSON")
+    p.add_argument("--app", default="timer", choices=["timer", "timerMac"])
+    p.add_argument("-o", "--out", help="结果 JSON 路径")
+    p.add_argument("--popups", type=int, default=20, help="测 RSS 前连续打开/关闭的弹窗数")
+    p.add_argument("--tick-seconds", type=int, default=10)
+    p.add_argument("--repeats", type=int, default=5)
+    p = sub.add_parser("compare", help="对比两份 suite 结果")
+    p.add_argument("a"); p.add_argument("b")
+    args = ap.parse_args()
+    if args.case == "decode": bench_decode(args.frames)
+    elif args.case == "scale":
+        if args.child: _scale_child(args.child, args.gif, args.target)
+        else: bench_scale(args.gif, args.target)
+    elif args.case == "tray":
+        if args.child: _tray_child(args.child, args.png)
+        else: bench_tray(args.png)
+    elif args.case == "audio": bench_audio(args.file, args.backend, args.runs, args.gap)
+    elif args.case == "anim": bench_anim(args.seconds, args.lag_ms, args.stall_p, args.stall_ms, args.gif)
+    elif args.case == "timers": bench_timers(args.counts)
+    elif args.case == "history": bench_history(args.records, args.path)
+    elif args.case == "stats": bench_stats(args.records)
+    elif args.case == "framestore":
+        sys.exit(0 if bench_framestore(args.frames, args.src_px, args.max_size, args.budget_mb, args.raw) else 1)
+    elif args.case == "delta": bench_delta(args.gif, args.max_size, args.sprite_frames, args.laps)
+    elif args.case == "metrics": bench_metrics(args.n, args.seconds)
+    elif args.case == "dispatch": bench_dispatch(args.rate, args.seconds, args.producers, args.busy_ms, args.tk)
+    elif args.case == "control": bench_control(args.calls, args.clients, args.subscribers, args.rate, args.seconds)
+    elif args.case == "instance": bench_instance(args.runs, args.app)
+    elif args.case == "tui": bench_tui(args.minutes, args.seconds)
+    elif args.case == "startup": bench_startup(args.cmd, args.repeats)
+    elif args.case == "popup": sys.exit(0 if bench_popup(args.app, args.alerts) else 1)
+    elif args.case == "suite": bench_suite(args.app, args.out, args.popups, args.tick_seconds, args.repeats)
+    elif args.case == "compare": bench_compare(args.a, args.b)
+    elif args.case == "drift":
+        bench_drift(args.seconds, args.runs, args.lag_ms, args.stall_p, args.stall_ms, args.suspend)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# ========== 本地控制接口：协议、命令表、同步客户端（不依赖 tkinter / asyncio） ==========
+# 自动化脚本不用再模拟点按钮：连上本机套接字，一行一个 JSON 请求，一行一个 JSON 应答。
+#   请求  {"id": 1, "cmd": "start", "args": {"seconds": 600}}
+#   应答  {"id": 1, "ok": true, "result": {...}}    /  {"id": 1, "ok": false, "error": "..."}
+#   订阅  {"cmd": "subscribe"} 之后该连接只下行事件：{"event": "tick", "phase": ..., "remaining": ...}
+# 端点：有 AF_UNIX 的系统用 user_runtime_dir()/control.sock（0600）；否则 127.0.0.1 随机端口 + 随机令牌。
+# 正在服务的实例把端点写进 user_runtime_dir()/control.json，客户端从那里找。
+# 服务端（asyncio）见 controlserver.py；这里保持轻量，第二次启动转发参数时不必加载它。
+import os, sys, json, socket
+
+from userdirs import user_runtime_dir
+
+PROTOCOL = 1
+MAX_LINE = 64 * 1024
+
+class ControlError(Exception):
+    """命令被拒绝或连接失败；str(e) 会原样回给客户端"""
+
+def endpoint_path():
+    return os.path.join(user_runtime_dir(), "control.json")
+
+def read_endpoint():
+    try:
+        with open(endpoint_path(), "rb") as f: ep = json.loads(f.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    return ep if isinstance(ep, dict) and ep.get("protocol") == PROTOCOL else None
+
+def use_unix_socket():
+    return hasattr(socket, "AF_UNIX") and not sys.platform.startswith("win")
+
+# ---------- 命令表：name -> fn(**args)，全部在宿主（Tk）线程执行 ----------
+def engine_commands(engine):
+    """TimerEngine 上的控制命令；返回值都是 engine.snapshot()，界面经引擎事件自行刷新"""
+    snap = engine.snapshot
+
+    def start(seconds=None):
+        """seconds 给出时重新开始一个手动计时；不给时继续暂停中的手动计时"""
+        if engine.is_pomo: raise ControlError("pomodoro in progress")
+        if seconds is not None:
+            seconds = float(seconds)
+            if seconds <= 0: raise ControlError("seconds must be > 0")
+            engine.reset()
+        if not engine.start(seconds) and not engine.running: raise ControlError("nothing to start")
+        return snap()
+
+    def pause():
+        engine.pause(); return snap()
+
+    def resume():
+        engine.resume(); return snap()
+
+    def toggle():
+        if engine.running: engine.pause()
+        else: engine.resume()
+        return snap()
+
+    def reset():
+        engine.reset(); return snap()
+
+    def pomodoro_start(focus=None, short=None, long=None, cycles=None):
+        engine.start_pomodoro(focus, short, long, cycles); return snap()
+
+    def pomodoro_skip():
+        if not engine.is_pomo: raise ControlError("no pomodoro in progress")
+        engine.skip_phase(); return snap()
+
+    def pomodoro_stop():
+        engine.stop_pomodoro(); return snap()
+
+    return {"ping": lambda: {"pong": True, "pid": os.getpid()}, "status": snap,
+            "start": start, "pause": pause, "resume": resume, "toggle": toggle, "reset": reset,
+            "pomodoro.start": pomodoro_start, "pomodoro.skip": pomodoro_skip, "pomodoro.stop": pomodoro_stop}
+
+# ---------- 同步客户端 ----------
+class ControlClient:
+    """
+    c = ControlClient(); c.call("start", seconds=600); c.call("status")
+    for ev in ControlClient().subscribe(): ...      # 订阅后这个连接只收事件
+    """
+    def __init__(self, endpoint=None, timeout=2.0):
+        ep = endpoint or read_endpoint()
+        if not ep: raise ControlError("no running instance")
+        try:
+            if "unix" in ep:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.settimeout(timeout)
+                self.sock.connect(ep["unix"])
+            else:
+                self.sock = socket.create_connection(tuple(ep["tcp"]), timeout=timeout)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            raise ControlError(f"cannot connect: {e}") from None
+        self._token = ep.get("token")
+        self._rf = self.sock.makefile("rb")
+        self._id = 0
+
+    def _send(self, cmd, args):
+        self._id += 1
+        req = {"id": self._id, "cmd": cmd}
+        if args: req["args"] = args
+        if self._token: req["token"] = self._token
+        self.sock.sendall(json.dumps(req, separators=(",", ":")).encode("utf-8") + b"\n")
+        return self._id
+
+    def _recv(self):
+        line = self._rf.readline(MAX_LINE)
+        if not line: raise ControlError("connection closed")
+        return json.loads(line)
+
+    def call(self, cmd, **args):
+        try:
+            rid = self._send(cmd, args)
+            resp = self._recv()
+        except OSError as e:
+            raise ControlError(str(e)) from None
+        if resp.get("id") != rid: raise ControlError("out-of-order response")
+        if not resp.get("ok"): raise ControlError(resp.get("error") or "failed")
+        return resp.get("result")
+
+    def subscribe(self):
+        """产出事件 dict，直到连接断开；先给一次当前状态"""
+        self.call("subscribe")
+        self.sock.settimeout(None)
+        while True:
+            try: yield self._recv()
+            except (ControlError, OSError): return
+
+    def close(self):
+        try: self._rf.close(); self.sock.close()
+        except OSError: pass
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+# ---------- 命令行：python control.py status | start 600 | pause | pomodoro.start 25 5 15 4 | metrics | watch ----------
+_POSITIONAL = {"start": ("seconds",), "pomodoro.start": ("focus", "short", "long", "cycles")}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: control.py status|start [seconds]|pause|resume|toggle|reset|"
+              "pomodoro.start [focus short long cycles]|pomodoro.skip|pomodoro.stop|metrics|profile|watch", file=sys.stderr)
+        return 2
+    cmd, rest = argv[0], argv[1:]
+    try:
+        with ControlClient() as c:
+            if cmd == "watch":
+                for ev in c.subscribe(): print(json.dumps(ev), flush=True)
+                return 0
+            args = {k: float(v) for k, v in zip(_POSITIONAL.get(cmd, ()), rest)}
+            result = c.call(cmd, **args)
+            if cmd == "metrics": sys.stdout.write(result)        # Prometheus 文本，原样输出
+            else: print(json.dumps(result))
+    except ControlError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# ========== 控制接口服务端：后台线程跑 asyncio，命令经 submit 交给宿主（Tk）线程执行 ==========
+# 协议与客户端见 control.py。线程关系：
+#   asyncio 线程：收发套接字、解析 JSON、等结果；从不碰 Tk/引擎
+#   宿主线程：    submit(fn) → 在 Tk 线程执行命令（dispatch.Dispatcher.call），Future 回到 asyncio
+#   publish()：   宿主线程随时调用，call_soon_threadsafe 进 asyncio 扇出给所有订阅者
+# 订阅者各有一个“最新一条”槽位：慢的客户端只会漏掉中间状态，不会拖住别人，也不会无限堆内存。
+import os, json, hmac, socket, secrets, asyncio, threading
+from functools import partial
+
+from control import ControlError, PROTOCOL, MAX_LINE, endpoint_path, read_endpoint, use_unix_socket
+from userdirs import user_runtime_dir, atomic_write
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+
+class _Subscriber:
+    __slots__ = ("latest", "ready")
+    def __init__(self):
+        self.latest = None
+        self.ready = asyncio.Event()
+
+class ControlServer:
+    """
+    commands：name -> fn(**args)（见 control.engine_commands），在宿主线程执行
+    submit(fn) -> concurrent.futures.Future：把 fn 交给宿主线程
+    start() 绑定端点并写 control.json；已有实例在服务时抛 ControlError
+    """
+    def __init__(self, commands, submit, path=None):
+        self.commands, self.submit = commands, submit
+        self._path = path
+        self.endpoint = None
+        self._token = None
+        self._loop = self._server = self._thread = None
+        self._subs = set()
+        self._last = None
+        self.requests = 0          # 已处理的命令数
+        self.published = 0         # publish() 次数
+
+    @property
+    def subscribers(self): return len(self._subs)
+
+    # ---- 生命周期（宿主线程） ----
+    def start(self, timeout=5.0):
+        if _instance_alive():
+            raise ControlError("another instance is already serving")
+        ready, err = threading.Event(), []
+        def run():
+            loop = self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try: loop.run_until_complete(self._bind())
+            except Exception as e:
+                err.append(e); ready.set(); loop.close(); return
+            ready.set()
+            try: loop.run_forever()
+            finally: loop.close()
+        self._thread = threading.Thread(target=run, name="panda-control", daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout): raise ControlError("control server did not start")
+        if err: raise ControlError(f"cannot bind control socket: {err[0]}")
+        return self.endpoint
+
+    def stop(self):
+        loop = self._loop
+        if loop is None or loop.is_closed(): return
+        async def shutdown():
+            self._server.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks: t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+        try: asyncio.run_coroutine_threadsafe(shutdown(), loop)
+        except RuntimeError: pass
+        if self._thread: self._thread.join(1.0)
+        self._cleanup()
+
+    def _cleanup(self):
+        ep = read_endpoint()
+        if ep and ep.get("pid") == os.getpid():
+            try: os.unlink(endpoint_path())
+            except OSError: pass
+        if self.endpoint and "unix" in self.endpoint:
+            try: os.unlink(self.endpoint["unix"])
+            except OSError: pass
+
+    # ---- 事件扇出（任意线程） ----
+    def publish(self, event, payload):
+        """把 {"event": event, **payload} 推给所有订阅者；没有订阅者时几乎零开销"""
+        self.published += 1
+        loop = self._loop
+        if loop is None or not self._subs:
+            self._last = (event, payload)
+            return
+        try: loop.call_soon_threadsafe(self._fanout, event, payload)
+        except RuntimeError: pass    # 事件循环已关闭
+
+    def _fanout(self, event, payload):
+        self._last = (event, payload)
+        line = _dumps(dict(payload, event=event))
+        for sub in self._subs:
+            sub.latest = line
+            sub.ready.set()
+
+    # ---- asyncio 线程 ----
+    async def _bind(self):
+        if use_unix_socket():
+            path = self._path or os.path.join(user_runtime_dir(), "control.sock")
+            try: os.unlink(path)          # 上一次崩溃遗留（_instance_alive 已确认没人在听）
+            except FileNotFoundError: pass
+            self._server = await asyncio.start_unix_server(self._handle, path, limit=MAX_LINE)
+            os.chmod(path, 0o600)
+            self.endpoint = {"unix": path}
+        else:
+            self._token = secrets.token_hex(16)
+            self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, limit=MAX_LINE)
+            for s in self._server.sockets: s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.endpoint = {"tcp": ["127.0.0.1", self._server.sockets[0].getsockname()[1]], "token": self._token}
+        self.endpoint.update(pid=os.getpid(), protocol=PROTOCOL)
+        atomic_write(endpoint_path(), json.dumps(self.endpoint).encode("utf-8"))
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    req = json.loads(line)
+                    if not isinstance(req, dict): raise ValueError
+                except ValueError:
+                    writer.write(_dumps({"ok": False, "error": "bad request"})); break
+                rid = req.get("id")
+                if self._token and not hmac.compare_digest(str(req.get("token", "")), self._token):
+                    writer.write(_dumps({"id": rid, "ok": False, "error": "bad token"})); break
+                if req.get("cmd") == "subscribe":
+                    await self._stream(reader, writer, rid); break
+                writer.write(_dumps(await self._run(rid, req.get("cmd"), req.get("args") or {})))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            try: writer.close()
+            except Exception: pass
+
+    async def _run(self, rid, cmd, args):
+        fn = self.commands.get(cmd)
+        if fn is None: return {"id": rid, "ok": False, "error": f"unknown command: {cmd}"}
+        if not isinstance(args, dict): return {"id": rid, "ok": False, "error": "args must be an object"}
+        self.requests += 1
+        try:
+            result = await asyncio.wrap_future(self.submit(partial(fn, **args)))
+        except (ControlError, TypeError, ValueError) as e:
+            return {"id": rid, "ok": False, "error": str(e)}
+        except Exception as e:
+            return {"id": rid, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"id": rid, "ok": True, "result": result}
+
+    async def _stream(self, reader, writer, rid):
+        sub = _Subscriber()
+        self._subs.add(sub)
+        # 客户端断开（读到 EOF）时唤醒写循环退出
+        eof = asyncio.ensure_future(reader.read())
+        eof.add_done_callback(lambda _: sub.ready.set())
+        try:
+            writer.write(_dumps({"id": rid, "ok": True, "result": "subscribed"}))
+            if self._last is not None:
+                event, payload = self._last
+                sub.latest = _dumps(dict(payload, event=event))
+                sub.ready.set()
+            while True:
+                await sub.ready.wait()
+                sub.ready.clear()
+                if eof.done(): break
+                line, sub.latest = sub.latest, None
+                if line is not None:
+                    writer.write(line)
+                    await writer.drain()
+        finally:
+            self._subs.discard(sub)
+            eof.cancel()
+
+def _instance_alive(timeout=0.5):
+    """control.json 指向的端点还能连上 = 另一个实例正在服务"""
+    ep = read_endpoint()
+    if not ep: return False
+    try:
+        if "unix" in ep:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.settimeout(timeout); s.connect(ep["unix"])
+        else:
+            socket.create_connection(tuple(ep["tcp"]), timeout=timeout).close()
+        return True
+    except (OSError, KeyError, TypeError):
+        return False
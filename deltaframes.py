@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# ========== 差分帧：关键帧 + 每帧脏矩形补丁，播放时贴到同一张显示图上 ==========
+# 多数 GIF 相邻两帧只有一小块不同，整幅 PhotoImage 一帧一张却全部常驻（Tk 按 RGBA 存，500px 一帧约 1MB）。
+# DeltaFrames 当作帧列表用（len / 下标 / 迭代，与 FrameSet.frames 同样的用法）：
+#   - 第 0 帧整幅留作关键帧；其后每帧只留与上一帧不同的外接矩形（已按处置方式合成好的像素，含透明）
+#   - 每个使用者（动画）一个 view()，各有一张显示图和播放位置：顺序播放每帧贴一块补丁；跳帧时按顺序补上中间的；
+#     回到开头从关键帧重来。关键帧和补丁所有 view 共用；同一组帧可以同时给页眉和弹窗播，互不覆盖
+# 脏矩形从磁盘缓存里已合成、已缩放的逐帧 PNG 算（zlib 解压 + 按行比较，不逐像素走 Tk），
+# 所以处置方式（恢复背景 / 恢复上一帧）造成的变化自然算在内。
+import zlib, struct, weakref
+import tkinter as tk
+
+# ---------- PNG → 原始扫描行（只认 8 位 RGB/RGBA、不隔行，Tk 写出的就是这种） ----------
+def png_rows(data):
+    """返回 (宽, 高, 每像素字节, [每行字节（带 1 字节过滤类型）])；不支持的格式返回 None"""
+    if data[:8] != b"\x89PNG\r\n\x1a\n": return None
+    p, idat, hdr = 8, [], None
+    while p + 8 <= len(data):
+        n, kind = struct.unpack(">I4s", data[p:p + 8])
+        body = data[p + 8:p + 8 + n]
+        if kind == b"IHDR": hdr = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT": idat.append(body)
+        elif kind == b"IEND": break
+        p += 12 + n
+    if hdr is None: return None
+    w, h, depth, ctype, _, _, interlace = hdr
+    bpp = {2: 3, 6: 4}.get(ctype)
+    if depth != 8 or bpp is None or interlace: return None
+    try: raw = zlib.decompress(b"".join(idat))
+    except zlib.error: return None
+    stride = 1 + w * bpp
+    if len(raw) < stride * h: return None
+    return w, h, bpp, [raw[y * stride:(y + 1) * stride] for y in range(h)]
+
+def _first_diff(a, b, lo, hi):
+    """a[lo:hi] 与 b[lo:hi] 第一个不同字节的位置（二分比较切片，C 层逐字节）"""
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[lo:mid] != b[lo:mid]: hi = mid
+        else: lo = mid
+    return lo
+
+def dirty_rect(prev, cur, bpp):
+    """
+    两帧扫描行的差异外接矩形 (x0, y0, x1, y1)（右/下开区间），完全相同返回 None。
+    比较的是过滤后的字节：过滤方式不同或 Up/Sub 过滤把变化带到相邻像素时矩形只会偏大，不会漏。
+    """
+    rows = [y for y, (a, b) in enumerate(zip(prev, cur)) if a != b]
+    if not rows: return None
+    n = len(cur[0])
+    x0, x1 = n, 1
+    for y in rows:
+        a, b = prev[y], cur[y]
+        if a[0] != b[0]: x0, x1 = 1, n; break        # 过滤类型不同：整行都算
+        if a[1:x0] != b[1:x0]: x0 = _first_diff(a, b, 1, x0)
+        ra, rb = a[::-1], b[::-1]
+        if ra[:n - x1] != rb[:n - x1]: x1 = n - _first_diff(ra, rb, 0, n - x1)
+    return (x0 - 1) // bpp, rows[0], -(-(x1 - 1) // bpp), rows[-1] + 1
+
+def delta_bytes(rects, width, height):
+    """按 rects 压缩后的像素内存（RGBA）：关键帧 + 显示图 + 各补丁"""
+    return 4 * (2 * width * height + sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in filter(None, rects[1:])))
+
+def rects_from_pngs(blobs):
+    """逐帧 PNG 字节 → 每帧相对上一帧的脏矩形（第 0 帧为整幅）；任一帧不支持时返回 None"""
+    rects, prev = [], None
+    for data in blobs:
+        img = png_rows(data)
+        if img is None or (prev and img[:3] != prev[:3]): return None
+        w, h, bpp, rows = img
+        rects.append((0, 0, w, h) if prev is None else dirty_rect(prev[3], rows, bpp))
+        prev = img
+    return rects
+
+# ---------- 帧列表 ----------
+class DeltaFrames:
+    """
+    frames 为已合成、已缩放的整幅 PhotoImage 列表。compact(rects) 之前原样返回整幅帧（写磁盘缓存时用），
+    之后只留关键帧 + 补丁，显示图每个 view 一张。blits / resets 统计所有 view 贴补丁和回到关键帧的次数。
+    直接下标取帧走内部的默认 view（只适合单一使用者，比如基准脚本）；动画要用 view()。
+    """
+    def __init__(self, frames, master):
+        self._full = list(frames)
+        self.count = len(self._full)
+        self.master = master
+        self._key = None
+        self._patches = []
+        self._views = weakref.WeakSet()
+        self._own = None
+        self.blits = self.resets = 0
+
+    def __len__(self): return self.count
+    def __bool__(self): return self.count > 0
+
+    def __iter__(self):
+        """按顺序给出每一帧（压缩后每次都是同一张显示图，取出即用，不要留着）"""
+        for i in range(self.count): yield self[i]
+
+    def __getitem__(self, i):
+        if self._own is None: self._own = self.view()
+        return self._own[i]
+
+    def view(self):
+        """给一个使用者的帧列表：自己的显示图和播放位置，关键帧和补丁共用"""
+        v = DeltaView(self)
+        self._views.add(v)
+        return v
+
+    @property
+    def compacted(self): return self._full is None
+
+    def compact(self, rects):
+        """rects[i]：第 i 帧相对上一帧的脏矩形（None = 没变）；rects[0] 忽略"""
+        if self._full is None or len(rects) != self.count or not self.count: return self
+        full = self._full
+        patches = [None]
+        for img, r in zip(full[1:], rects[1:]):
+            if r is None: patches.append(None); continue
+            x0, y0, x1, y1 = r
+            p = tk.PhotoImage(master=self.master, width=x1 - x0, height=y1 - y0)
+            p.tk.call(p, "copy", img, "-from", x0, y0, x1, y1, "-to", 0, 0, "-compositingrule", "set")
+            patches.append((x0, y0, p))
+        for v in self._views: v._hold = full[v._last]
+        self._key, self._patches, self._full = full[0], patches, None
+        self._rects = list(rects)
+        return self
+
+    def nbytes(self):
+        """像素内存估算（RGBA 4 字节/像素）：压缩后 = 关键帧 + 补丁 + 各 view 的显示图；压缩前 = 全部整幅帧"""
+        if self._full is not None: return sum(f.width() * f.height() * 4 for f in self._full)
+        w, h = self._key.width(), self._key.height()
+        shown = sum(1 for v in self._views if v._disp is not None)
+        return delta_bytes(self._rects, w, h) + 4 * w * h * (max(1, shown) - 1)
+
+class DeltaView:
+    """DeltaFrames 的一个使用者：压缩前交出整幅帧，压缩后在自己的显示图上贴补丁"""
+    def __init__(self, src):
+        self.src = src
+        self._disp = None
+        self._at = -1
+        self._last = 0                 # 压缩前最后交出的整幅帧下标
+        self._hold = None              # 压缩时控件上可能还挂着的那张整幅帧，下次取帧后才放掉
+
+    def __len__(self): return self.src.count
+    def __bool__(self): return self.src.count > 0
+
+    def __getitem__(self, i):
+        src = self.src
+        if not 0 <= i < src.count: raise IndexError(i)
+        if src._full is not None:
+            self._last = i
+            return src._full[i]
+        d = self._disp
+        if d is None:
+            d = self._disp = tk.PhotoImage(master=src.master, width=src._key.width(), height=src._key.height())
+        if i < self._at or self._at < 0:
+            d.tk.call(d, "copy", src._key, "-compositingrule", "set")
+            self._at = 0
+            src.resets += 1
+        while self._at < i:
+            self._at += 1
+            patch = src._patches[self._at]
+            if patch is not None:
+                x0, y0, p = patch
+                d.tk.call(d, "copy", p, "-to", x0, y0, "-compositingrule", "set")
+                src.blits += 1
+        self._hold = None
+        return d
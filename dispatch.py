@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# ========== 跨线程 → Tk 线程的命令队列：管道唤醒，不轮询 ==========
+# Tk 只能在创建它的线程里调用。其他线程（控制套接字的 asyncio 线程等）一律 post()/call() 进来：
+#   - 命令进一个 deque（append/popleft 线程安全），先进先出
+#   - 队列从空变非空时往自管道写 1 字节；Tk 用 createfilehandler 监听读端，醒来一次把队列清空
+#   - 没有可读事件就不醒：空闲时零唤醒
+#   - 每条命令带入队时刻，执行时记下排队延迟（latency_stats()），看得出点击是否被 Tk 长任务拖住
+# Windows 的 Tk 不支持 createfilehandler，退回到 event_generate(<<虚拟事件>>, when="tail")
+# （线程版 Tcl 下 tkinter 会把它转交给主线程执行）。
+# 不绑定 Tk 时也能用：宿主自己 select(fileno()) 后调 drain()（见 bench.py control）。
+import os, sys
+from time import perf_counter
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import histogram
+
+QUEUE_LATENCY = histogram("panda_dispatch_queue_latency_seconds", "Cross-thread command wait before running on the host thread")
+
+class Dispatcher:
+    def __init__(self):
+        self._q = deque()
+        self._signaled = False
+        self._r, self._w = os.pipe()
+        try:
+            os.set_blocking(self._r, False); os.set_blocking(self._w, False)
+        except (AttributeError, OSError):
+            pass                          # Windows 旧版本：不走管道，见 attach_tk
+        self._root = None
+        self._virtual = None
+        self.executed = 0        # 已在宿主线程执行的命令数
+        self.wakeups = 0         # 宿主线程被唤醒的次数（多条命令可共用一次）
+        self.errors = 0          # 执行时抛异常的命令数
+        self.depth_max = 0       # 一次唤醒里见到的最大排队数
+        self.latency_max = 0.0   # 入队 → 开始执行，秒
+        self._latency_sum = 0.0
+        self._recent = deque(maxlen=4096)   # 最近的排队延迟，分位数用
+
+    def fileno(self): return self._r
+
+    # ---- 任意线程 ----
+    def post(self, fn, *args):
+        """排队在宿主线程执行 fn(*args)，不等结果"""
+        self._q.append((fn, args, perf_counter()))
+        if not self._signaled:
+            self._signaled = True
+            self._wake()
+
+    def call(self, fn, *args):
+        """同 post，返回 concurrent.futures.Future（asyncio 侧用 asyncio.wrap_future 等待）"""
+        fut = Future()
+        def run():
+            if not fut.set_running_or_notify_cancel(): return
+            try: fut.set_result(fn(*args))
+            except BaseException as e: fut.set_exception(e)
+        self.post(run)
+        return fut
+
+    def _wake(self):
+        if self._virtual is not None:
+            try: self._root.event_generate(self._virtual, when="tail")
+            except Exception: pass
+            return
+        try: os.write(self._w, b"\0")
+        except BlockingIOError: pass     # 管道已满：读端反正会醒
+        except OSError: pass
+
+    # ---- 宿主线程 ----
+    def drain(self, *_):
+        """执行目前排队的全部命令；单条命令抛异常不影响后面的"""
+        self.wakeups += 1
+        if self._virtual is None:        # 先读空管道，再清标志，最后取队列长度：
+            try:                         # 清标志之后 post 的命令会重新写管道、再唤醒一次；之前的都在本次长度里
+                while os.read(self._r, 4096): pass
+            except (BlockingIOError, OSError):
+                pass
+        self._signaled = False
+        q = self._q
+        n = len(q)
+        if n > self.depth_max: self.depth_max = n
+        for _ in range(n):               # 只跑进来时已排队的；执行中新 post 的等下一次唤醒，不饿死 Tk 事件
+            fn, args, t = q.popleft()
+            lat = perf_counter() - t
+            self._recent.append(lat); self._latency_sum += lat
+            QUEUE_LATENCY.observe(lat)
+            if lat > self.latency_max: self.latency_max = lat
+            try: fn(*args)
+            except Exception: self.errors += 1
+            self.executed += 1
+
+    def latency_stats(self):
+        """排队延迟汇总（毫秒）：全程均值/最大值，最近 4096 条的 p50/p99"""
+        recent = sorted(self._recent)
+        pick = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] * 1e3 if recent else 0.0
+        return {"executed": self.executed, "wakeups": self.wakeups, "pending": len(self._q),
+                "depth_max": self.depth_max, "errors": self.errors,
+                "mean_ms": self._latency_sum / self.executed * 1e3 if self.executed else 0.0,
+                "p50_ms": pick(0.5), "p99_ms": pick(0.99), "max_ms": self.latency_max * 1e3}
+
+    def attach_tk(self, root):
+        """挂到 Tk 事件循环：读端可读即 drain()"""
+        import tkinter
+        self._root = root
+        if sys.platform.startswith("win") or not hasattr(root.tk, "createfilehandler"):
+            self._virtual = "<<PandaDispatch>>"
+            root.bind(self._virtual, self.drain, add="+")
+        else:
+            root.tk.createfilehandler(self._r, tkinter.READABLE, self.drain)
+        if self._q: self._wake()
+        return self
+
+    def close(self):
+        if self._root is not None and self._virtual is None:
+            try: self._root.tk.deletefilehandler(self._r)
+            except Exception: pass
+        for fd in (self._r, self._w):
+            try: os.close(fd)
+            except OSError: pass
+        self._r = self._w = -1   # 关掉的 fd 号可能被别处复用：之后 post/drain 不再碰它（drain 仍会清空队列）
+
+def tk_dispatcher(root):
+    """每个根窗口一个共享调度器"""
+    d = getattr(root, "_panda_dispatch", None)
+    if d is None:
+        d = root._panda_dispatch = Dispatcher().attach_tk(root)
+    return d
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# ========== 结束弹窗池：每个根窗口一个预先建好、关闭只隐藏的弹窗 ==========
+# 以前每次到点都新建 Toplevel + 帧 + 标签 + 按钮，关闭时销毁。番茄钟自动循环、人不在电脑前时，
+# 每段结束再弹一个：没人关的弹窗越堆越多，各挂一个动画，AUDIO.play() 每次从头重放。
+# 现在：
+#   - 启动空闲时 prebuild()（或第一次提醒时）建好、withdraw；关闭只 withdraw，下次 deiconify 同一个窗口
+#   - 弹窗还开着又到点：合并进去，标题和计数行显示 ×N，不重建、不重放音频
+#   - 控件数固定；动画始终最多一个（隐藏时 AnimationClock 不为它醒）；帧来自 load_bounded_frames 的进程内缓存
+# 窗口被外部销毁（基准脚本、rescue 快捷键、退出）后，下次提醒重新建。
+import tkinter as tk
+
+import metrics
+from animclock import animation_clock
+
+BUILDS = metrics.counter("panda_popup_builds_total", "End popup windows built (pooled: normally 1)")
+COALESCED = metrics.counter("panda_alerts_coalesced_total", "Alerts merged into an end popup that was still open")
+
+class EndPopup:
+    """
+    load() -> FrameSet 风格对象（frames / delays / width / height），每次显示前调用（缓存命中很快）；
+    audio 需有 play()/stop()。interval：固定帧间隔毫秒，None 用 GIF 自带延时。
+    modal=True：显示时 transient + grab_set（timer.py 的行为）；False：不抢输入，映射/重绘时刷新当前帧（多屏修复）。
+    """
+    def __init__(self, root, load, audio, interval=None, modal=False, missing="(GIF not found)"):
+        self.root, self._load, self.audio = root, load, audio
+        self.interval, self.modal, self.missing = interval, modal, missing
+        self.top = self._label = self._count = None
+        self._anim, self._frames = None, None
+        self.pending = 0          # 这次打开以来合并的提醒数（关闭清零）
+        self.alerts = 0           # 累计提醒数
+
+    # ---- 状态 ----
+    def _alive(self):
+        try: return self.top is not None and bool(self.top.winfo_exists())
+        except tk.TclError: return False
+
+    @property
+    def visible(self):
+        try: return self._alive() and self.top.state() != "withdrawn"
+        except tk.TclError: return False
+
+    # ---- 构建 ----
+    def prebuild(self):
+        """建好窗口并保持隐藏（启动空闲时调用）；已建好时什么也不做"""
+        if not self._alive(): self._build()
+        return self
+
+    def _build(self):
+        top = self.top = tk.Toplevel(self.root)
+        top.withdraw()
+        top.resizable(False, False)
+        try: top.attributes("-topmost", True)
+        except Exception: pass
+
+        body = tk.Frame(top)
+        body.pack(padx=10, pady=(10, 6))
+        self._label = tk.Label(body)
+        self._label.pack()
+        self._count = tk.Label(body)          # ×N 行：合并了多次提醒时才 pack
+
+        btns = tk.Frame(top)
+        btns.pack(pady=(6, 10))
+        tk.Button(btns, text="Close", width=10, command=self.close).pack()
+
+        # 仅允许 Esc / × 关闭；不绑定整窗点击关闭
+        top.bind("<Escape>", self.close)
+        top.protocol("WM_DELETE_WINDOW", self.close)
+        if self.modal:
+            try: top.transient(self.root)
+            except Exception: pass
+        else:
+            top.bind("<Map>", self._refresh, add="+")
+            top.bind("<Configure>", self._refresh, add="+")
+        self._anim, self._frames = None, None
+        BUILDS.inc()
+
+    def _refresh(self, _=None):
+        if self._anim: self._anim.show()
+
+    def _bind_frames(self):
+        """取帧；与上次是同一组（进程内缓存命中）时沿用现有动画，GIF 换了才换"""
+        fs = self._load()
+        if self._frames is not None and fs.frames is self._frames: return fs
+        if self._anim is not None: self._anim.stop()
+        self._frames, self._anim = fs.frames, None
+        if fs.frames:
+            self._label.config(text="")
+            self._anim = animation_clock(self.root).add(self._label, fs.frames, self.interval or fs.delays)
+        else:
+            self._label.config(image="", text=self.missing)
+        return fs
+
+    def _place(self, fs):
+        w, h = (fs.width, fs.height) if fs else (420, 420)
+        sw, sh = self.top.winfo_screenwidth(), self.top.winfo_screenheight()
+        self.top.geometry(f"+{(sw - w) // 2}+{(sh - h) // 3}")
+
+    # ---- 提醒 / 关闭 ----
+    def alert(self, title="Time's up!"):
+        """到点：隐藏着就出声并显示；已经开着就只合并计数。返回弹窗 Toplevel"""
+        self.alerts += 1
+        if self.visible:
+            self.pending += 1
+            COALESCED.inc()
+            self.top.deiconify()              # 被最小化了也重新露出来
+        else:
+            self.pending = 1
+            self.audio.play()                 # 先出声（后端已预热），再取帧、显示
+            self.prebuild()
+            self._place(self._bind_frames())
+            self.top.deiconify()
+            if self.modal:
+                try: self.top.grab_set()
+                except Exception: pass
+        n = self.pending
+        self.top.title(title if n == 1 else f"{title} (×{n})")
+        if n > 1:
+            self._count.config(text=f"×{n} alerts since this was opened")
+            self._count.pack()
+        else:
+            self._count.pack_forget()
+        try: self.top.lift()
+        except Exception: pass
+        return self.top
+
+    def close(self, _=None):
+        try: self.audio.stop()
+        except Exception: pass
+        self.pending = 0
+        if not self._alive(): return
+        try:
+            if self.modal: self.top.grab_release()
+            self.top.withdraw()
+        except tk.TclError:
+            pass
+
+    def destroy(self):
+        """退出或强制关闭：停动画、销毁窗口（下次提醒重建）"""
+        try: self.audio.stop()
+        except Exception: pass
+        try:
+            if self._anim: self._anim.stop()
+        except Exception: pass
+        try:
+            if self._alive(): self.top.destroy()
+        except tk.TclError: pass
+        self.top, self._anim, self._frames, self.pending = None, None, None, 0
+
+def end_popup(root, load, audio, **options):
+    """每个根窗口一个弹窗；参数以第一次调用为准"""
+    p = getattr(root, "_panda_popup", None)
+    if p is None:
+        p = root._panda_popup = EndPopup(root, load, audio, **options)
+        metrics.gauge("panda_popup_pending_alerts", "Alerts coalesced into the open end popup", lambda: p.pending)
+    return p
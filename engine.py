@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+# ========== 计时引擎（不依赖 tkinter，可被 Tk / 终端 / 基准测试共用） ==========
+import sys, math, time, heapq
+
+from metrics import histogram
+
+# 宿主事件循环把 after 回调推迟了多久（相对排定时刻）；到点那一次另记一份，对应“提醒晚了多少”
+TICK_LATENESS = histogram("panda_tick_lateness_seconds", "Countdown after() callback lateness vs scheduled time")
+DONE_LATENESS = histogram("panda_countdown_done_lateness_seconds", "Countdown on_done lateness vs deadline")
+
+# ---------- 时钟：单调递增，尽量把系统休眠也算进去 ----------
+def _pick_clock():
+    """
+    Linux:  CLOCK_BOOTTIME（单调，且包含挂起时间）
+    macOS:  clock_gettime(CLOCK_MONOTONIC)（包含睡眠；time.monotonic 不包含）
+    其他:   time.monotonic
+    合盖睡眠醒来后，睡过去的时间会一次性从剩余时间里扣掉，而不是顺延。
+    """
+    cid = None
+    if sys.platform.startswith("linux"): cid = getattr(time, "CLOCK_BOOTTIME", None)
+    elif sys.platform == "darwin": cid = getattr(time, "CLOCK_MONOTONIC", None)
+    if cid is not None and hasattr(time, "clock_gettime"):
+        try:
+            time.clock_gettime(cid)
+            return lambda: time.clock_gettime(cid)
+        except OSError:
+            pass
+    return time.monotonic
+
+monotonic = _pick_clock()
+
+# ---------- 基于截止时间的倒计时 ----------
+class Countdown:
+    """
+    存绝对截止时间 deadline，剩余 = deadline - now；不再每秒 remaining -= 1，
+    回调延迟、GC、弹窗构建、休眠都不会累计漂移。
+      after(ms, fn) -> job / cancel(job)：宿主事件循环注入（Tk 下即 root.after / root.after_cancel）
+      on_tick(secs)：显示秒数（向上取整）变化时调用
+      on_done()：到点调用一次（此时 running 已为 False）
+    每次只在下一个显示秒边界之后 WAKE_SLACK_MS 醒来；迟到多久都按真实时间重新计算。
+    """
+    WAKE_SLACK_MS = 5
+
+    def __init__(self, after, cancel, on_tick=None, on_done=None, clock=None):
+        self._after, self._cancel = after, cancel
+        self.on_tick, self.on_done = on_tick, on_done
+        self.clock = clock or monotonic
+        self.running = False
+        self._deadline = None   # 运行中：绝对截止时间
+        self._left = 0.0        # 暂停/停止时：剩余秒数
+        self._job = None
+        self._due = None        # 已排的 after 预计醒来时刻（算迟到用）
+        self._shown = None
+        self.overdue = 0.0      # 最近一次到点时比截止时间晚了多少秒
+
+    # ---- 查询 ----
+    @property
+    def remaining(self):
+        """剩余秒数（浮点）"""
+        if self.running: return max(0.0, self._deadline - self.clock())
+        return self._left
+
+    @property
+    def display_seconds(self):
+        """界面显示用的整数秒（向上取整：还剩 0.3s 显示 00:01）"""
+        return int(math.ceil(self.remaining - 1e-9))
+
+    # ---- 控制 ----
+    def set(self, seconds):
+        """停止并设为 seconds 秒（不触发 on_done）"""
+        self._disarm()
+        self.running, self._left = False, max(0.0, float(seconds))
+        self._emit(force=True)
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self._deadline = self.clock() + self._left
+        self._step()
+
+    def pause(self):
+        if not self.running: return
+        self._left = self.remaining
+        self.running = False
+        self._disarm()
+        self._emit()
+
+    def skip(self):
+        """立即到点：运行中则触发 on_done；暂停中只清零"""
+        was_running = self.running
+        self.set(0)
+        self.overdue = 0.0
+        if was_running and self.on_done: self.on_done()
+
+    # ---- 内部 ----
+    def _disarm(self):
+        self._due = None
+        if self._job is not None:
+            try: self._cancel(self._job)
+            except Exception: pass
+            self._job = None
+
+    def _emit(self, force=False):
+        secs = self.display_seconds
+        if (force or secs != self._shown) and self.on_tick: self.on_tick(secs)
+        self._shown = secs
+
+    def _step(self):
+        self._job = None
+        if not self.running: return
+        now = self.clock()
+        if self._due is not None:
+            TICK_LATENESS.observe(now - self._due)
+            self._due = None
+        left = self._deadline - now
+        if left <= 0:
+            self.running, self._left = False, 0.0
+            self.overdue = -left
+            DONE_LATENESS.observe(-left)
+            self._emit()
+            if self.on_done: self.on_done()
+            return
+        self._emit()
+        if not self.running: return   # on_tick 里可能已经暂停/重置
+        # 到下一个显示值变化（剩余跌破 ceil(left)-1）还差多少
+        until = left - (math.ceil(left - 1e-9) - 1)
+        ms = int(until * 1000) + self.WAKE_SLACK_MS
+        self._due = self.clock() + ms / 1000.0   # on_tick 可能花了时间：按真正排定的时刻算
+        self._job = self._after(ms, self._step)
+
+# ---------- 多个命名计时器：最小堆 + 单个事件循环回调 ----------
+class NamedTimer:
+    __slots__ = ("id", "name", "duration", "deadline", "left", "gen")
+
+    def __init__(self, tid, name, duration):
+        self.id, self.name, self.duration = tid, name, duration
+        self.deadline = None   # 运行中的绝对截止时间；暂停时为 None
+        self.left = duration   # 暂停时的剩余秒数
+        self.gen = 0           # 每次入堆 +1；堆里代数不符的条目视为作废（惰性删除）
+
+    @property
+    def paused(self): return self.deadline is None
+
+class TimerRegistry:
+    """
+    任意数量的命名计时器（泡茶/洗衣/会议提醒等），和主倒计时并行。
+    所有截止时间放进一个最小堆，事件循环里始终只挂一个 after()，指向最早的截止时间；
+    add / resume 为 O(log n)，cancel / pause 只作废堆条目（O(1)，过期条目过多时整体重建堆）。
+    on_fire(timers)：同一次唤醒里到点的计时器一次性交给宿主（按截止时间先后）。
+    """
+    def __init__(self, after, cancel, on_fire=None, clock=None):
+        self._after, self._cancel = after, cancel
+        self.on_fire = on_fire
+        self.clock = clock or monotonic
+        self._timers = {}
+        self._heap = []          # (deadline, id, gen)
+        self._next_id = 1
+        self._job = None
+        self._armed_for = None   # 当前 after() 对应的截止时间
+        self.wakeups = 0
+
+    def __len__(self): return len(self._timers)
+    def __contains__(self, tid): return tid in self._timers
+    def get(self, tid): return self._timers.get(tid)
+
+    def add(self, name, seconds, paused=False):
+        tid, self._next_id = self._next_id, self._next_id + 1
+        t = NamedTimer(tid, name, max(0.0, float(seconds)))
+        self._timers[tid] = t
+        if not paused: self._push(t, self.clock() + t.left)
+        return tid
+
+    def cancel(self, tid):
+        t = self._timers.pop(tid, None)
+        if t is None: return False
+        t.gen += 1
+        self._maybe_compact(); self._rearm()
+        return True
+
+    def pause(self, tid):
+        t = self._timers.get(tid)
+        if t is None or t.paused: return False
+        t.left, t.deadline = max(0.0, t.deadline - self.clock()), None
+        t.gen += 1
+        self._maybe_compact(); self._rearm()
+        return True
+
+    def resume(self, tid):
+        t = self._timers.get(tid)
+        if t is None or not t.paused: return False
+        self._push(t, self.clock() + t.left)
+        return True
+
+    def remaining(self, tid):
+        t = self._timers.get(tid)
+        if t is None: return None
+        return t.left if t.paused else max(0.0, t.deadline - self.clock())
+
+    def next_timer(self):
+        """最早到点的运行中计时器（无则 None）"""
+        self._drop_stale()
+        return self._timers[self._heap[0][1]] if self._heap else None
+
+    def clear(self):
+        self._timers.clear(); self._heap.clear(); self._rearm()
+
+    # ---- 内部 ----
+    def _push(self, t, deadline):
+        t.gen += 1
+        t.deadline = deadline
+        heapq.heappush(self._heap, (deadline, t.id, t.gen))
+        self._rearm()
+
+    def _valid(self, entry):
+        t = self._timers.get(entry[1])
+        return t is not None and t.gen == entry[2]
+
+    def _drop_stale(self):
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _maybe_compact(self):
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._timers):
+            self._heap = [e for e in self._heap if self._valid(e)]
+            heapq.heapify(self._heap)
+
+    def _rearm(self):
+        self._drop_stale()
+        due = self._heap[0][0] if self._heap else None
+        if due == self._armed_for: return
+        if self._job is not None:
+            try: self._cancel(self._job)
+            except Exception: pass
+            self._job = None
+        self._armed_for = due
+        if due is not None:
+            ms = max(0, int(math.ceil((due - self.clock()) * 1000)))
+            self._job = self._after(ms, self._fire)
+
+    def _fire(self):
+        self._job, self._armed_for = None, None
+        self.wakeups += 1
+        now, fired = self.clock(), []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._valid(entry):
+                fired.append(self._timers.pop(entry[1]))
+        self._rearm()
+        if fired and self.on_fire: self.on_fire(fired)
+
+# ---------- 手动倒计时 + 番茄钟状态机（无界面） ----------
+PHASES = ("Idle", "Manual", "Focus", "ShortBreak", "LongBreak")
+
+class TimerEngine:
+    """
+    原 TimerApp 里的计时/番茄钟逻辑，界面无关：Tk、终端、脚本都只是它的视图。
+    after/cancel/clock 由宿主注入；事件用 on(event, fn) 订阅：
+      "tick"     (secs)            显示秒数变化
+      "phase"    (name)            阶段名变化
+      "state"    ()                running / is_pomo 等变化（刷新按钮用）
+      "finished" (phase, skipped)  某阶段到点或被跳过；之后才切到下一阶段
+      "session"  (rec)             同一时刻、"finished" 之前：本段的完整记录（dict，写历史用）
+                                   phase / planned / actual（实际走过的秒数）/ skipped / cycle /
+                                   started_at / ended_at（墙钟 epoch 秒，取自 self.wallclock）
+    """
+    def __init__(self, after, cancel, clock=None):
+        self.countdown = Countdown(after, cancel, on_tick=self._on_tick, on_done=self._on_done, clock=clock)
+        self.total_seconds = 0
+
+        # 番茄钟状态
+        self.is_pomo = False
+        self.focus_minutes = 25
+        self.short_break = 5
+        self.long_break = 15
+        self.cycles_before_long = 4
+        self.current_cycle = 0
+        self.auto_loop = True
+        self.phase = "Idle"   # 见 PHASES
+        self._skipping = False
+        self._handlers = {"tick": [], "phase": [], "state": [], "finished": [], "session": []}
+        # 当前这一段的记录起点（历史日志用）；墙钟可注入，仿真时和 clock 一起走
+        self.wallclock = time.time
+        self._planned = 0.0
+        self._started_at = None
+        self._skip_left = 0.0
+
+    # ---- 订阅 ----
+    def on(self, event, fn):
+        self._handlers[event].append(fn)
+        return fn
+
+    def off(self, event, fn):
+        try: self._handlers[event].remove(fn)
+        except ValueError: pass
+
+    def _emit(self, event, *args):
+        for fn in list(self._handlers[event]): fn(*args)
+
+    # ---- 查询 ----
+    @property
+    def running(self): return self.countdown.running
+
+    @property
+    def remaining(self): return self.countdown.display_seconds
+
+    def snapshot(self):
+        return {"phase": self.phase, "running": self.running, "remaining": self.remaining,
+                "is_pomo": self.is_pomo, "cycle": self.current_cycle}
+
+    # ---- 手动计时 ----
+    def start(self, total=None):
+        """开始/继续手动计时；剩余为 0 时需要给出 total 秒。番茄钟进行中不可用。"""
+        if self.is_pomo or self.running: return False
+        if self.remaining == 0:
+            if not total or total <= 0: return False
+            self.total_seconds = total
+            self.countdown.set(total)
+            self._begin_session(total)
+        self._set_phase("Manual")
+        self.countdown.start(); self._emit("state")
+        return True
+
+    def pause(self):
+        if not self.running: return False
+        self.countdown.pause(); self._emit("state")
+        return True
+
+    def resume(self):
+        """恢复暂停中的计时（手动或番茄钟阶段）"""
+        if self.running: return False
+        if self.is_pomo:
+            if self.phase == "Idle": return False    # 不自动循环时一轮结束停在 Idle：没有可恢复的阶段
+            self.countdown.start(); self._emit("state")
+            return True
+        return self.start()
+
+    def reset(self):
+        self.countdown.set(0)
+        self.is_pomo = False
+        self._set_phase("Idle"); self._emit("state")
+
+    # ---- 番茄钟 ----
+    def start_pomodoro(self, focus=None, short=None, long=None, cycles=None):
+        if focus is not None: self.focus_minutes = max(1, int(focus))
+        if short is not None: self.short_break = max(1, int(short))
+        if long is not None: self.long_break = max(1, int(long))
+        if cycles is not None: self.cycles_before_long = max(1, int(cycles))
+        self.is_pomo = True; self.current_cycle = 0
+        self._start_phase("Focus"); self._emit("state")
+
+    def stop_pomodoro(self):
+        self.is_pomo = False; self.countdown.pause()
+        self._set_phase("Idle"); self.countdown.set(0); self._emit("state")
+
+    def skip_phase(self):
+        """跳过当前阶段：运行中或暂停中都立即结束本段（skipped=True，actual 为已走过的秒数）并切到下一阶段"""
+        paused = not self.running and self.phase != "Idle" and self.countdown.remaining > 0
+        self._skipping, self._skip_left = True, self.countdown.remaining
+        try:
+            self.countdown.skip()
+            if paused: self._on_done()        # 暂停中 Countdown.skip 只清零，不触发 on_done
+        finally: self._skipping = False
+
+    # ---- 内部 ----
+    def _set_phase(self, name):
+        if name != self.phase:
+            self.phase = name
+            self._emit("phase", name)
+
+    def _start_phase(self, name):
+        minutes = {"Focus": self.focus_minutes, "ShortBreak": self.short_break, "LongBreak": self.long_break}[name]
+        self._set_phase(name); self.countdown.set(minutes * 60)
+        self._begin_session(minutes * 60)
+        self.countdown.start()
+
+    def _begin_session(self, planned):
+        self._planned, self._started_at = float(planned), self.wallclock()
+
+    def _on_tick(self, secs): self._emit("tick", secs)
+
+    def _on_done(self):
+        if self.phase == "Idle": return       # 没有进行中的阶段：不记会话、不提醒
+        self._emit("state")
+        if self._handlers["session"]:
+            ended = self.wallclock()
+            left = self._skip_left if self._skipping else 0.0
+            self._emit("session", {"phase": self.phase, "planned": self._planned,
+                                   "actual": max(0.0, self._planned - left), "skipped": self._skipping,
+                                   "cycle": self.current_cycle,
+                                   "started_at": self._started_at if self._started_at is not None else ended,
+                                   "ended_at": ended})
+        self._emit("finished", self.phase, self._skipping)
+        self._skipping = False
+        if not self.is_pomo: return
+        if self.phase == "Focus":
+            self.current_cycle += 1
+            self._start_phase("LongBreak" if self.current_cycle % self.cycles_before_long == 0 else "ShortBreak")
+        elif self.phase in ("ShortBreak", "LongBreak"):
+            if self.auto_loop: self._start_phase("Focus")
+            else: self._set_phase("Idle")
+        self._emit("state")
+
+# ---------- 虚拟时间调度器：无事件循环、无真实等待 ----------
+class SimScheduler:
+    """
+    after/cancel/clock 的纯内存实现，供无界面测试和仿真使用。
+    lag() 返回每个回调额外迟到的秒数（默认 0），用于注入事件循环延迟。
+    """
+    def __init__(self, lag=None, start=0.0):
+        self.now, self.lag = float(start), lag or (lambda: 0.0)
+        self._q, self._seq, self._dead = [], 0, set()
+
+    def clock(self): return self.now
+
+    def after(self, ms, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._q, (self.now + ms / 1000.0 + self.lag(), self._seq, fn, args))
+        return self._seq
+
+    def cancel(self, job): self._dead.add(job)
+
+    def step(self):
+        """执行下一个到期回调；队列空返回 False"""
+        while self._q:
+            t, seq, fn, args = heapq.heappop(self._q)
+            if seq in self._dead:
+                self._dead.discard(seq); continue
+            self.now = max(self.now, t)
+            fn(*args)
+            return True
+        return False
+
+    def run(self, stop=lambda: False):
+        while not stop() and self.step(): pass
+
+    def advance(self, seconds):
+        """把虚拟时间推进 seconds 秒，期间到期的回调按顺序执行"""
+        end = self.now + seconds
+        while self._q and self._q[0][0] <= end:
+            if self._q[0][1] in self._dead:          # 先丢掉已取消的：否则 step() 会越过 end 去执行下一个
+                self._dead.discard(heapq.heappop(self._q)[1]); continue
+            self.step()
+        self.now = max(self.now, end)
+
+# ---------- 真实时间事件循环：select 等文件描述符 + 最早的 after 截止时间 ----------
+class SelectLoop:
+    """
+    没有 Tk 时的宿主循环（终端前端、基准）：after/cancel 与 root.after 同义，
+    add_reader(fd, fn) 相当于 createfilehandler。既没有到期的定时器、也没有可读的 fd 时一直阻塞在 select 里，
+    不轮询；wakeups 统计醒来次数。只能在运行它的线程里调用（跨线程用 dispatch.Dispatcher + add_reader）。
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or monotonic
+        self._q, self._seq, self._dead = [], 0, set()
+        self._readers = {}
+        self._running = False
+        self.wakeups = 0
+
+    def after(self, ms, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._q, (self.clock() + ms / 1000.0, self._seq, fn, args))
+        return self._seq
+
+    def cancel(self, job): self._dead.add(job)
+
+    def add_reader(self, fd, fn): self._readers[fd] = fn
+
+    def remove_reader(self, fd): self._readers.pop(fd, None)
+
+    def stop(self): self._running = False
+
+    def run(self):
+        import select
+        self._running = True
+        while self._running:
+            while self._q and self._q[0][1] in self._dead:
+                self._dead.discard(heapq.heappop(self._q)[1])
+            timeout = max(0.0, self._q[0][0] - self.clock()) if self._q else None
+            if self._readers:
+                ready, _, _ = select.select(list(self._readers), [], [], timeout)
+            elif timeout is None:
+                break                     # 无事可等
+            else:
+                time.sleep(timeout); ready = ()
+            self.wakeups += 1
+            for fd in ready:
+                fn = self._readers.get(fd)
+                if fn: fn()
+            now = self.clock()
+            while self._running and self._q and self._q[0][0] <= now:
+                _, seq, fn, args = heapq.heappop(self._q)
+                if seq in self._dead: self._dead.discard(seq)
+                else: fn(*args)
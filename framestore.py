@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# ========== 有内存上限的帧存储：播放头附近滑动窗口 + 空闲预读 + LRU 淘汰 ==========
+# 以前结束弹窗把 GIF 的每一帧都解码成 PhotoImage 一直留着：500px 的长 GIF 一帧就 1MB（Tk 按 RGBA 存），
+# 上千帧就是上 GB。FrameStore 当作帧列表用（len / 下标 / bool，与 FrameSet.frames 同样的用法），
+# 内存里只留预算内的帧：
+#   - 取帧 store[i] 即把播放头移到 i；未命中当场载入这一帧（misses 计数）
+#   - 播放头后 ahead 帧在事件循环空闲时逐帧预读（after(1) 一次一帧，不连续占用 Tk 线程）
+#   - 超出容量时先淘汰最久没显示过的帧；播放头及其预读窗口内的帧不淘汰
+# 本模块不依赖 tkinter：load(i) 由调用方提供（gifframes.load_bounded_frames 从磁盘缓存的逐帧 PNG 载入）。
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 16 * 1024 * 1024
+DEFAULT_AHEAD = 8
+
+class FrameStore:
+    """
+    count 帧，每帧约 frame_bytes 字节；load(i) -> 帧对象。
+    after(ms, fn) / cancel(job)：宿主调度（Tk 下为 root.after / after_cancel）；不给则不预读，只按需载入。
+    """
+    def __init__(self, count, frame_bytes, load, delays=None, width=0, height=0,
+                 budget=DEFAULT_BUDGET, ahead=DEFAULT_AHEAD, after=None, cancel=None):
+        self.count, self.frame_bytes = count, max(1, frame_bytes)
+        self.width, self.height = width, height
+        self.delays = delays or [100] * count
+        self.budget = budget
+        self.capacity = max(2, budget // self.frame_bytes)
+        self.ahead = max(0, min(ahead, self.capacity - 1, count - 1))
+        self._load, self._after, self._cancel = load, after, cancel
+        self._cache = OrderedDict()    # index -> 帧，末尾 = 最近显示/载入
+        self._job = None
+        self.playhead = 0
+        self.hits = self.misses = self.prefetched = self.evicted = 0
+        self.peak = 0                  # 同时驻留的最多帧数
+
+    # ---- 当作帧列表用 ----
+    def __len__(self): return self.count
+    def __bool__(self): return self.count > 0
+
+    @property
+    def frames(self): return self        # 与 FrameSet 接口一致：fs.frames 交给 AnimationClock
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count: raise IndexError(i)
+        self.playhead = i
+        img = self._cache.get(i)
+        if img is None:
+            self.misses += 1
+            img = self._fetch(i)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(i)
+        self._prefetch_soon()
+        return img
+
+    @property
+    def resident(self): return len(self._cache)
+
+    @property
+    def resident_bytes(self): return len(self._cache) * self.frame_bytes
+
+    def stats(self):
+        return {"frames": self.count, "capacity": self.capacity, "resident": self.resident, "peak": self.peak,
+                "hits": self.hits, "misses": self.misses, "prefetched": self.prefetched, "evicted": self.evicted}
+
+    def truncate(self, count):
+        """帧源实际帧数比预计少（GIF 截断、坏帧）：缩短序列，丢掉越界的已载入帧"""
+        count = max(1, min(count, self.count))
+        if count == self.count: return
+        self.count, self.delays = count, self.delays[:count]
+        for k in [k for k in self._cache if k >= count]: del self._cache[k]
+        self.playhead = min(self.playhead, count - 1)
+        self.ahead = max(0, min(self.ahead, self.capacity - 1, count - 1))
+
+    def close(self):
+        """停预读、丢掉全部已载入帧（弹窗关闭且不再复用时）"""
+        if self._job is not None and self._cancel:
+            try: self._cancel(self._job)
+            except Exception: pass
+        self._job = None
+        self._cache.clear()
+
+    # ---- 内部 ----
+    def _fetch(self, i):
+        self._evict(room=1)            # 先腾位置再载入：任何时刻最多 capacity 帧
+        img = self._load(i)
+        self._cache[i] = img
+        if len(self._cache) > self.peak: self.peak = len(self._cache)
+        return img
+
+    def _window(self):
+        return {(self.playhead + k) % self.count for k in range(self.ahead + 1)}
+
+    def _evict(self, room=0):
+        over = len(self._cache) + room - self.capacity
+        if over <= 0: return
+        keep = self._window()
+        for k in [k for k in self._cache if k not in keep][:over]:
+            del self._cache[k]
+            self.evicted += 1
+
+    def _prefetch_soon(self):
+        if self._after is None or self._job is not None or not self.ahead: return
+        if all((self.playhead + k) % self.count in self._cache for k in range(1, self.ahead + 1)): return
+        self._job = self._after(1, self._prefetch_step)
+
+    def _prefetch_step(self):
+        self._job = None
+        for k in range(1, self.ahead + 1):
+            j = (self.playhead + k) % self.count
+            if j not in self._cache:
+                try: self._fetch(j)
+                except Exception: return          # 源读不出来：留给按需载入时再报
+                self.prefetched += 1
+                break
+        self._prefetch_soon()
@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+# ========== GIF 帧加载与缓存（timer.py / timerMac.py 共用） ==========
+import os, json, shutil, hashlib, tempfile, functools
+import tkinter as tk
+
+from userdirs import user_cache_dir, atomic_write, evict_lru
+from framestore import FrameStore, DEFAULT_BUDGET
+from deltaframes import DeltaFrames, rects_from_pngs, delta_bytes
+
+# ---------- 计算目标尺寸（任意比例，支持放大/缩小） ----------
+def pick_scaled_size(orig_w, orig_h, SCALE, MAX_GIF_SIZE):
+    """
+    返回缩放后的 (宽, 高)，比例不再限于整数 zoom/subsample：
+      - 若 SCALE 为数值：缩放为 1/SCALE（2=缩小一半，1.5=缩到 2/3，0.5=放大2倍）
+      - 否则按 MAX_GIF_SIZE 自动缩放，最长边恰好等于该值
+      - 都不生效或尺寸未知：原样返回
+    """
+    if not orig_w or not orig_h:
+        return orig_w, orig_h
+    ratio = 1.0
+    if SCALE is not None:
+        if float(SCALE) > 0: ratio = 1.0 / float(SCALE)
+    elif MAX_GIF_SIZE and MAX_GIF_SIZE > 0:
+        ratio = MAX_GIF_SIZE / float(max(orig_w, orig_h))
+    return max(1, int(round(orig_w * ratio))), max(1, int(round(orig_h * ratio)))
+
+@functools.lru_cache(maxsize=32)
+def _axis_runs(src_n, dst_n):
+    """
+    单轴最近邻映射（按像素中心取样）压成若干段 (src_from, src_to, dst_at, zoom)：
+    连续源像素 1:1 复制为一段；同一源像素重复 k 次为一段 zoom=k。
+    """
+    src = [min(src_n - 1, (2 * i + 1) * src_n // (2 * dst_n)) for i in range(dst_n)]
+    runs, i = [], 0
+    while i < dst_n:
+        j = i + 1
+        while j < dst_n and src[j] == src[i]: j += 1
+        if j - i > 1:
+            runs.append((src[i], src[i] + 1, i, j - i))
+        else:
+            while j < dst_n and src[j] == src[j - 1] + 1 and (j + 1 >= dst_n or src[j + 1] != src[j]): j += 1
+            runs.append((src[i], src[j - 1] + 1, i, 1))
+        i = j
+    return tuple(runs)
+
+def scale_runs(src_w, src_h, dst_w, dst_h):
+    """scale_photo 的两轴映射 (列, 行)；同一尺寸的一组帧算一次，逐帧传进 scale_photo(runs=...)"""
+    return _axis_runs(src_w, dst_w), _axis_runs(src_h, dst_h)
+
+def scale_photo(src, dst_w, dst_h, master, runs=None):
+    """
+    把 PhotoImage 缩放到任意 dst_w×dst_h（最近邻）。
+    整数倍直接 zoom/subsample；其余情况分两趟按列、按行复制，
+    中间图最多为 max(宽) × max(高) 的一条带，不会像 zoom(z).subsample(s) 那样先放大 z 倍。
+    runs 为 scale_runs(src 宽, src 高, dst_w, dst_h)，不给时现算。
+    """
+    sw, sh = src.width(), src.height()
+    if (sw, sh) == (dst_w, dst_h): return src
+    if dst_w % sw == 0 and dst_h % sh == 0 and dst_w // sw == dst_h // sh:
+        return src.zoom(dst_w // sw)
+    if sw % dst_w == 0 and sh % dst_h == 0 and sw // dst_w == sh // dst_h:
+        return src.subsample(sw // dst_w)
+
+    cols, rows = runs or scale_runs(sw, sh, dst_w, dst_h)    # 中间图与 src 同宽或同高，两轴映射不变
+
+    def copy_cols(dst, img, h):
+        for a, b, at, k in cols:
+            dst.tk.call(dst, "copy", img, "-from", a, 0, b, h, "-to", at, 0,
+                        "-zoom", k, 1, "-compositingrule", "set")
+
+    def copy_rows(dst, img, w):
+        for a, b, at, k in rows:
+            dst.tk.call(dst, "copy", img, "-from", 0, a, w, b, "-to", 0, at,
+                        "-zoom", 1, k, "-compositingrule", "set")
+
+    out = tk.PhotoImage(master=master, width=dst_w, height=dst_h)
+    if dst_w * sh <= sw * dst_h:      # 先做能让中间图更小的那一轴
+        mid = tk.PhotoImage(master=master, width=dst_w, height=sh)
+        copy_cols(mid, src, sh); copy_rows(out, mid, dst_w)
+    else:
+        mid = tk.PhotoImage(master=master, width=sw, height=dst_h)
+        copy_rows(mid, src, sw); copy_cols(out, mid, dst_h)
+    return out
+
+def gif_screen_size(path):
+    """只读 GIF 文件头（10 字节）拿逻辑屏幕尺寸；读不到返回 (0, 0)"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(10)
+    except OSError:
+        return 0, 0
+    if len(head) < 10 or head[:3] != b"GIF":
+        return 0, 0
+    return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+
+# ---------- 单遍 GIF 解析：一次读入，切出每帧的独立 GIF 数据 ----------
+class GifFrame:
+    """单帧信息；data 为只含这一帧的完整 GIF（沿用原逻辑屏幕尺寸、调色板与透明色）"""
+    __slots__ = ("index", "left", "top", "width", "height", "delay_ms", "disposal", "transparent", "data")
+
+    def __init__(self, index, left, top, width, height, delay_ms, disposal, transparent, data):
+        self.index, self.left, self.top, self.width, self.height = index, left, top, width, height
+        self.delay_ms, self.disposal, self.transparent, self.data = delay_ms, disposal, transparent, data
+
+class GifInfo:
+    """整份 GIF 的结构：逻辑屏幕尺寸 + 按顺序排列的帧（帧数预先可知）"""
+    def __init__(self, width, height, frames):
+        self.width, self.height, self.frames = width, height, frames
+
+    def __len__(self): return len(self.frames)
+    def __iter__(self): return iter(self.frames)
+
+def _u16(data, p): return data[p] | (data[p + 1] << 8)
+
+def _skip_subblocks(data, p):
+    while True:
+        n = data[p]
+        p += 1
+        if n == 0: return p
+        p += n
+
+def parse_gif(data):
+    """
+    只扫描块结构、不做 LZW 解码，整体 O(文件大小)。
+    末尾截断的帧直接丢弃；文件头不合法抛 ValueError。
+    """
+    data = bytes(data)
+    if len(data) < 13 or data[:3] != b"GIF":
+        raise ValueError("not a GIF")
+    width, height, flags = _u16(data, 6), _u16(data, 8), data[10]
+    p = 13
+    if flags & 0x80: p += 3 * (2 << (flags & 7))
+    head = data[:p]
+
+    frames, gce = [], None
+    try:
+        while p < len(data):
+            b = data[p]
+            if b == 0x21:                                 # 扩展块
+                q = _skip_subblocks(data, p + 2)
+                if data[p + 1] == 0xF9: gce = (p, q)      # 图形控制扩展：延时/处置/透明色
+                p = q
+            elif b == 0x2C:                               # 图像描述符
+                q = p + 10
+                lflags = data[p + 9]
+                if lflags & 0x80: q += 3 * (2 << (lflags & 7))
+                q = _skip_subblocks(data, q + 1)          # LZW 最小码长 + 数据子块
+                if q > len(data): break
+                delay, disposal, transparent, ext = 0, 0, None, b""
+                if gce:
+                    g = gce[0]
+                    gflags = data[g + 3]
+                    disposal = (gflags >> 2) & 7
+                    delay = _u16(data, g + 4) * 10
+                    if gflags & 1: transparent = data[g + 6]
+                    ext = data[gce[0]:gce[1]]
+                frames.append(GifFrame(len(frames), _u16(data, p + 1), _u16(data, p + 3),
+                                       _u16(data, p + 5), _u16(data, p + 7), delay, disposal,
+                                       transparent, head + ext + data[p:q] + b";"))
+                gce, p = None, q
+            elif b == 0x3B:                               # 结束符
+                break
+            else:
+                break
+    except IndexError:
+        pass
+    return GifInfo(width, height, frames)
+
+def read_gif(path):
+    with open(path, "rb") as f:
+        return parse_gif(f.read())
+
+def gif_photo_frames(info, master):
+    """按顺序逐帧生成 PhotoImage（每帧只解码自身数据）；遇到坏帧即停止"""
+    for frm in info.frames:
+        try:
+            yield tk.PhotoImage(data=frm.data, format="gif", master=master)
+        except Exception:
+            return
+
+# ---------- 每帧延时与处置方式 ----------
+# 浏览器惯例：延时 < 20ms（含 0）的帧按 100ms 播，否则很多“0 延时”GIF 会快得离谱
+MIN_FRAME_DELAY_MS = 20
+DEFAULT_FRAME_DELAY_MS = 100
+
+def frame_delay(ms):
+    return ms if ms >= MIN_FRAME_DELAY_MS else DEFAULT_FRAME_DELAY_MS
+
+def composite_frames(info, photos, master):
+    """
+    按处置方式把各帧合成为整幅画面（逻辑屏幕尺寸）：
+      0/1 保留：下一帧叠在本帧之上；2 恢复背景：本帧区域清成透明；3 恢复上一状态：丢弃本帧
+    Tk 单帧解码得到的是逻辑屏幕大小、帧外透明的图；整幅且（无透明色或底图已空）的帧直接复用，不额外复制。
+    """
+    return list(iter_composited(info, photos, master))
+
+def iter_composited(info, photos, master):
+    """composite_frames 的逐帧版本：任何时刻只持有合成底图和当前帧（流式写磁盘缓存用）"""
+    W, H = info.width, info.height
+    blank = None
+    canvas, clear = None, True          # clear：底图全透明（开头或刚整幅恢复背景）
+    for frm, img in zip(info.frames, photos):
+        full = frm.left == 0 and frm.top == 0 and frm.width >= W and frm.height >= H
+        if full and (clear or frm.transparent is None):
+            cur = img
+        else:
+            cur = tk.PhotoImage(width=W, height=H, master=master)
+            if not clear: cur.tk.call(cur, "copy", canvas)
+            cur.tk.call(cur, "copy", img)   # 默认 overlay：透明像素露出底图
+        yield cur
+        if frm.disposal == 3:
+            continue                        # 底图不变
+        if frm.disposal == 2:
+            if full: canvas, clear = None, True; continue
+            if blank is None: blank = tk.PhotoImage(width=1, height=1, master=master)
+            canvas = tk.PhotoImage(width=W, height=H, master=master)
+            canvas.tk.call(canvas, "copy", cur)
+            canvas.tk.call(canvas, "copy", blank, "-to", frm.left, frm.top,
+                           frm.left + frm.width, frm.top + frm.height, "-compositingrule", "set")
+            clear = False
+        else:
+            canvas, clear = cur, False
+
+# ---------- 已缩放帧集合 ----------
+class FrameSet:
+    """一组已缩放好的 PhotoImage 帧；width/height 为缩放后尺寸（无帧时为 0）；delays 为每帧毫秒数"""
+    def __init__(self, frames=None, width=0, height=0, delays=None):
+        self.frames = frames or []
+        self.width = width
+        self.height = height
+        self.delays = delays or [DEFAULT_FRAME_DELAY_MS] * len(self.frames)
+
+    def __len__(self): return len(self.frames)
+    def __bool__(self): return bool(self.frames)
+
+# ---------- 磁盘缓存：预缩放帧，冷启动直接读 ----------
+# 目录名 = 内容哈希 + 目标尺寸；每帧一张 PNG（Tk 原生读写，保留 GIF 透明色，PPM 会丢），
+# meta.json 最后写入；整个条目先写进 .tmp-* 目录再改名，崩溃只会留下可清理的半成品。
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DISK_CACHE_VERSION = 3   # 3：帧按处置方式合成，meta 带每帧延时
+
+def _disk_key(data, size):
+    return f"{hashlib.sha1(data).hexdigest()}-{size[0]}x{size[1]}-v{DISK_CACHE_VERSION}"
+
+def _disk_load(key, master):
+    try:
+        d = os.path.join(user_cache_dir("frames"), key)
+        with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        frames = [tk.PhotoImage(file=os.path.join(d, f"{i:04d}.png"), format="png", master=master)
+                  for i in range(meta["count"])]
+        w, h, delays = meta["width"], meta["height"], meta["delays"]
+        if not frames or len(delays) != len(frames) or any(f.width() != w or f.height() != h for f in frames):
+            raise ValueError("frame size mismatch")
+    except Exception:
+        shutil.rmtree(d, ignore_errors=True)   # 损坏条目：删掉，随后重新解码
+        return None
+    try: os.utime(d)                           # 刷新 mtime，供 LRU 淘汰
+    except OSError: pass
+    return FrameSet(frames, w, h, delays)
+
+def _disk_meta(key):
+    """条目完整时返回 (目录, meta)，否则 None；不载入任何帧"""
+    d = os.path.join(user_cache_dir("frames"), key)
+    try:
+        with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["count"] <= 0 or len(meta["delays"]) != meta["count"]: raise ValueError("bad meta")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    try: os.utime(d)
+    except OSError: pass
+    return d, meta
+
+class _EntryWriter:
+    """逐帧写一个缓存条目：先写进 .tmp-* 目录，commit() 写 meta.json 后整体改名；失败抛 OSError/TclError"""
+    def __init__(self, key):
+        self.key = key
+        self.root = user_cache_dir("frames")
+        self.final = os.path.join(self.root, key)
+        self.dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        self.count = 0
+
+    def add(self, img):
+        img.write(os.path.join(self.dir, f"{self.count:04d}.png"), format="png")
+        self.count += 1
+
+    def commit(self, width, height, delays):
+        meta = {"count": self.count, "width": width, "height": height, "delays": delays[:self.count]}
+        atomic_write(os.path.join(self.dir, "meta.json"), json.dumps(meta).encode("utf-8"))
+        if os.path.isdir(self.final): self.abort()      # 别处已写好同一条目
+        else: os.replace(self.dir, self.final)
+        self.dir = self.final
+        evict_lru(self.root, DISK_CACHE_MAX_BYTES, keep=(self.key, *_STREAMING.values()))   # 在播的条目比上限还大也不删
+
+    def abort(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+def _disk_store(key, fs):
+    if os.path.isdir(os.path.join(user_cache_dir("frames"), key)): return
+    w = None
+    try:
+        w = _EntryWriter(key)
+        for img in fs.frames: w.add(img)
+        w.commit(fs.width, fs.height, fs.delays)
+    except Exception:
+        if w: w.abort()
+
+def iter_scaled_frames(info, size, master):
+    """逐帧：解码 → 按处置方式合成 → 缩放到 size（size[0] 为 0 时不缩放）；合成帧都是画布大小，映射只算一次"""
+    runs = None
+    for img in iter_composited(info, gif_photo_frames(info, master), master):
+        if not size[0]:
+            yield img; continue
+        if runs is None: runs = scale_runs(img.width(), img.height(), *size)
+        yield scale_photo(img, size[0], size[1], master, runs)
+
+def _decode_scaled(data, size, master):
+    try:
+        info = parse_gif(data)
+    except ValueError:
+        return FrameSet()
+    frames = list(iter_scaled_frames(info, size, master))
+    if not frames: return FrameSet()
+    delays = [frame_delay(frm.delay_ms) for frm in info.frames[:len(frames)]]
+    return FrameSet(frames, frames[0].width(), frames[0].height(), delays)
+
+# ---------- 差分帧（deltaframes.DeltaFrames）：关键帧 + 脏矩形补丁 ----------
+# 脏矩形从磁盘条目的逐帧 PNG 算（每个条目只算一次，结果存进 meta.json 的 rects），
+# 所以新解码的 GIF 要等空闲时写完磁盘才压缩，此前照常用整幅帧。
+# 每帧几乎整幅都在变的 GIF（补丁加显示图反而更占内存）保持整幅帧。
+DELTA_MAX_RATIO = 0.75   # 压缩后不超过整帧列表的这个比例才换
+
+def _entry_rects(d, count):
+    """条目的脏矩形：meta.json 里有就直接用；没有就读 PNG 算一次并写回 meta（null = PNG 格式不支持）"""
+    path = os.path.join(d, "meta.json")
+    with open(path, "r", encoding="utf-8") as f: meta = json.load(f)
+    if "rects" in meta:
+        rects = meta["rects"]
+        return [tuple(r) if r else None for r in rects] if rects and len(rects) == count else None
+    blobs = []
+    for i in range(count):
+        with open(os.path.join(d, f"{i:04d}.png"), "rb") as f: blobs.append(f.read())
+    rects = rects_from_pngs(blobs)
+    meta["rects"] = rects
+    try: atomic_write(path, json.dumps(meta).encode("utf-8"))
+    except OSError: pass
+    return rects
+
+def _compact_from_disk(key, fs):
+    frames = fs.frames
+    if not isinstance(frames, DeltaFrames) or frames.compacted or len(frames) < 2: return
+    try:
+        rects = _entry_rects(os.path.join(user_cache_dir("frames"), key), len(frames))
+    except (OSError, ValueError):
+        return
+    full = len(frames) * fs.width * fs.height * 4
+    if rects is None or delta_bytes(rects, fs.width, fs.height) > DELTA_MAX_RATIO * full: return
+    try: frames.compact(rects)
+    except tk.TclError: pass
+
+def _store_and_compact(key, fs):
+    _disk_store(key, fs)
+    _compact_from_disk(key, fs)
+
+def load_gif_frames(data, master, scale=None, max_size=0):
+    """
+    GIF 字节 → 已缩放 FrameSet（frames 为 DeltaFrames）。先查磁盘缓存；未命中则解码缩放，
+    并在 Tk 空闲时把结果写回磁盘（不拖慢当前这次显示），写完再换成差分帧。
+    """
+    w, h = (_u16(data, 6), _u16(data, 8)) if len(data) >= 10 and data[:3] == b"GIF" else (0, 0)
+    size = pick_scaled_size(w, h, scale, max_size)
+    key = _disk_key(data, size)
+    fs = _disk_load(key, master)
+    if fs is not None:
+        fs.frames = DeltaFrames(fs.frames, master)
+        _compact_from_disk(key, fs)
+        return fs
+    fs = _decode_scaled(data, size, master)
+    if fs:
+        fs.frames = DeltaFrames(fs.frames, master)
+        master.after_idle(_store_and_compact, key, fs)
+    return fs
+
+# ---------- 进程级帧缓存 ----------
+# path -> (key, FrameSet)；key 包含 mtime/size/目标尺寸/Tk 解释器，
+# 文件被替换或 SCALE/MAX_GIF_SIZE 改动导致目标尺寸变化时自动失效，每个 path 只留最新一份
+_FRAME_CACHE = {}
+
+def load_scaled_frames(path, master, scale=None, max_size=0):
+    """
+    载入并缩放 GIF 全部帧；首次使用时查磁盘缓存或解码，之后的弹窗直接复用进程内同一组 PhotoImage。
+    文件不存在/解码失败返回空 FrameSet（不缓存失败结果）。
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return FrameSet()
+    size = pick_scaled_size(*gif_screen_size(path), scale, max_size)
+    key = (st.st_mtime_ns, st.st_size, size, master.tk)
+
+    hit = _FRAME_CACHE.get(path)
+    if hit and hit[0] == key:
+        return hit[1]
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return FrameSet()
+    fs = load_gif_frames(data, master, scale, max_size)
+    if fs: _FRAME_CACHE[path] = (key, fs)
+    else: _FRAME_CACHE.pop(path, None)
+    return fs
+
+def clear_frame_cache():
+    _FRAME_CACHE.clear()
+    for _, fs in _STORE_CACHE.values():
+        if isinstance(fs, FrameStore): fs.close()
+    _STORE_CACHE.clear()
+    _STREAMING.clear()
+
+# ---------- 有内存上限的帧（framestore.FrameStore）：长/大 GIF 不再整组常驻 ----------
+# 帧源是磁盘缓存条目里的逐帧 PNG（已合成、已缩放，可以随机读）。条目还不存在时边播边建：
+# 空闲时逐帧 解码→合成→缩放→写 PNG，任何时刻只持有合成底图和当前帧；建好后改名成正式条目。
+class _BuildingSource:
+    """
+    FrameStore 的 load(i)：条目已完整时读 PNG，否则先把构建推进到第 i 帧。
+    GIF 截断/坏帧使构建提前结束时，已建好的帧照样提交，count 缩成实际帧数并通知 on_count（FrameStore.truncate）；
+    写盘失败（没有磁盘条目可读）时改为在内存里边解码边播：只留当前帧，倒回时从头重新解码。
+    """
+    def __init__(self, master, directory=None, info=None, key=None, size=None, delays=None):
+        self.master, self.dir = master, directory
+        self._info, self._size, self._delays = info, size, delays
+        self._it = self._writer = None
+        self._last = None            # (index, 最近建好/解码的帧)：按需构建时直接交出，不再读回 PNG
+        self.built = 0
+        self.count = None            # 构建结束后的实际帧数（None = 还不知道）
+        self.on_count = None
+        if directory is None:
+            self._writer = _EntryWriter(key)
+            self._it = iter_scaled_frames(info, size, master)
+
+    @property
+    def building(self): return self._writer is not None
+
+    def step(self):
+        """构建下一帧；构建完（或失败）返回 False"""
+        if self._writer is None: return False
+        try:
+            img = next(self._it)
+        except Exception:                    # StopIteration 或坏帧：已建好的部分就是全部
+            self._finish(); return False
+        try:
+            self._writer.add(img)
+        except Exception:                    # 写不进缓存目录：放弃条目，之后边解码边播
+            self._writer.abort(); self._writer = None
+        self._last = (self.built, img)
+        self.built += 1
+        return self._writer is not None
+
+    def _finish(self):
+        self._it = None
+        w, self._writer = self._writer, None
+        self._set_count(self.built)
+        try:
+            w.commit(self._size[0], self._size[1], self._delays)
+            self.dir = w.dir
+        except Exception:
+            w.abort()
+
+    def _set_count(self, n):
+        if n <= 0 or (self.count is not None and n >= self.count): return
+        self.count = n
+        if self.on_count: self.on_count(n)
+
+    def run(self, after):
+        """空闲时逐帧建完整个条目（after(1) 一次一帧，弹窗关了也继续，下次直接读）"""
+        def tick():
+            if self.step(): after(1, tick)
+        after(1, tick)
+
+    def load(self, i):
+        while self._writer is not None and self.built <= i and self.step(): pass
+        if self.count is not None: i = min(i, self.count - 1)      # 截断：停在最后一帧
+        if self._last and self._last[0] == i: return self._last[1]
+        d = self.dir or (self._writer.dir if self._writer else None)
+        if d is None: return self._stream(i)
+        return tk.PhotoImage(file=os.path.join(d, f"{i:04d}.png"), format="png", master=self.master)
+
+    def _stream(self, i):
+        """没有磁盘条目：顺序解码到第 i 帧（要的帧在当前位置之前就从头来），只持有当前帧"""
+        if self._it is None or self._last is None or i < self._last[0]:
+            self._it, self._last = iter_scaled_frames(self._info, self._size, self.master), None
+        while self._last is None or self._last[0] < i:
+            try: img = next(self._it)
+            except Exception:
+                self._it = None
+                if self._last is None: raise IndexError(i) from None
+                self._set_count(self._last[0] + 1)
+                break
+            self._last = (0 if self._last is None else self._last[0] + 1, img)
+        return self._last[1]
+
+_STORE_CACHE = {}    # path -> (key, FrameStore | FrameSet)
+_STREAMING = {}      # path -> 在用 FrameStore 读的磁盘条目名：写新条目做 LRU 淘汰时不删
+
+def load_bounded_frames(path, master, scale=None, max_size=0, budget=DEFAULT_BUDGET):
+    """
+    与 load_scaled_frames 相同的用法（fs.frames / delays / width / height），但帧内存不超过 budget 字节：
+    整组放得下（多数小 GIF）时就是 load_scaled_frames 的结果；放不下时返回 FrameStore，按播放头滑动窗口载入。
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return FrameSet()
+    size = pick_scaled_size(*gif_screen_size(path), scale, max_size)
+    key = (st.st_mtime_ns, st.st_size, size, master.tk, budget)
+    hit = _STORE_CACHE.get(path)
+    if hit and hit[0] == key: return hit[1]
+    if hit and isinstance(hit[1], FrameStore):
+        hit[1].close(); _STREAMING.pop(path, None)
+
+    try:
+        with open(path, "rb") as f: data = f.read()
+        info = parse_gif(data)
+    except (OSError, ValueError):
+        return FrameSet()
+    if not size[0]: size = (info.width, info.height)
+    if not info.frames or len(info) * size[0] * size[1] * 4 <= budget:
+        fs = load_scaled_frames(path, master, scale, max_size)
+    else:
+        dkey = _disk_key(data, size)
+        entry = _disk_meta(dkey)
+        try:
+            if entry:
+                d, meta = entry
+                src, count, delays = _BuildingSource(master, d), meta["count"], meta["delays"]
+            else:
+                delays = [frame_delay(frm.delay_ms) for frm in info.frames]
+                src, count = _BuildingSource(master, None, info, dkey, size, delays), len(info)
+                src.run(master.after)
+        except OSError:                      # 缓存目录不可写：退回整组常驻
+            return load_scaled_frames(path, master, scale, max_size)
+        fs = FrameStore(count, size[0] * size[1] * 4, src.load, delays, size[0], size[1],
+                        budget=budget, after=master.after, cancel=master.after_cancel)
+        src.on_count = fs.truncate
+        _STREAMING[path] = dkey
+    if fs: _STORE_CACHE[path] = (key, fs)
+    return fs
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# ========== 会话历史：只追加的定长二进制日志，缓冲写入、流式读取 ==========
+# 以前专注/休息/手动计时结束后什么都不留，关掉程序就全没了。现在引擎每段结束发出 "session" 事件，
+# 这里把它追加到 user_data_dir()/history.bin：
+#   - 8 字节文件头 + 每条 32 字节定长记录（小端），记录末尾 4 字节 CRC32；按结束先后追加
+#   - append() 先进内存缓冲，满 flush_every 条或显式 flush() 时一次 write + fsync；
+#     崩溃最多丢掉尚未 flush 的几条；写到一半的尾巴下次打开时截掉，CRC 对不上的记录读取时跳过
+#   - iter_sessions() 按块流式解析，内存与文件大小无关；定长记录可按结束时间二分定位起点
+# 不依赖 tkinter，终端前端/统计/基准共用。
+import os, time, struct, zlib
+from collections import namedtuple
+
+from engine import PHASES
+from userdirs import user_data_dir
+
+MAGIC = b"PPHIST\x00\x01"             # 末两字节为格式版本
+_BODY = struct.Struct("<ddffBBH")     # started_at, ended_at, planned, actual, phase, flags, cycle
+_CRC = struct.Struct("<I")
+_ENDED = struct.Struct("<d")          # 只读 ended_at（二分定位用），位于记录偏移 8
+RECORD_SIZE = _BODY.size + _CRC.size  # 32
+FLAG_SKIPPED = 0x01
+
+# 字段与 TimerEngine "session" 事件的 dict 一一对应：Session(**rec)
+Session = namedtuple("Session", "phase planned actual skipped cycle started_at ended_at")
+
+def history_path():
+    return os.path.join(user_data_dir(), "history.bin")
+
+# ---------- 编解码 ----------
+def encode(s):
+    code = PHASES.index(s.phase) if s.phase in PHASES else 0
+    body = _BODY.pack(s.started_at, s.ended_at, s.planned, s.actual, code,
+                      FLAG_SKIPPED if s.skipped else 0, min(max(0, int(s.cycle)), 0xFFFF))
+    return body + _CRC.pack(zlib.crc32(body))
+
+def decode(buf, off=0):
+    """buf[off:off+RECORD_SIZE] → Session；CRC 不符（撕裂写/磁盘损坏）返回 None"""
+    end = off + _BODY.size
+    if zlib.crc32(buf[off:end]) != _CRC.unpack_from(buf, end)[0]: return None
+    started, ended, planned, actual, code, flags, cycle = _BODY.unpack_from(buf, off)
+    return Session(PHASES[code] if code < len(PHASES) else "Idle", planned, actual,
+                   bool(flags & FLAG_SKIPPED), cycle, started, ended)
+
+# ---------- 写 ----------
+def _open_append(path):
+    """打开追加句柄：新文件写文件头；文件头不认识的旧文件改名留底；半条尾巴截掉"""
+    f = open(path, "a+b")
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        f.write(MAGIC); f.flush(); os.fsync(f.fileno())
+        return f, 0
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        os.replace(path, f"{path}.corrupt-{int(time.time())}")
+        return _open_append(path)
+    torn = (size - len(MAGIC)) % RECORD_SIZE
+    if torn:
+        f.truncate(size - torn); f.flush(); os.fsync(f.fileno())
+    return f, torn
+
+class HistoryLog:
+    """
+    只追加的会话日志。append(rec) 接受 Session 或引擎 "session" 事件的 dict；
+    进程退出前调用 close()（内含 flush）。文件在第一次 flush 时才打开。
+    """
+    def __init__(self, path=None, flush_every=16):
+        self._path = path
+        self.flush_every = max(1, int(flush_every))
+        self._buf = []
+        self._f = None
+        self.appended = 0       # append 过的条数
+        self.flushed = 0        # 已落盘的条数
+        self.repaired = 0       # 打开时截掉的残缺字节数
+
+    @property
+    def path(self):
+        if self._path is None: self._path = history_path()
+        return self._path
+
+    @property
+    def pending(self): return len(self._buf)
+
+    def append(self, rec):
+        s = rec if isinstance(rec, Session) else Session(**rec)
+        self._buf.append(encode(s))
+        self.appended += 1
+        if len(self._buf) >= self.flush_every: self.flush()
+        return s
+
+    def flush(self, sync=True):
+        """缓冲一次写出；sync=True 时 fsync，返回本次落盘条数"""
+        if not self._buf: return 0
+        if self._f is None:
+            self._f, self.repaired = _open_append(self.path)
+        n = len(self._buf)
+        self._f.write(b"".join(self._buf)); self._f.flush()
+        if sync: os.fsync(self._f.fileno())
+        self._buf.clear()
+        self.flushed += n
+        return n
+
+    def close(self):
+        try: self.flush()
+        finally:
+            if self._f is not None:
+                self._f.close(); self._f = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+# ---------- 读 ----------
+def count_sessions(path=None):
+    """记录条数（含 CRC 坏的），只看文件大小"""
+    try: size = os.path.getsize(path or history_path())
+    except OSError: return 0
+    return max(0, size - len(MAGIC)) // RECORD_SIZE
+
+def _first_ended_at_or_after(f, n, ts):
+    """二分：第一条 ended_at >= ts 的记录下标（按追加顺序近似有序；改系统时间可能让边界略有偏差）"""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(len(MAGIC) + mid * RECORD_SIZE + 8)
+        if _ENDED.unpack(f.read(_ENDED.size))[0] < ts: lo = mid + 1
+        else: hi = mid
+    return lo
+
+def iter_sessions(path=None, since=None, until=None, chunk=4096, start=0):
+    """
+    按追加顺序逐条产出 Session，每次只读 chunk 条；since/until 为结束时间（epoch 秒）的半开区间。
+    start：从第几条记录开始（增量续读用，见 stats.py）。文件不存在或文件头不认识时什么都不产出。
+    """
+    path = path or history_path()
+    try: f = open(path, "rb")
+    except FileNotFoundError: return
+    with f:
+        if f.read(len(MAGIC)) != MAGIC: return
+        first = max(0, int(start))
+        if since is not None:
+            n = max(0, f.seek(0, os.SEEK_END) - len(MAGIC)) // RECORD_SIZE
+            first = max(first, _first_ended_at_or_after(f, n, since))
+        f.seek(len(MAGIC) + first * RECORD_SIZE)
+        step = max(1, chunk) * RECORD_SIZE
+        while True:
+            buf = f.read(step)
+            usable = len(buf) - len(buf) % RECORD_SIZE
+            if not usable: return
+            mv = memoryview(buf)
+            for off in range(0, usable, RECORD_SIZE):
+                s = decode(mv, off)
+                if s is None: continue
+                if until is not None and s.ended_at >= until: return
+                yield s
+
+# ---------- 流式汇总 ----------
+def summarize(sessions):
+    """单遍汇总，O(阶段数) 内存：{phase: {count, completed, skipped, planned, actual}}（秒）"""
+    out = {}
+    for s in sessions:
+        a = out.get(s.phase)
+        if a is None:
+            a = out[s.phase] = {"count": 0, "completed": 0, "skipped": 0, "planned": 0.0, "actual": 0.0}
+        a["count"] += 1
+        a["skipped" if s.skipped else "completed"] += 1
+        a["planned"] += s.planned
+        a["actual"] += s.actual
+    return out
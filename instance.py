@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# ========== 单实例：锁文件判定主实例，第二次启动把命令行参数经控制套接字转发后立即退出 ==========
+# 以前再次运行 timer.py 会再起一个 Tk、再解码一遍资源、再放一个托盘图标，两个计时器抢同一个 AUDIO。
+# 现在入口最先调用 claim_or_forward()：
+#   - 拿到 user_runtime_dir()/instance.lock 的独占锁 → 本进程是主实例，照常启动（锁随进程退出自动释放）
+#   - 拿不到 → 连已在跑的实例（control.py 客户端），依次发送参数对应的命令，退出
+# 这条路径只导入 control/userdirs，不导入 tkinter；主实例还在启动、套接字未就绪时短暂重试。
+# 命令行：timer.py [--start 10m|90s|25:00|10] [--pomodoro [FOCUS SHORT LONG CYCLES]] [--pause] [--resume]
+#                  [--toggle] [--reset] [--skip] [--stop] [--show]；不带参数的第二次启动 = --show
+# 环境变量 PANDA_POMODORO_SINGLE_INSTANCE=0 关闭单实例（基准测试同时起多个进程时用）；
+# PANDA_POMODORO_CONTROL=0 关掉控制套接字时没处转发，单实例也随之关闭。
+import os, re, sys, time, argparse
+
+from userdirs import user_runtime_dir
+from control import ControlClient, ControlError
+
+# ---------- 锁 ----------
+class InstanceLock:
+    """非阻塞独占锁；持有者进程退出（含崩溃）时由系统释放，不会留下“僵尸锁”"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_runtime_dir(), "instance.lock")
+        self._fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if sys.platform.startswith("win"):
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.ftruncate(fd, 0); os.write(fd, str(os.getpid()).encode("ascii"))   # 仅供排查
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None: return
+        try: os.close(self._fd)    # 关闭即解锁
+        except OSError: pass
+        self._fd = None
+
+# ---------- 参数 → 控制命令 ----------
+_UNITS = re.compile(r"(?:(\d+(?:\.\d*)?)h)?(?:(\d+(?:\.\d*)?)m)?(?:(\d+(?:\.\d*)?)s)?")
+
+def parse_duration(text):
+    """'10m' / '90s' / '1h' / '1h30m' / '25:00' / '10'（纯数字按分钟）→ 秒；负数、空串、无穷大不接受"""
+    t = text.strip().lower()
+    try:
+        if ":" in t:
+            m, s = t.split(":", 1)
+            if not (m.isdigit() and s.isdigit()): raise ValueError
+            return int(m) * 60 + int(s)
+        if re.fullmatch(r"\d+(?:\.\d*)?", t): return float(t) * 60
+        units = _UNITS.fullmatch(t)
+        if not t or units is None: raise ValueError
+        return sum(float(v) * k for v, k in zip(units.groups(), (3600, 60, 1)) if v)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text}") from None
+
+class _Append(argparse.Action):
+    """所有选项按出现顺序追加到同一个命令列表"""
+    def __call__(self, parser, ns, values, option_string=None):
+        cmds = getattr(ns, "cmds", None) or []
+        cmd, build = self.const
+        cmds.append((cmd, build(values)))
+        ns.cmds = cmds
+
+def parse_args(argv, prog="timer.py"):
+    """命令行 → [(命令名, 参数 dict), ...]，命令名与 control.engine_commands 一致"""
+    p = argparse.ArgumentParser(prog=prog, description="Panda Pomodoro")
+    p.set_defaults(cmds=None)
+    p.add_argument("--start", metavar="DURATION", type=parse_duration, action=_Append,
+                   const=("start", lambda v: {"seconds": v}), help="开始手动计时：10m、90s、25:00，纯数字为分钟")
+    p.add_argument("--pomodoro", metavar="N", type=int, nargs="*", action=_Append,
+                   const=("pomodoro.start", lambda v: dict(zip(("focus", "short", "long", "cycles"), v))),
+                   help="开始番茄钟，可选：专注 短休 长休 轮数（分钟/次）")
+    for flag, cmd in (("--pause", "pause"), ("--resume", "resume"), ("--toggle", "toggle"), ("--reset", "reset"),
+                      ("--skip", "pomodoro.skip"), ("--stop", "pomodoro.stop"), ("--show", "show")):
+        p.add_argument(flag, nargs=0, action=_Append, const=(cmd, lambda v: {}))
+    return p.parse_args(argv).cmds or []
+
+# ---------- 转发 ----------
+def forward(commands, timeout=1.0):
+    """发给正在运行的实例；连不上抛 ControlError，命令被拒绝打印原因，返回失败条数"""
+    failed = 0
+    with ControlClient(timeout=timeout) as c:
+        for cmd, args in commands:
+            try: c.call(cmd, **args)
+            except ControlError as e:
+                print(f"{cmd}: {e}", file=sys.stderr); failed += 1
+    return failed
+
+def claim_or_forward(argv, wait=3.0):
+    """
+    返回 (lock, commands)：本进程成为主实例时 lock 为持有的 InstanceLock（单实例关闭时为 None），
+    commands 留给主实例启动后自己执行。已有实例时转发 commands 并 sys.exit。
+    """
+    commands = parse_args(argv)
+    if os.environ.get("PANDA_POMODORO_SINGLE_INSTANCE") == "0": return None, commands
+    if os.environ.get("PANDA_POMODORO_CONTROL") == "0": return None, commands   # 没有套接字可转发
+    try: lock = InstanceLock()
+    except OSError: return None, commands          # 运行目录不可用：按多实例启动
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            if lock.acquire(): return lock, commands
+        except OSError:
+            return None, commands
+        try:
+            sys.exit(1 if forward(commands or [("show", {})]) else 0)
+        except ControlError as e:                   # 主实例还没起好套接字，或已在退出
+            if time.monotonic() > deadline:
+                print(f"Panda Pomodoro is already running but not answering ({e})", file=sys.stderr)
+                sys.exit(1)
+            time.sleep(0.05)
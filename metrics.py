@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# ========== 内置指标：计数器 + 固定桶直方图，Prometheus 文本格式导出 ==========
+# 提醒晚了到底晚在哪：after 回调迟到、弹窗构建（帧解码）、音频起播放进程、托盘初始化……
+# 各热路径上常驻埋点，一次记录 = 一次 bisect + 两次加法；不加锁（只在 Tk 线程或 GIL 下单条语句里更新）。
+# 环境变量 PANDA_POMODORO_METRICS=0 关闭：histogram()/counter() 返回空操作对象，调用点不用改。
+# 导出：
+#   - 控制接口命令 metrics：python control.py metrics 打印文本（给抓取脚本 / node_exporter textfile）
+#   - PANDA_POMODORO_METRICS_FILE=/path/panda.prom：每段结束和退出时原子写一次（不额外排定时器）
+# 剖析：托盘菜单 Profile 30s 或 python control.py profile → cProfile 只剖 Tk 线程，结果写到 user_cache_dir("profiles")
+import os, time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("PANDA_POMODORO_METRICS") != "0"
+TEXTFILE = os.environ.get("PANDA_POMODORO_METRICS_FILE") or None
+
+# 秒：覆盖 0.5ms（正常 tick）到 10s（休眠唤醒 / 卡死）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+_REGISTRY = {}    # name -> 指标，按注册顺序导出
+
+# ---------- 指标类型 ----------
+class Counter:
+    kind = "counter"
+    __slots__ = ("name", "help", "value")
+    def __init__(self, name, help):
+        self.name, self.help, self.value = name, help, 0
+    def inc(self, n=1): self.value += n
+    def samples(self): yield self.name, "", self.value
+
+class Gauge:
+    """导出时才读 fn()（队列长度、待机唤醒率等现成的数），平时零开销"""
+    kind = "gauge"
+    __slots__ = ("name", "help", "fn")
+    def __init__(self, name, help, fn):
+        self.name, self.help, self.fn = name, help, fn
+    def samples(self):
+        try: v = self.fn()
+        except Exception: return
+        if v is not None: yield self.name, "", v
+
+class Histogram:
+    kind = "histogram"
+    __slots__ = ("name", "help", "bounds", "counts", "sum", "count")
+    def __init__(self, name, help, buckets=None):
+        self.name, self.help = name, help
+        self.bounds = tuple(buckets or DEFAULT_BUCKETS)
+        self.counts = [0] * (len(self.bounds) + 1)     # 最后一格 = +Inf
+        self.sum, self.count = 0.0, 0
+
+    def observe(self, v):
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def time(self):
+        """with H.time(): ...  记录块的耗时（秒）"""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """按桶上界估的分位数（秒）；落在 +Inf 桶时返回最大上界"""
+        if not self.count: return None
+        rank, acc = q * self.count, 0
+        for bound, c in zip(self.bounds, self.counts):
+            acc += c
+            if acc >= rank: return bound
+        return self.bounds[-1]
+
+    def samples(self):
+        acc = 0
+        for bound, c in zip(self.bounds, self.counts):
+            acc += c
+            yield self.name + "_bucket", f'{{le="{bound:g}"}}', acc
+        yield self.name + "_bucket", '{le="+Inf"}', self.count
+        yield self.name + "_sum", "", self.sum
+        yield self.name + "_count", "", self.count
+
+class _Timer:
+    __slots__ = ("h", "t0")
+    def __init__(self, h): self.h = h
+    def __enter__(self):
+        self.t0 = time.perf_counter(); return self
+    def __exit__(self, *exc):
+        self.h.observe(time.perf_counter() - self.t0)
+
+class _Null:
+    """关闭时的替身：接口齐全，什么也不做"""
+    count = value = 0
+    def inc(self, n=1): pass
+    def observe(self, v): pass
+    def time(self): return self
+    def quantile(self, q): return None
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+_NULL = _Null()
+
+# ---------- 注册（同名重复注册返回同一个对象） ----------
+def _register(cls, name, *args):
+    if not ENABLED: return _NULL
+    m = _REGISTRY.get(name)
+    if m is None: m = _REGISTRY[name] = cls(name, *args)
+    return m
+
+def counter(name, help): return _register(Counter, name, help)
+def histogram(name, help, buckets=None): return _register(Histogram, name, help, buckets)
+
+def gauge(name, help, fn):
+    """gauge 的 fn 可以重绑（新窗口/新实例替换旧的读数来源）"""
+    g = _register(Gauge, name, help, fn)
+    if g is not _NULL: g.fn = fn
+    return g
+
+# ---------- 导出 ----------
+def render():
+    """Prometheus 文本格式（text/plain; version=0.0.4）"""
+    out = []
+    for m in _REGISTRY.values():
+        out.append(f"# HELP {m.name} {m.help}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        for name, labels, v in m.samples():
+            out.append(f"{name}{labels} {v:.9g}" if isinstance(v, float) else f"{name}{labels} {v}")
+    return "\n".join(out) + "\n"
+
+def write_textfile(path=None):
+    """原子写 Prometheus 文本文件；没配置路径时什么也不做"""
+    path = path or TEXTFILE
+    if not (ENABLED and path): return None
+    from userdirs import atomic_write
+    atomic_write(path, render().encode("utf-8"))
+    return path
+
+# ---------- 剖析：托盘菜单触发，采样一段时间后落盘 ----------
+class Profile:
+    """cProfile 只剖启用它的线程（Tk 线程）；stop() 写 .pstats 和同名 .txt（按累计耗时前 40 行）"""
+    def __init__(self):
+        import cProfile
+        self._prof = cProfile.Profile()
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._prof.enable()
+        return self
+
+    def stop(self, path=None):
+        import io, pstats
+        self._prof.disable()
+        if path is None:
+            from userdirs import user_cache_dir
+            path = os.path.join(user_cache_dir("profiles"), time.strftime("profile-%Y%m%d-%H%M%S.pstats"))
+        self._prof.dump_stats(path)
+        buf = io.StringIO()
+        pstats.Stats(self._prof, stream=buf).sort_stats("cumulative").print_stats(40)
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f: f.write(buf.getvalue())
+        return path
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# ========== 提醒音频的 PCM/WAV 缓存：只转码一次，之后所有后端都直接吃 WAV ==========
+# alert.mp3 每次提醒都要重新解码；Linux 上 aplay 根本不认 MP3，paplay 缺失时整条回退链静默失败。
+# 首次用外部转码器（ffmpeg / afconvert / mpg123，谁在用谁）转成 16-bit PCM WAV，
+# 按源文件 sha1 存进用户缓存目录；之后直接用缓存文件，喂管道时 mmap 整个文件按块写出，不复制进 Python 堆。
+import os, mmap, shutil, hashlib, tempfile, subprocess
+from functools import lru_cache
+
+from userdirs import user_cache_dir, evict_lru
+
+PCM_CACHE_MAX_BYTES = 32 * 1024 * 1024
+PCM_FORMAT = "s16le-44100-2"     # 换格式时改这里，旧缓存自然失效
+WAV_EXTS = (".wav", ".wave")
+
+def _converters(src, dst):
+    """(可执行名, argv)；按优先级"""
+    return (
+        ("ffmpeg",    ["-v", "error", "-y", "-i", src, "-vn", "-acodec", "pcm_s16le",
+                       "-ar", "44100", "-ac", "2", "-f", "wav", dst]),
+        ("afconvert", ["-f", "WAVE", "-d", "LEI16@44100", "-c", "2", src, dst]),   # macOS 自带
+        ("mpg123",    ["-q", "-r", "44100", "--stereo", "-w", dst, src]),
+    )
+
+@lru_cache(maxsize=1)
+def find_converter():
+    """探测一次可用的转码器名；没有则 None"""
+    for name, _ in _converters("", ""):
+        if shutil.which(name): return name
+    return None
+
+def is_wav(path):
+    return os.path.splitext(path or "")[1].lower() in WAV_EXTS
+
+def source_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+    return h.hexdigest()[:16]
+
+def _cache_path(path):
+    return os.path.join(user_cache_dir("pcm"), f"{source_digest(path)}-{PCM_FORMAT}.wav")
+
+def cached_wav(path):
+    """源本身是 WAV 就返回源；否则返回已缓存的 WAV 路径，没有则 None（不触发转码）"""
+    if is_wav(path): return path
+    try:
+        dst = _cache_path(path)
+    except OSError:
+        return None
+    if os.path.isfile(dst) and os.path.getsize(dst) > 44:
+        try: os.utime(dst)
+        except OSError: pass
+        return dst
+    return None
+
+def transcode_to_wav(path, timeout=60):
+    """确保有 WAV 缓存并返回其路径；没有转码器或转码失败返回 None（耗时，别在 UI 线程里调）"""
+    hit = cached_wav(path)
+    if hit: return hit
+    name = find_converter()
+    if not name: return None
+    dst = _cache_path(path)
+    root = os.path.dirname(dst)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".wav", dir=root); os.close(fd)
+    try:
+        argv = dict(_converters(path, tmp))[name]
+        r = subprocess.run([shutil.which(name)] + argv, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=timeout)
+        if r.returncode != 0 or os.path.getsize(tmp) <= 44: return None
+        os.replace(tmp, dst)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    finally:
+        try: os.unlink(tmp)
+        except OSError: pass
+    evict_lru(root, PCM_CACHE_MAX_BYTES, keep={os.path.basename(dst)})
+    return dst
+
+def map_file(path):
+    """只读 mmap 整个文件（多次播放共享同一份页缓存）；空文件或不支持时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
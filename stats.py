@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# ========== 专注统计：随每段结束增量更新的按日/按周列式表，面板查询 O(1) ==========
+# 统计面板要“今天/本周/本轮专注分钟、完成率、连续天数”，但不能每次打开都把 history.bin 从头扫一遍。
+# 做法：
+#   - 每列一个 array('d')，按日序号（date.toordinal）/ 周序号连续存放，另存一份前缀和：区间求和 = 两次下标
+#   - 引擎 "session" 事件到来时 add() 只改最后一格（乱序的旧日期才需要补后缀，极少见）
+#   - 连续天数、本轮累计也随 add() 增量维护
+#   - 快照连同“已折叠的历史条数”写进 user_data_dir()/stats.bin；打开时读快照，只续读之后新增的记录
+# 没有 numpy 依赖：区间聚合靠前缀和，按日序列直接切数组。
+import os, sys, json, struct, datetime
+from array import array
+
+from userdirs import user_data_dir, atomic_write
+import history
+
+COLUMNS = ("focus_s", "focus_done", "focus_skipped", "break_s", "manual_s")
+_MAGIC = b"PPSTAT\x00\x01"
+_HEAD = struct.Struct("<I")        # 快照：MAGIC + 头部 JSON 长度 + JSON + 各列及其前缀和的原始字节
+
+def stats_path():
+    return os.path.join(user_data_dir(), "stats.bin")
+
+def day_of(ts):
+    """epoch 秒 → 本地日序号"""
+    return datetime.date.fromtimestamp(ts).toordinal()
+
+def week_of(day):
+    """日序号 → 周序号（周一开始；ordinal 1 = 公元 1 年 1 月 1 日，星期一）"""
+    return (day - 1) // 7
+
+# ---------- 列式表 ----------
+class _Table:
+    """按连续整数键（日/周序号）存放的若干列，每列附前缀和 cum[i] = sum(col[:i])"""
+    def __init__(self, base=None):
+        self.base = base
+        self.cols = {c: array("d") for c in COLUMNS}
+        self.cum = {c: array("d", [0.0]) for c in COLUMNS}
+
+    def __len__(self): return len(self.cols[COLUMNS[0]])
+
+    @property
+    def end(self):
+        """最后一个键 + 1；空表为 None"""
+        return None if self.base is None else self.base + len(self)
+
+    def _grow(self, key):
+        if self.base is None: self.base = key
+        if key < self.base:                     # 比最早一天还早（改过系统时间）：整体前插
+            pad = self.base - key
+            for c in COLUMNS:
+                self.cols[c] = array("d", bytes(8 * pad)) + self.cols[c]
+                self.cum[c] = array("d", bytes(8 * pad)) + self.cum[c]
+            self.base = key
+        short = key - self.base + 1 - len(self)
+        if short > 0:
+            for c in COLUMNS:
+                self.cols[c].extend(array("d", bytes(8 * short)))
+                self.cum[c].extend(array("d", [self.cum[c][-1]]) * short)
+
+    def add(self, key, values):
+        self._grow(key)
+        i = key - self.base
+        for c, v in values.items():
+            if not v: continue
+            self.cols[c][i] += v
+            cum = self.cum[c]
+            if i == len(cum) - 2: cum[-1] += v          # 常见情况：只动最后一格
+            else:
+                for j in range(i + 1, len(cum)): cum[j] += v
+
+    def sum(self, col, lo, hi):
+        """键区间 [lo, hi) 的列和"""
+        if self.base is None: return 0.0
+        n = len(self)
+        a = min(n, max(0, lo - self.base)); b = min(n, max(0, hi - self.base))
+        return self.cum[col][b] - self.cum[col][a] if b > a else 0.0
+
+    def series(self, col, lo, hi):
+        """键区间 [lo, hi) 的逐项值（表外补 0）"""
+        out = array("d", bytes(8 * max(0, hi - lo)))
+        if self.base is None: return out
+        a, b = max(lo, self.base), min(hi, self.end)
+        if b > a: out[a - lo:b - lo] = self.cols[col][a - self.base:b - self.base]
+        return out
+
+    def value(self, col, key):
+        if self.base is None or not self.base <= key < self.end: return 0.0
+        return self.cols[col][key - self.base]
+
+# ---------- 统计 ----------
+class ProductivityStats:
+    """
+    add(session) 增量折叠一条会话（history.Session 或引擎 "session" dict）。
+    dashboard(now) 给面板用的全部数字，与历史长短无关。
+    watermark：已折叠进来的历史记录条数，快照续读的起点。
+    """
+    def __init__(self):
+        self.days, self.weeks = _Table(), _Table()
+        self.watermark = 0
+        self.run_end, self.run_len, self.best_streak = None, 0, 0   # 以 run_end 结尾的连续专注天数
+        self.cycle_focus_s, self.cycle_done = 0.0, 0                 # 当前这一轮（到长休息为止）
+
+    def add(self, s):
+        if isinstance(s, dict): s = history.Session(**s)
+        self.watermark += 1
+        if s.phase == "Focus":
+            vals = {"focus_s": s.actual, "focus_skipped": 1.0 if s.skipped else 0.0,
+                    "focus_done": 0.0 if s.skipped else 1.0}
+            if s.cycle == 0: self.cycle_focus_s, self.cycle_done = 0.0, 0   # 新开的番茄钟
+            self.cycle_focus_s += s.actual
+            self.cycle_done += 0 if s.skipped else 1
+        elif s.phase in ("ShortBreak", "LongBreak"):
+            vals = {"break_s": s.actual}
+            if s.phase == "LongBreak": self.cycle_focus_s, self.cycle_done = 0.0, 0
+        elif s.phase == "Manual":
+            vals = {"manual_s": s.actual}
+        else:
+            return
+        day = day_of(s.ended_at)
+        self.days.add(day, vals)
+        self.weeks.add(week_of(day), vals)
+        if vals.get("focus_done"): self._extend_streak(day)
+
+    def _extend_streak(self, day):
+        if self.run_end is None or day > self.run_end + 1:
+            self.run_end, self.run_len = day, 1
+        elif day == self.run_end + 1:
+            self.run_end, self.run_len = day, self.run_len + 1
+        elif day < self.run_end:
+            self._rescan_streaks(); return
+        self.best_streak = max(self.best_streak, self.run_len)
+
+    def _rescan_streaks(self):
+        """乱序日期才走这里：按日表重算一遍"""
+        t, run, best, end = self.days, 0, 0, None
+        for i, done in enumerate(t.cols["focus_done"]):
+            run = run + 1 if done else 0
+            if run: end = t.base + i
+            best = max(best, run)
+        self.run_end, self.best_streak = end, best
+        self.run_len = 0
+        if end is not None:
+            i = end - t.base
+            while i >= 0 and t.cols["focus_done"][i]: self.run_len += 1; i -= 1
+
+    # ---- 查询（全部 O(1)，series 为 O(区间长度)） ----
+    def current_streak(self, today):
+        """截至今天的连续专注天数；今天还没完成番茄不算断"""
+        return self.run_len if self.run_end is not None and self.run_end >= today - 1 else 0
+
+    def completion_rate(self, lo=None, hi=None):
+        """日区间 [lo, hi) 内专注段的完成率（未跳过 / 全部）；没有专注段为 None"""
+        t = self.days
+        if t.base is None: return None
+        lo = t.base if lo is None else lo; hi = t.end if hi is None else hi
+        done, skipped = t.sum("focus_done", lo, hi), t.sum("focus_skipped", lo, hi)
+        return done / (done + skipped) if done + skipped else None
+
+    def daily_focus_minutes(self, first_day, n):
+        return [v / 60.0 for v in self.days.series("focus_s", first_day, first_day + n)]
+
+    def dashboard(self, now):
+        today = day_of(now)
+        week = week_of(today)
+        d, w = self.days, self.weeks
+        return {
+            "today_focus_min": d.value("focus_s", today) / 60.0,
+            "today_pomodoros": int(d.value("focus_done", today)),
+            "week_focus_min": w.value("focus_s", week) / 60.0,
+            "week_pomodoros": int(w.value("focus_done", week)),
+            "cycle_focus_min": self.cycle_focus_s / 60.0,
+            "cycle_pomodoros": self.cycle_done,
+            "completion_rate_7d": self.completion_rate(today - 6, today + 1),
+            "completion_rate_all": self.completion_rate(),
+            "streak_days": self.current_streak(today),
+            "best_streak_days": self.best_streak,
+            "total_focus_h": d.sum("focus_s", d.base or 0, d.end or 0) / 3600.0,
+            "last7_focus_min": self.daily_focus_minutes(today - 6, 7),
+            "sessions": self.watermark,
+        }
+
+    # ---- 快照 ----
+    def to_bytes(self):
+        head = {"byteorder": sys.byteorder, "watermark": self.watermark,
+                "days": [self.days.base, len(self.days)], "weeks": [self.weeks.base, len(self.weeks)],
+                "streak": [self.run_end, self.run_len, self.best_streak],
+                "cycle": [self.cycle_focus_s, self.cycle_done]}
+        raw = json.dumps(head).encode("utf-8")
+        parts = [_MAGIC, _HEAD.pack(len(raw)), raw]
+        for t in (self.days, self.weeks):
+            for c in COLUMNS: parts += (t.cols[c].tobytes(), t.cum[c].tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """快照 → 实例；格式/字节序不符或数据不完整时抛 ValueError"""
+        if data[:len(_MAGIC)] != _MAGIC: raise ValueError("not a stats snapshot")
+        off = len(_MAGIC)
+        (n,) = _HEAD.unpack_from(data, off); off += _HEAD.size
+        head = json.loads(data[off:off + n].decode("utf-8")); off += n
+        if head["byteorder"] != sys.byteorder: raise ValueError("byte order mismatch")
+        st = cls()
+        for t, (base, length) in ((st.days, head["days"]), (st.weeks, head["weeks"])):
+            t.base = base
+            for c in COLUMNS:
+                col, cum = array("d"), array("d")
+                size = length * col.itemsize
+                if len(data) < off + 2 * size + cum.itemsize: raise ValueError("truncated snapshot")
+                col.frombytes(data[off:off + size]); off += size
+                cum.frombytes(data[off:off + size + cum.itemsize]); off += size + cum.itemsize
+                t.cols[c], t.cum[c] = col, cum
+        st.watermark = head["watermark"]
+        st.run_end, st.run_len, st.best_streak = head["streak"]
+        st.cycle_focus_s, st.cycle_done = head["cycle"]
+        return st
+
+def load_stats(history_file=None, snapshot=None):
+    """
+    读快照并续读其后新增的历史记录；快照缺失/损坏/比历史还新（历史被删过）时从头折叠一次。
+    返回 (stats, 续读的条数)。
+    """
+    history_file = history_file or history.history_path()
+    snapshot = snapshot or stats_path()
+    total = history.count_sessions(history_file)
+    try:
+        with open(snapshot, "rb") as f: st = ProductivityStats.from_bytes(f.read())
+        if st.watermark > total: raise ValueError("history shorter than snapshot")
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        st = ProductivityStats()
+    start = st.watermark
+    for s in history.iter_sessions(history_file, start=start): st.add(s)
+    st.watermark = total          # CRC 坏的记录也算“已看过”
+    return st, total - start
+
+def save_stats(st, snapshot=None):
+    atomic_write(snapshot or stats_path(), st.to_bytes())
+
+# ---------- 面板文本（Tk / 终端共用） ----------
+_WEEKDAYS = "MTWTFSS"
+
+def format_dashboard(d, now):
+    """dashboard() 的结果排成几行等宽文本"""
+    rate = lambda r: "—" if r is None else f"{r:.0%}"
+    today = day_of(now)
+    days = "  ".join(f"{_WEEKDAYS[(today - 6 + i - 1) % 7]} {m:.0f}" for i, m in enumerate(d["last7_focus_min"]))
+    return "\n".join((
+        f"Today       {d['today_focus_min']:>5.0f} min · {d['today_pomodoros']} pomodoros",
+        f"This week   {d['week_focus_min']:>5.0f} min · {d['week_pomodoros']} pomodoros",
+        f"This cycle  {d['cycle_focus_min']:>5.0f} min · {d['cycle_pomodoros']} pomodoros",
+        f"Completion  {rate(d['completion_rate_7d'])} (7 days) · {rate(d['completion_rate_all'])} (all)",
+        f"Streak      {d['streak_days']} days (best {d['best_streak_days']})",
+        f"Total       {d['total_focus_h']:.1f} h focused · {d['sessions']} sessions",
+        "Last 7 days " + days,
+    ))
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# 测试直接导入仓库根目录下的模块（本项目不是安装包）
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# ========== 提醒音频控制器：后端接口、转码完成后换后端只发生在停声之后，不会关掉正在 play() 的后端 ==========
+import threading, time
+
+import pytest
+
+import audio
+from audio import AudioController, Backend, StubBackend
+
+class Recording(Backend):
+    """记录调用顺序；play() 故意慢一点，close() 撞上正在 play() 就记一笔"""
+    name = "rec"
+    def __init__(self, log):
+        self.log, self.playing, self.clashes = log, False, 0
+    def prepare(self, path):
+        self.path = path; self.log.append(("prepare", path))
+    def play(self):
+        self.playing = True; self.log.append(("play", self.path))
+        time.sleep(0.002)
+        self.playing = False
+    def stop(self): self.log.append(("stop", self.path))
+    def close(self):
+        if self.playing: self.clashes += 1
+        self.log.append(("close", self.path))
+
+@pytest.fixture
+def ctrl(monkeypatch, tmp_path):
+    log, made = [], []
+    def by_name(name):
+        b = Recording(log); made.append(b); return b
+    monkeypatch.setattr(audio, "backend_by_name", by_name)
+    monkeypatch.setenv("PANDA_POMODORO_AUDIO", "rec")
+    c = AudioController(str(tmp_path / "alert.mp3"))
+    c.log, c.made = log, made
+    return c
+
+def test_backend_requires_play():
+    with pytest.raises(TypeError): Backend()
+    class NoPlay(Backend): pass
+    with pytest.raises(TypeError): NoPlay()
+    StubBackend().play()
+
+def test_stale_backend_swapped_only_after_stop(ctrl):
+    ctrl.play()
+    assert ctrl.log == [("prepare", ctrl.path), ("play", ctrl.path)]
+    with ctrl._lock:                                     # 与 _transcode_worker 相同的写法
+        ctrl.play_path, ctrl._stale = "alert.wav", True
+    del ctrl.log[:]
+    ctrl.play()
+    assert ctrl.log == [("stop", ctrl.path), ("close", ctrl.path), ("prepare", "alert.wav"), ("play", "alert.wav")]
+    assert len(ctrl.made) == 2 and ctrl.impl is ctrl.made[1] and not ctrl._stale
+
+def test_swap_never_closes_a_backend_mid_play(ctrl):
+    ctrl.prepare()
+    stop = threading.Event()
+    def worker():                                        # 别的线程：反复标记 stale 并 stop()
+        while not stop.is_set():
+            with ctrl._lock: ctrl._stale = True
+            ctrl.stop()
+    t = threading.Thread(target=worker); t.start()
+    try:
+        for _ in range(100): ctrl.play()
+    finally:
+        stop.set(); t.join()
+    assert len(ctrl.made) > 1                            # 确实换过后端
+    assert sum(b.clashes for b in ctrl.made) == 0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# ========== 控制套接字：真实 ControlServer + SelectLoop 宿主线程，同步客户端走完整协议 ==========
+import os, json, socket, stat, threading
+
+import pytest
+
+import controlserver
+from control import ControlClient, ControlError, read_endpoint
+from controlserver import ControlServer
+from dispatch import Dispatcher
+from engine import SelectLoop
+
+class Host:
+    """后台线程跑 SelectLoop + Dispatcher，扮演 Tk 线程"""
+    def __init__(self):
+        self.loop, self.disp = SelectLoop(), Dispatcher()
+        self.loop.add_reader(self.disp.fileno(), self.disp.drain)
+        self.thread = threading.Thread(target=self.loop.run, name="host", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.disp.post(self.loop.stop)
+        self.thread.join(2.0)
+        self.disp.close()
+
+def commands(seen):
+    def echo(**kw):
+        seen.append(threading.current_thread().name)
+        return kw
+    def refuse(): raise ControlError("not now")
+    return {"echo": echo, "refuse": refuse, "add": lambda a, b: a + b}
+
+@pytest.fixture
+def runtime(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def serve(runtime, monkeypatch):
+    started = []
+    def make(tcp=False):
+        if tcp: monkeypatch.setattr(controlserver, "use_unix_socket", lambda: False)
+        host, seen = Host(), []
+        srv = ControlServer(commands(seen), host.disp.call)
+        srv.start()
+        started.append((srv, host))
+        return srv, seen
+    yield make
+    for srv, host in started:
+        srv.stop(); host.close()
+
+def test_call_response_runs_on_host_thread(serve):
+    srv, seen = serve()
+    with ControlClient() as c:
+        assert c.call("echo", x=1, s="hi") == {"x": 1, "s": "hi"}
+        assert c.call("add", a=2, b=3) == 5
+    assert seen == ["host"]
+    assert srv.requests == 2
+
+def test_errors(serve):
+    serve()
+    with ControlClient() as c:
+        with pytest.raises(ControlError, match="unknown command: nope"): c.call("nope")
+        with pytest.raises(ControlError, match="not now"): c.call("refuse")
+        with pytest.raises(ControlError): c.call("add", a=1)                 # 参数不对：TypeError 回给客户端
+        assert c.call("add", a=1, b=1) == 2                                  # 出错后连接照常可用
+
+def test_unix_socket_is_private(serve, runtime):
+    srv, _ = serve()
+    if "unix" not in srv.endpoint: pytest.skip("no AF_UNIX")
+    assert stat.S_IMODE(os.stat(srv.endpoint["unix"]).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(srv.endpoint["unix"])).st_mode) == 0o700
+    assert read_endpoint()["pid"] == os.getpid()
+
+def test_second_server_refused(serve):
+    serve()
+    with pytest.raises(ControlError, match="already serving"):
+        ControlServer({}, None).start()
+
+def test_tcp_token_rejected(serve):
+    srv, _ = serve(tcp=True)
+    ep = srv.endpoint
+    assert "tcp" in ep and ep["token"]
+    with ControlClient() as c:                                               # control.json 里的令牌
+        assert c.call("echo", ok=True) == {"ok": True}
+    for bad in (dict(ep, token="0" * 32), {k: v for k, v in ep.items() if k != "token"}):
+        with ControlClient(endpoint=bad) as c:
+            with pytest.raises(ControlError, match="bad token"): c.call("echo")
+    assert srv.requests == 1
+
+def test_slow_subscriber_gets_only_the_newest(serve):
+    srv, _ = serve()
+    sub = ControlClient(timeout=5.0)
+    assert sub.call("subscribe") == "subscribed"
+    with ControlClient() as other:                                           # 订阅者不读也不拖住别人
+        n, pad = 300, "x" * 32 * 1024                                        # 套接字缓冲很快写满
+        for i in range(n):
+            srv.publish("tick", {"n": i, "pad": pad})
+        assert other.call("echo", after=True) == {"after": True}            # 排在所有扇出之后：都已处理
+    got = []
+    while not got or got[-1] != n - 1:
+        got.append(json.loads(sub._rf.readline(1 << 20))["n"])
+    assert got == sorted(got) and len(got) < n // 4                          # 中间的被新的覆盖
+    sub.sock.settimeout(0.2)
+    with pytest.raises(socket.timeout): sub._rf.readline()                 # 最新一条之后没有积压
+    sub.close()
+
+def test_subscriber_gets_last_state_on_connect(serve):
+    srv, _ = serve()
+    srv.publish("phase", {"phase": "Focus"})
+    with ControlClient() as sub:
+        assert sub.call("subscribe") == "subscribed"
+        assert json.loads(sub._rf.readline()) == {"event": "phase", "phase": "Focus"}
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# ========== 差分帧：合成的小帧上检查脏矩形精确、补丁回放无损 ==========
+import struct, zlib
+
+import pytest
+
+from deltaframes import dirty_rect, delta_bytes, png_rows, rects_from_pngs
+
+W, H = 12, 9
+
+def blank(color=(0, 0, 0, 0)):
+    return [[color] * W for _ in range(H)]
+
+def paint(frame, x0, y0, x1, y1, color):
+    out = [row[:] for row in frame]
+    for y in range(y0, y1):
+        for x in range(x0, x1): out[y][x] = color
+    return out
+
+def rows_of(frame):
+    """像素 → PNG 扫描行（过滤类型 0 + RGBA）"""
+    return [b"\0" + b"".join(bytes(p) for p in row) for row in frame]
+
+def png_of(frame):
+    """最小的 8 位 RGBA PNG（与 Tk 写出的格式相同）"""
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", W, H, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows_of(frame)))) + chunk(b"IEND", b""))
+
+def apply(frame, rect, src):
+    """把 src 中 rect 区域贴到 frame 上（DeltaFrames 播放时做的事）"""
+    if rect is None: return [row[:] for row in frame]
+    x0, y0, x1, y1 = rect
+    out = [row[:] for row in frame]
+    for y in range(y0, y1): out[y][x0:x1] = src[y][x0:x1]
+    return out
+
+RED, BLUE = (255, 0, 0, 255), (0, 0, 255, 255)
+
+def sprite_frames():
+    """一个 3×2 的方块逐帧右移（含“没变”的一帧、半透明、清回透明）"""
+    base = paint(blank(), 0, 0, W, H, (10, 20, 30, 255))
+    frames = [base]
+    for k in range(1, 7):
+        frames.append(paint(base, k, 2, k + 3, 4, RED))
+    frames.append(frames[-1])                                  # 没变
+    frames.append(paint(frames[-1], 10, 7, 12, 9, (1, 2, 3, 128)))
+    frames.append(paint(frames[-1], 0, 0, 1, 1, (0, 0, 0, 0)))
+    return frames
+
+# ---------- dirty_rect ----------
+def test_dirty_rect_identical_is_none():
+    f = paint(blank(), 2, 2, 5, 5, RED)
+    assert dirty_rect(rows_of(f), rows_of(f), 4) is None
+
+@pytest.mark.parametrize("rect", [(0, 0, 1, 1), (W - 1, H - 1, W, H), (3, 2, 7, 6), (0, 4, W, 5), (5, 0, 6, H),
+                                  (0, 0, W, H)])
+def test_dirty_rect_is_exact(rect):
+    a = paint(blank(), 0, 0, W, H, BLUE)
+    b = paint(a, *rect, RED)
+    assert dirty_rect(rows_of(a), rows_of(b), 4) == rect
+
+def test_dirty_rect_single_channel_change():
+    a = paint(blank(), 0, 0, W, H, BLUE)
+    b = paint(a, 4, 3, 5, 4, (0, 0, 255, 254))                 # 只改了 alpha 一个字节
+    assert dirty_rect(rows_of(a), rows_of(b), 4) == (4, 3, 5, 4)
+
+def test_dirty_rect_bounds_two_separate_changes():
+    a = blank()
+    b = paint(paint(a, 1, 1, 2, 2, RED), 8, 6, 10, 7, RED)
+    assert dirty_rect(rows_of(a), rows_of(b), 4) == (1, 1, 10, 7)
+
+def test_dirty_rect_rgb():
+    a = [b"\0" + bytes(3 * W) for _ in range(H)]
+    b = list(a)
+    b[5] = b"\0" + bytes(3 * 7) + b"\1\1\1" + bytes(3 * (W - 8))
+    assert dirty_rect(a, b, 3) == (7, 5, 8, 6)
+
+# ---------- PNG ----------
+def test_png_rows_round_trip():
+    f = sprite_frames()[3]
+    w, h, bpp, rows = png_rows(png_of(f))
+    assert (w, h, bpp) == (W, H, 4) and rows == rows_of(f)
+
+def test_png_rows_rejects_other_formats():
+    assert png_rows(b"GIF89a") is None
+    assert png_rows(png_of(blank())[:40]) is None              # IDAT 截断
+
+def test_rects_from_pngs_and_lossless_replay():
+    frames = sprite_frames()
+    rects = rects_from_pngs([png_of(f) for f in frames])
+    assert rects[0] == (0, 0, W, H)
+    assert rects[1] == (1, 2, 4, 4)
+    assert rects[2] == (1, 2, 5, 4)                            # 旧位置清掉 + 新位置
+    assert rects[7] is None
+    assert rects[8] == (10, 7, 12, 9) and rects[9] == (0, 0, 1, 1)
+    shown = frames[0]
+    for i in range(1, len(frames)):
+        shown = apply(shown, rects[i], frames[i])
+        assert shown == frames[i]
+
+def test_rects_from_pngs_gives_up_on_a_bad_frame():
+    f = blank()
+    assert rects_from_pngs([png_of(f), b"not a png"]) is None
+
+def test_delta_bytes():
+    rects = [(0, 0, W, H), (1, 2, 4, 4), None, (0, 0, 1, 1)]
+    assert delta_bytes(rects, W, H) == 4 * (2 * W * H + 3 * 2 + 1)
+
+# ---------- DeltaFrames（需要 Tk） ----------
+@pytest.fixture
+def root():
+    tk = pytest.importorskip("tkinter")
+    try: r = tk.Tk()
+    except tk.TclError: pytest.skip("no display")
+    r.withdraw()
+    yield r
+    r.destroy()
+
+def _photo(root, frame):
+    import tkinter as tk
+    img = tk.PhotoImage(master=root, width=W, height=H)
+    for y, row in enumerate(frame):
+        for x, (r, g, b, a) in enumerate(row):
+            if a: img.put(f"#{r:02x}{g:02x}{b:02x}", (x, y))
+            else: img.transparency_set(x, y, True)
+    return img
+
+def _pixels(img):
+    return [[(img.get(x, y), img.transparency_get(x, y)) for x in range(W)] for y in range(H)]
+
+def test_compact_reads_back_losslessly(root):
+    from deltaframes import DeltaFrames
+    # PhotoImage 的透明是二值的：先把半透明归一成不透明
+    frames = [[[(r, g, b, 255 if a else 0) for r, g, b, a in row] for row in f] for f in sprite_frames()]
+    photos = [_photo(root, f) for f in frames]
+    want = [_pixels(p) for p in photos]
+    df = DeltaFrames(photos, root).compact(rects_from_pngs([png_of(f) for f in frames]))
+    assert df.compacted and df.nbytes() < len(frames) * W * H * 4
+    for i in list(range(len(frames))) + [5, 2, 9, 0]:          # 顺序、跳帧、倒回
+        assert _pixels(df[i]) == want[i]
+
+def test_views_do_not_overwrite_each_other(root):
+    from deltaframes import DeltaFrames
+    frames = [[[(r, g, b, 255 if a else 0) for r, g, b, a in row] for row in f] for f in sprite_frames()]
+    photos = [_photo(root, f) for f in frames]
+    want = [_pixels(p) for p in photos]
+    df = DeltaFrames(photos, root)
+    header, popup = df.view(), df.view()
+    header[3]                                                  # 压缩前拿到的是整幅帧
+    df.compact(rects_from_pngs([png_of(f) for f in frames]))
+    a, b = header[4], popup[8]
+    assert a is not b
+    assert _pixels(a) == want[4] and _pixels(b) == want[8]
+    header[5]
+    assert _pixels(b) == want[8]                               # 另一个 view 播下去不影响这一张
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# ========== 跨线程调度器：SelectLoop 宿主线程，检查顺序、不丢、Future、关闭后清空 ==========
+import os, threading
+
+import pytest
+
+from dispatch import Dispatcher
+from engine import SelectLoop
+
+@pytest.fixture
+def host():
+    """后台线程跑 SelectLoop，读端可读即 drain()（相当于 Tk 的 createfilehandler）"""
+    loop, d = SelectLoop(), Dispatcher()
+    loop.add_reader(d.fileno(), d.drain)
+    t = threading.Thread(target=loop.run, name="host", daemon=True)
+    t.start()
+    yield d
+    d.post(loop.stop)
+    t.join(2.0)
+    d.close()
+
+def test_per_producer_order_and_nothing_lost(host):
+    producers, n = 4, 5000
+    seen, done = [], threading.Event()
+    def produce(p):
+        for i in range(n): host.post(seen.append, (p, i))
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    host.post(done.set)
+    assert done.wait(5.0)
+    assert len(seen) == producers * n
+    for p in range(producers):
+        assert [i for q, i in seen if q == p] == list(range(n))
+    st = host.latency_stats()
+    assert st["executed"] == producers * n + 1 and st["pending"] == 0 and st["errors"] == 0
+    assert st["wakeups"] < st["executed"]                  # 多条命令共用一次唤醒
+
+def test_call_returns_result_on_host_thread(host):
+    fut = host.call(lambda a, b: (threading.current_thread().name, a + b), 2, 3)
+    assert fut.result(2.0) == ("host", 5)
+
+def test_call_future_carries_exceptions(host):
+    def boom(): raise KeyError("missing")
+    fut = host.call(boom)
+    with pytest.raises(KeyError, match="missing"): fut.result(2.0)
+    assert host.call(lambda: "still running").result(2.0) == "still running"
+    assert host.errors == 0                                # 异常交给 Future，不算宿主侧错误
+
+def test_post_exception_does_not_stop_the_queue(host):
+    out = []
+    host.post(lambda: 1 / 0)
+    host.post(out.append, "after")
+    assert host.call(lambda: None).result(2.0) is None
+    assert out == ["after"] and host.errors == 1
+
+def test_cancelled_call_is_not_run():
+    d = Dispatcher()
+    ran = []
+    fut = d.call(ran.append, 1)
+    assert fut.cancel()
+    d.drain()
+    assert ran == [] and d.executed == 1
+    d.close()
+
+def test_drain_after_close():
+    d = Dispatcher()
+    out = []
+    d.post(out.append, 1); d.post(out.append, 2)
+    d.close()
+    d.post(out.append, 3)                                  # 关闭后 post 不抛异常
+    d.drain()                                              # 已排队的仍按顺序执行
+    assert out == [1, 2, 3] and d.fileno() == -1
+    d.close()                                              # 重复关闭无害
+
+def test_close_does_not_touch_reused_fds():
+    d = Dispatcher()
+    d.close()
+    a, b = os.pipe()                                       # 很可能拿到刚释放的 fd 号
+    try:
+        os.write(b, b"keep")
+        d.post(lambda: None); d.drain()
+        os.set_blocking(a, False)
+        assert os.read(a, 16) == b"keep"
+    finally:
+        os.close(a); os.close(b)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# ========== Countdown / TimerEngine：SimScheduler 虚拟时间驱动，无界面、无真实等待 ==========
+import pytest
+
+from engine import Countdown, SimScheduler, TimerEngine, TimerRegistry
+
+@pytest.fixture
+def sim():
+    return SimScheduler()
+
+@pytest.fixture
+def engine(sim):
+    e = TimerEngine(sim.after, sim.cancel, clock=sim.clock)
+    e.wallclock = sim.clock
+    e.finished, e.sessions = [], []
+    e.on("finished", lambda phase, skipped: e.finished.append((phase, skipped)))
+    e.on("session", e.sessions.append)
+    return e
+
+def pomodoro(e, **kw):
+    e.start_pomodoro(**{"focus": 1, "short": 1, "long": 2, "cycles": 2, **kw})
+
+# ---------- Countdown ----------
+def test_countdown_ticks_once_per_second_and_finishes(sim):
+    ticks, done = [], []
+    cd = Countdown(sim.after, sim.cancel, on_tick=ticks.append, on_done=lambda: done.append(sim.now), clock=sim.clock)
+    cd.set(3); cd.start()
+    sim.run()
+    assert ticks == [3, 2, 1, 0]
+    assert done == [pytest.approx(3.0, abs=0.01)]
+    assert not cd.running
+
+def test_countdown_does_not_drift_with_late_callbacks():
+    sim = SimScheduler(lag=lambda: 0.3)
+    done = []
+    cd = Countdown(sim.after, sim.cancel, on_done=lambda: done.append(sim.now), clock=sim.clock)
+    cd.set(10); cd.start()
+    sim.run()
+    assert done[0] - 10.0 < 0.35            # 迟到不累计：只晚最后一次回调的量
+
+def test_countdown_pause_keeps_remaining(sim):
+    cd = Countdown(sim.after, sim.cancel, clock=sim.clock)
+    cd.set(60); cd.start()
+    sim.advance(10); cd.pause()
+    sim.advance(100)
+    assert cd.remaining == pytest.approx(50.0)
+    cd.start(); sim.advance(49.9)
+    assert cd.running
+    sim.advance(0.2)
+    assert not cd.running
+
+# ---------- 番茄钟阶段切换 ----------
+def test_focus_then_short_then_long_break(sim, engine):
+    pomodoro(engine)
+    assert engine.phase == "Focus" and engine.running
+    sim.advance(60.1)
+    assert engine.finished == [("Focus", False)]
+    assert engine.phase == "ShortBreak" and engine.current_cycle == 1
+    sim.advance(60.1)
+    assert engine.phase == "Focus"
+    sim.advance(60.1)
+    assert engine.phase == "LongBreak" and engine.current_cycle == 2
+    assert [s["phase"] for s in engine.sessions] == ["Focus", "ShortBreak", "Focus"]
+    assert all(not s["skipped"] and s["actual"] == s["planned"] for s in engine.sessions)
+
+def test_pause_resume_during_phase(sim, engine):
+    pomodoro(engine)
+    sim.advance(10); engine.pause()
+    assert not engine.running and engine.remaining == 50
+    sim.advance(300)
+    assert engine.finished == []
+    assert engine.resume()
+    sim.advance(50.1)
+    assert engine.finished == [("Focus", False)]
+
+# ---------- 跳过 ----------
+def test_skip_while_running(sim, engine):
+    pomodoro(engine)
+    sim.advance(10)
+    engine.skip_phase()
+    assert engine.finished == [("Focus", True)]
+    assert engine.sessions[-1]["skipped"] and engine.sessions[-1]["actual"] == pytest.approx(10.0)
+    assert engine.phase == "ShortBreak" and engine.running
+
+def test_skip_while_paused_ends_phase_immediately(sim, engine):
+    pomodoro(engine)
+    sim.advance(10); engine.pause()
+    engine.skip_phase()
+    assert engine.finished == [("Focus", True)]
+    rec = engine.sessions[-1]
+    assert rec["skipped"] and rec["actual"] == pytest.approx(10.0) and rec["planned"] == 60.0
+    assert engine.phase == "ShortBreak"
+    sim.advance(60.1)                       # 之后不会再把放弃的 Focus 记成完成
+    assert ("Focus", False) not in engine.finished
+
+def test_skip_when_idle_emits_nothing(sim, engine):
+    engine.skip_phase()
+    assert engine.finished == [] and engine.sessions == []
+
+# ---------- 自动循环 ----------
+def test_auto_loop_on_starts_next_focus(sim, engine):
+    pomodoro(engine)
+    sim.advance(120.2)
+    assert engine.phase == "Focus" and engine.running
+
+def test_auto_loop_off_rests_in_idle(sim, engine):
+    engine.auto_loop = False
+    pomodoro(engine)
+    sim.advance(120.2)
+    assert engine.phase == "Idle" and not engine.running
+    n = len(engine.finished)
+    assert not engine.resume()              # Idle 里没有可恢复的阶段：不记假会话、不提醒
+    sim.advance(10)
+    assert len(engine.finished) == n and engine.sessions[-1]["phase"] == "ShortBreak"
+
+# ---------- 手动计时 ----------
+def test_manual_timer(sim, engine):
+    assert engine.start(90)
+    assert engine.phase == "Manual"
+    sim.advance(90.1)
+    assert engine.finished == [("Manual", False)]
+    assert not engine.start()               # 剩余为 0 且没给时长
+
+def test_sim_advance_stops_at_end_past_cancelled_jobs(sim):
+    out = []
+    sim.cancel(sim.after(1000, out.append, "cancelled"))
+    sim.after(5000, out.append, "later")
+    sim.advance(2)
+    assert out == [] and sim.now == 2.0
+    sim.advance(3)
+    assert out == ["later"]
+
+# ---------- TimerRegistry ----------
+class Tracked(SimScheduler):
+    """记下挂着的 after()：被 cancel 或已执行的不算"""
+    def __init__(self):
+        super().__init__()
+        self.pending, self.peak = set(), 0
+    def after(self, ms, fn, *args):
+        def run(*a):
+            self.pending.discard(job); fn(*a)
+        job = super().after(ms, run, *args)
+        self.pending.add(job); self.peak = max(self.peak, len(self.pending))
+        return job
+    def cancel(self, job):
+        super().cancel(job); self.pending.discard(job)
+
+@pytest.fixture
+def reg():
+    sim = Tracked()
+    r = TimerRegistry(sim.after, sim.cancel, clock=sim.clock)
+    r.sim, r.fired = sim, []
+    r.on_fire = lambda ts: r.fired.extend((t.name, sim.now) for t in ts)
+    return r
+
+def test_registry_fires_in_deadline_order_with_one_after(reg):
+    for name, s in (("tea", 3), ("laundry", 10), ("call", 1), ("egg", 3)):
+        reg.add(name, s)
+    assert len(reg.sim.pending) == 1
+    reg.sim.run()
+    assert reg.fired == [("call", 1.0), ("tea", 3.0), ("egg", 3.0), ("laundry", 10.0)]
+    assert reg.sim.peak == 1 and not reg.sim.pending and len(reg) == 0
+    assert reg.wakeups == 3                                  # 同一时刻到点的共用一次唤醒
+
+def test_registry_cancel_then_readd_same_name(reg):
+    a = reg.add("tea", 5)
+    assert reg.cancel(a) and not reg.cancel(a)
+    assert not reg.sim.pending                               # 没有计时器就不挂 after()
+    b = reg.add("tea", 8)
+    assert b != a and a not in reg and reg.get(b).name == "tea"
+    reg.sim.run()
+    assert reg.fired == [("tea", 8.0)]                       # 旧条目作废，不会在 5 秒时误触发
+    assert reg.wakeups == 1
+
+def test_registry_pause_resume_keeps_remaining(reg):
+    a = reg.add("tea", 10); reg.add("egg", 20)
+    reg.sim.advance(4)
+    assert reg.pause(a) and reg.remaining(a) == pytest.approx(6.0)
+    reg.sim.advance(9)
+    assert reg.fired == [] and reg.remaining(a) == pytest.approx(6.0)
+    assert reg.resume(a)
+    reg.sim.run()
+    assert reg.fired == [("tea", 19.0), ("egg", 20.0)]       # 暂停的 9 秒不算
+    assert reg.sim.peak == 1
+
+def test_registry_many_cancels_compact_heap(reg):
+    keep = [reg.add("keep%d" % i, 100 + i) for i in range(10)]
+    for round_ in range(20):
+        for tid in [reg.add("tmp", 1 + round_ + i / 100) for i in range(50)]:
+            reg.cancel(tid)
+        assert len(reg._heap) <= max(64, 2 * len(reg)) + 1  # 作废条目不会无限堆积
+    assert len(reg) == 10 and reg.next_timer().id == keep[0]
+    assert len(reg.sim.pending) == 1 and reg.sim.peak == 1
+    reg.sim.run()
+    assert [n for n, _ in reg.fired] == ["keep%d" % i for i in range(10)]
+    assert reg.wakeups == 10                                 # 作废的截止时间不唤醒
+
+def test_registry_clear_drops_pending_after(reg):
+    for i in range(5): reg.add("t%d" % i, i + 1)
+    reg.clear()
+    assert not reg.sim.pending and len(reg) == 0
+    reg.sim.run()
+    assert reg.fired == [] and reg.wakeups == 0
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# ========== FrameStore：假 load / after，逐步检查驻留内存、淘汰顺序、截断与关闭 ==========
+import pytest
+
+from framestore import FrameStore
+
+FB = 1000                      # 每帧字节数
+
+class FakeHost:
+    """记录 load 调用；after 只排队不执行，由测试逐个 step()"""
+    def __init__(self):
+        self.loads, self.jobs, self.cancelled = [], [], []
+
+    def load(self, i):
+        self.loads.append(i)
+        return f"frame{i}"
+
+    def after(self, ms, fn):
+        self.jobs.append(fn)
+        return fn
+
+    def cancel(self, job):
+        self.cancelled.append(job)
+        self.jobs.remove(job)
+
+    def step(self):
+        self.jobs.pop(0)()
+
+def make(host, count=100, budget=4 * FB, ahead=2, prefetch=True):
+    return FrameStore(count, FB, host.load, budget=budget, ahead=ahead,
+                      after=host.after if prefetch else None, cancel=host.cancel if prefetch else None)
+
+def test_resident_bytes_never_exceed_budget():
+    host = FakeHost()
+    store = make(host, budget=5 * FB, ahead=3)
+    for i in list(range(100)) + [50, 3, 99, 0, 42] + list(range(0, 100, 7)):
+        assert store[i] == f"frame{i}"
+        assert store.resident_bytes <= store.budget
+        for _ in range(4):
+            if not host.jobs: break
+            host.step()
+            assert store.resident_bytes <= store.budget
+    assert store.peak * FB <= store.budget
+    assert store.prefetched > 0 and store.evicted > 0
+
+def test_load_never_runs_with_store_full():
+    """先腾位置再载入：load 被调用时已驻留帧 < capacity"""
+    host = FakeHost()
+    seen = []
+    store = FrameStore(50, FB, lambda i: (seen.append(store.resident), host.load(i))[1],
+                       budget=3 * FB, ahead=2, after=host.after, cancel=host.cancel)
+    for i in range(50):
+        store[i]
+        while host.jobs: host.step()
+    assert max(seen) < store.capacity
+
+def test_evicts_least_recently_shown_first():
+    host = FakeHost()
+    store = make(host, budget=4 * FB, ahead=0, prefetch=False)
+    for i in range(4): store[i]
+    store[1]                               # 命中：1 变成最近显示
+    store[4]                               # 满了：淘汰最久没显示的 0
+    assert list(store._cache) == [2, 3, 1, 4]
+    store[5]                               # 再淘汰 2
+    assert list(store._cache) == [3, 1, 4, 5]
+    host.loads.clear()
+    store[1]; store[0]
+    assert host.loads == [0]               # 1 还在，0 已被淘汰要重新载入
+    assert store.evicted == 3
+
+def test_prefetch_window_is_not_evicted():
+    host = FakeHost()
+    store = make(host, budget=4 * FB, ahead=2)
+    store[10]
+    while host.jobs: host.step()
+    assert {10, 11, 12} <= set(store._cache)
+    host.loads.clear()
+    store[11]; store[12]
+    assert host.loads == []                # 预读过的帧直接命中
+    assert store.prefetched >= 2
+
+def test_truncate_drops_out_of_range_frames():
+    host = FakeHost()
+    store = make(host, count=10, budget=10 * FB, ahead=2)
+    for i in range(6, 10): store[i]
+    store.truncate(5)
+    assert len(store) == 5 and len(store.delays) == 5
+    assert all(k < 5 for k in store._cache)
+    assert store.playhead == 4
+    with pytest.raises(IndexError): store[5]
+    while host.jobs: host.step()           # 预读按新帧数回绕，不越界
+    assert all(k < 5 for k in store._cache)
+    store.truncate(8)                      # 不会变长
+    assert len(store) == 5
+
+def test_close_cancels_pending_prefetch_and_drops_frames():
+    host = FakeHost()
+    store = make(host)
+    store[0]
+    assert len(host.jobs) == 1
+    job = host.jobs[0]
+    store.close()
+    assert host.cancelled == [job] and host.jobs == []
+    assert store.resident == 0 and store.resident_bytes == 0
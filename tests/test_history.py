@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# ========== 会话历史：编解码、CRC、撕裂尾巴、文件头、按时间区间读取、汇总 ==========
+import os
+
+import pytest
+
+from history import (MAGIC, RECORD_SIZE, HistoryLog, Session, count_sessions, decode, encode,
+                     iter_sessions, summarize)
+
+T0 = 1_700_000_000.0
+
+def session(i, phase="Focus", skipped=False):
+    return Session(phase, 1500.0, 1499.5 if not skipped else 600.25, skipped, i % 4,
+                   T0 + i * 2000.0, T0 + i * 2000.0 + 1500.0)
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history.bin")
+
+def write(path, sessions, **kw):
+    with HistoryLog(path, **kw) as log:
+        for s in sessions: log.append(s)
+
+def test_encode_decode_round_trip():
+    for s in (session(0), session(1, "ShortBreak", skipped=True), session(2, "LongBreak"), session(3, "Manual")):
+        buf = encode(s)
+        assert len(buf) == RECORD_SIZE
+        assert decode(buf) == s
+
+def test_append_accepts_engine_dict(path):
+    rec = session(5)._asdict()
+    with HistoryLog(path) as log: log.append(rec)
+    assert list(iter_sessions(path)) == [session(5)]
+
+def test_crc_mismatch_is_skipped(path):
+    write(path, [session(i) for i in range(3)])
+    with open(path, "r+b") as f:                           # 改坏第 2 条的 actual
+        f.seek(len(MAGIC) + RECORD_SIZE + 20); f.write(b"\xff")
+    assert decode(open(path, "rb").read(), len(MAGIC) + RECORD_SIZE) is None
+    assert list(iter_sessions(path)) == [session(0), session(2)]
+    assert count_sessions(path) == 3
+
+def test_torn_trailing_record(path):
+    write(path, [session(i) for i in range(3)])
+    with open(path, "ab") as f: f.write(encode(session(3))[:13])        # 写到一半断电
+    assert list(iter_sessions(path)) == [session(i) for i in range(3)]
+    with HistoryLog(path) as log:                            # 下次打开追加时截掉半条
+        log.append(session(4))
+    assert log.repaired == 13
+    assert list(iter_sessions(path)) == [session(i) for i in (0, 1, 2, 4)]
+    assert (os.path.getsize(path) - len(MAGIC)) % RECORD_SIZE == 0
+
+def test_bad_magic(path):
+    with open(path, "wb") as f: f.write(b"NOTHIST!" + encode(session(0)))
+    assert list(iter_sessions(path)) == []
+    write(path, [session(1)])                               # 认不出的旧文件改名留底，重新开始
+    assert list(iter_sessions(path)) == [session(1)]
+    assert any(n.startswith("history.bin.corrupt-") for n in os.listdir(os.path.dirname(path)))
+
+def test_missing_file(path):
+    assert list(iter_sessions(path)) == [] and count_sessions(path) == 0
+
+def test_flush_every_buffers(path):
+    log = HistoryLog(path, flush_every=3)
+    log.append(session(0)); log.append(session(1))
+    assert log.pending == 2 and count_sessions(path) == 0
+    log.append(session(2))
+    assert log.pending == 0 and count_sessions(path) == 3
+    log.close()
+
+@pytest.mark.parametrize("since_i, until_i", [(0, None), (1, None), (57, None), (99, None), (100, None),
+                                              (None, 10), (20, 40), (33, 34)])
+def test_iter_sessions_since_until(path, since_i, until_i):
+    all_ = [session(i) for i in range(100)]
+    write(path, all_, flush_every=64)
+    since = None if since_i is None else all_[since_i].ended_at if since_i < 100 else T0 * 2
+    until = None if until_i is None else all_[until_i].ended_at
+    want = [s for s in all_ if (since is None or s.ended_at >= since) and (until is None or s.ended_at < until)]
+    assert list(iter_sessions(path, since=since, until=until, chunk=7)) == want
+
+def test_since_between_records(path):
+    all_ = [session(i) for i in range(10)]
+    write(path, all_)
+    assert list(iter_sessions(path, since=all_[4].ended_at - 1)) == all_[4:]
+    assert list(iter_sessions(path, since=all_[4].ended_at + 1)) == all_[5:]
+
+def test_start_offset(path):
+    write(path, [session(i) for i in range(10)])
+    assert list(iter_sessions(path, start=7)) == [session(i) for i in range(7, 10)]
+
+def test_summarize_totals():
+    sessions = [session(0), session(1), session(2, skipped=True), session(3, "ShortBreak"),
+                session(4, "ShortBreak", skipped=True)]
+    out = summarize(sessions)
+    assert out["Focus"] == {"count": 3, "completed": 2, "skipped": 1, "planned": 4500.0,
+                            "actual": 1499.5 * 2 + 600.25}
+    assert out["ShortBreak"] == {"count": 2, "completed": 1, "skipped": 1, "planned": 3000.0,
+                                 "actual": 1499.5 + 600.25}
+    assert summarize([]) == {}
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# ========== 命令行：时长解析、参数 → 控制命令、单实例开关 ==========
+import argparse
+
+import pytest
+
+from instance import claim_or_forward, parse_args, parse_duration
+
+@pytest.mark.parametrize("text, seconds", [
+    ("25m", 1500), ("90s", 90), ("1h", 3600), ("1h30m", 5400), ("1h0m30s", 3630), ("2m30s", 150),
+    ("1.5h", 5400), ("0.5m", 30), ("10", 600), ("2.5", 150), ("25:00", 1500), ("0:45", 45),
+    (" 10M ", 600), ("1H30M", 5400),
+])
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+@pytest.mark.parametrize("text", ["", "abc", "10x", "m", "h30", "1h30", "30m1h", "-5", "-5m", "1:-30", "a:b",
+                                  "inf", "nan", "1e3", "10 m"])
+def test_parse_duration_rejects(text):
+    with pytest.raises(argparse.ArgumentTypeError): parse_duration(text)
+
+@pytest.mark.parametrize("argv, cmds", [
+    ([], []),
+    (["--start", "10m"], [("start", {"seconds": 600})]),
+    (["--start", "1h30m", "--pause"], [("start", {"seconds": 5400}), ("pause", {})]),
+    (["--pomodoro"], [("pomodoro.start", {})]),
+    (["--pomodoro", "50", "10"], [("pomodoro.start", {"focus": 50, "short": 10})]),
+    (["--pomodoro", "25", "5", "15", "4", "--show"],
+     [("pomodoro.start", {"focus": 25, "short": 5, "long": 15, "cycles": 4}), ("show", {})]),
+    (["--reset", "--skip", "--stop", "--toggle", "--resume"],
+     [("reset", {}), ("pomodoro.skip", {}), ("pomodoro.stop", {}), ("toggle", {}), ("resume", {})]),
+])
+def test_parse_args(argv, cmds):
+    assert parse_args(argv) == cmds
+
+@pytest.mark.parametrize("argv", [["--start", "soon"], ["--start"], ["--pomodoro", "x"], ["--bogus"]])
+def test_parse_args_rejects(argv):
+    with pytest.raises(SystemExit): parse_args(argv)
+
+@pytest.mark.parametrize("env", ["PANDA_POMODORO_SINGLE_INSTANCE", "PANDA_POMODORO_CONTROL"])
+def test_single_instance_off(monkeypatch, tmp_path, env):
+    """单实例关闭或没有控制套接字：不拿锁、不转发，直接按独立实例启动"""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.setenv(env, "0")
+    assert claim_or_forward(["--start", "5m"]) == (None, [("start", {"seconds": 300})])
+    assert not any(tmp_path.rglob("instance.lock"))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# ========== 专注统计：增量折叠 == 从头重算；快照往返；续读 == 全量重建；坏快照回退 ==========
+import os, datetime, random, time
+
+import pytest
+
+from history import HistoryLog, Session
+from stats import COLUMNS, ProductivityStats, day_of, load_stats, save_stats, week_of
+
+DAY0 = datetime.date(2024, 3, 4)          # 星期一
+
+def at(day, hour):
+    """第 day 天（从 DAY0 起）本地 hour 点的 epoch 秒"""
+    d = DAY0 + datetime.timedelta(days=day)
+    return time.mktime(datetime.datetime(d.year, d.month, d.day, hour).timetuple())
+
+def synthetic(n, seed=1, first_day=0):
+    """n 条按时间顺序的会话：番茄钟轮次、跳过、手动计时，偶尔空几天"""
+    rnd = random.Random(seed)
+    out, day, hour, cycle = [], first_day, 8, 0
+    for _ in range(n):
+        if hour > 20 or rnd.random() < 0.02:
+            day += 1 + (rnd.random() < 0.2) * rnd.randint(1, 3); hour, cycle = 8, 0
+        r = rnd.random()
+        if r < 0.6:
+            phase, planned = "Focus", 1500.0
+        elif r < 0.9:
+            phase = "LongBreak" if cycle == 3 else "ShortBreak"; planned = 300.0
+        else:
+            phase, planned = "Manual", 600.0
+        skipped = rnd.random() < 0.15
+        actual = float(rnd.randint(30, int(planned))) if skipped else planned
+        end = at(day, hour) + rnd.randint(0, 3000)
+        out.append(Session(phase, planned, actual, skipped, cycle, end - actual, end))
+        if phase == "Focus": cycle += 1
+        if phase == "LongBreak": cycle = 0
+        hour += 1
+    return out
+
+def recompute(sessions):
+    """不用前缀和、不增量：直接按日/周汇总，连续天数按日期集合数"""
+    days, weeks = {}, {}
+    for s in sessions:
+        if s.phase == "Focus":
+            vals = {"focus_s": s.actual, "focus_done": 0.0 if s.skipped else 1.0, "focus_skipped": float(s.skipped)}
+        elif s.phase in ("ShortBreak", "LongBreak"): vals = {"break_s": s.actual}
+        elif s.phase == "Manual": vals = {"manual_s": s.actual}
+        else: continue
+        d = day_of(s.ended_at)
+        for table, key in ((days, d), (weeks, week_of(d))):
+            row = table.setdefault(key, dict.fromkeys(COLUMNS, 0.0))
+            for c, v in vals.items(): row[c] += v
+    done_days = sorted(d for d, row in days.items() if row["focus_done"])
+    best, run = 0, 0
+    for i, d in enumerate(done_days):
+        run = run + 1 if i and d == done_days[i - 1] + 1 else 1
+        best = max(best, run)
+    return days, weeks, best
+
+def assert_matches(st, sessions):
+    days, weeks, best = recompute(sessions)
+    for table, want in ((st.days, days), (st.weeks, weeks)):
+        keys = range(table.base, table.end) if table.base is not None else ()
+        for key in keys:
+            for c in COLUMNS:
+                assert table.value(c, key) == pytest.approx(want.get(key, {}).get(c, 0.0)), (key, c)
+        assert set(want) <= set(keys)
+        for c in COLUMNS:                                       # 前缀和与逐项一致
+            assert table.sum(c, table.base or 0, table.end or 0) == pytest.approx(
+                sum(row[c] for row in want.values()))
+    assert st.best_streak == best
+
+def test_add_matches_recompute():
+    sessions = synthetic(800)
+    st = ProductivityStats()
+    for s in sessions: st.add(s)
+    assert st.watermark == len(sessions)
+    assert_matches(st, sessions)
+
+def test_add_out_of_order_matches_recompute():
+    sessions = synthetic(300, seed=5)
+    shuffled = sessions[:]
+    random.Random(3).shuffle(shuffled)
+    st = ProductivityStats()
+    for s in shuffled: st.add(s._asdict())                      # 引擎事件的 dict 也接受
+    assert_matches(st, sessions)
+
+def test_cycle_and_dashboard():
+    st = ProductivityStats()
+    sessions = [Session("Focus", 1500.0, 1500.0, False, 0, at(0, 9) - 1500, at(0, 9)),
+                Session("ShortBreak", 300.0, 300.0, False, 1, at(0, 9) + 1, at(0, 9) + 301),
+                Session("Focus", 1500.0, 900.0, True, 1, at(0, 10) - 900, at(0, 10)),
+                Session("Focus", 1500.0, 1500.0, False, 0, at(1, 9) - 1500, at(1, 9))]
+    for s in sessions: st.add(s)
+    d = st.dashboard(at(1, 12))
+    assert d["today_pomodoros"] == 1 and d["today_focus_min"] == 25.0
+    assert d["week_pomodoros"] == 2 and d["week_focus_min"] == 65.0
+    assert d["cycle_pomodoros"] == 1 and d["cycle_focus_min"] == 25.0       # cycle 0 重新开一轮
+    assert d["completion_rate_all"] == pytest.approx(2 / 3)
+    assert d["streak_days"] == 2 and d["best_streak_days"] == 2
+    assert d["last7_focus_min"][-2:] == [40.0, 25.0]
+    assert st.dashboard(at(5, 12))["streak_days"] == 0
+
+def test_snapshot_round_trip():
+    st = ProductivityStats()
+    for s in synthetic(500, seed=2): st.add(s)
+    back = ProductivityStats.from_bytes(st.to_bytes())
+    assert back.to_bytes() == st.to_bytes()
+    now = at(30, 12)
+    assert back.dashboard(now) == st.dashboard(now)
+    empty = ProductivityStats.from_bytes(ProductivityStats().to_bytes())
+    assert empty.dashboard(now) == ProductivityStats().dashboard(now)
+
+@pytest.mark.parametrize("data", [b"", b"garbage!", b"PPSTAT\x00\x02rest"])
+def test_from_bytes_rejects_bad_data(data):
+    with pytest.raises(ValueError): ProductivityStats.from_bytes(data)
+
+def test_from_bytes_rejects_truncated():
+    st = ProductivityStats()
+    for s in synthetic(50): st.add(s)
+    with pytest.raises(ValueError): ProductivityStats.from_bytes(st.to_bytes()[:-9])
+
+# ---------- 快照续读 ----------
+@pytest.fixture
+def files(tmp_path):
+    return str(tmp_path / "history.bin"), str(tmp_path / "stats.bin")
+
+def append(path, sessions):
+    with HistoryLog(path, flush_every=1000) as log:
+        for s in sessions: log.append(s)
+
+def rebuild(hp, tmp):
+    st, _ = load_stats(hp, str(tmp / "none.bin"))
+    return st
+
+def test_resume_from_snapshot_equals_rebuild(files, tmp_path):
+    hp, sp = files
+    sessions = synthetic(600, seed=4)
+    append(hp, sessions[:400])
+    st, tail = load_stats(hp, sp)
+    assert tail == 400
+    save_stats(st, sp)
+    append(hp, sessions[400:])
+    resumed, tail = load_stats(hp, sp)
+    assert tail == 200                                          # 只续读新增的
+    assert resumed.to_bytes() == rebuild(hp, tmp_path).to_bytes()
+    assert_matches(resumed, sessions)
+    again, tail = load_stats(hp, sp)                            # 快照没更新：还是续读同样 200 条
+    assert tail == 200 and again.to_bytes() == resumed.to_bytes()
+
+def test_stale_snapshot_falls_back_to_rebuild(files, tmp_path):
+    hp, sp = files
+    sessions = synthetic(300, seed=6)
+    append(hp, sessions)
+    st, _ = load_stats(hp, sp)
+    save_stats(st, sp)
+    os.remove(hp)                                               # 历史被删后重新开始，比快照短
+    append(hp, sessions[:100])
+    st, tail = load_stats(hp, sp)
+    assert tail == 100 and st.watermark == 100
+    assert st.to_bytes() == rebuild(hp, tmp_path).to_bytes()
+
+@pytest.mark.parametrize("damage", [lambda b: b[:len(b) // 2], lambda b: b"junk" + b[4:], lambda b: b""])
+def test_corrupt_snapshot_falls_back_to_rebuild(files, tmp_path, damage):
+    hp, sp = files
+    append(hp, synthetic(200, seed=7))
+    st, _ = load_stats(hp, sp)
+    save_stats(st, sp)
+    with open(sp, "rb") as f: data = f.read()
+    with open(sp, "wb") as f: f.write(damage(data))
+    st, tail = load_stats(hp, sp)
+    assert tail == 200
+    assert st.to_bytes() == rebuild(hp, tmp_path).to_bytes()
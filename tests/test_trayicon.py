@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# ========== 托盘图标缓存：按 (mtime, 大小, px) 命中，原图变了重新生成；非正方形原图等比缩放 + 透明边 ==========
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import trayicon
+from trayicon import load_tray_icon
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("PANDA_POMODORO_CACHE", str(tmp_path / "cache"))
+    return tmp_path / "cache" / "tray"
+
+def save(path, size, color=(200, 0, 0, 255)):
+    Image.new("RGBA", size, color).save(path)
+    return str(path)
+
+def test_wide_source_is_padded_not_stretched(tmp_path):
+    img = load_tray_icon(save(tmp_path / "wide.png", (400, 200)), px=32)
+    assert img.size == (32, 32)
+    assert img.getpixel((16, 16))[3] == 255
+    assert img.getpixel((16, 2))[3] == 0 and img.getpixel((16, 29))[3] == 0   # 上下留透明边
+    assert img.getbbox() == (0, 8, 32, 24)
+
+def test_tall_source_is_padded(tmp_path):
+    img = load_tray_icon(save(tmp_path / "tall.png", (100, 300)), px=30)
+    assert img.size == (30, 30) and img.getbbox() == (10, 0, 20, 30)
+
+def test_cache_hit_does_not_decode_source(tmp_path, monkeypatch, cache):
+    src = save(tmp_path / "tray.png", (256, 256))
+    load_tray_icon(src, px=24)
+    assert any(p.name.endswith("-24.png") for p in cache.iterdir())
+    monkeypatch.setattr(trayicon, "_build_variants", lambda *a: pytest.fail("rebuilt on a cache hit"))
+    assert load_tray_icon(src, px=24).size == (24, 24)
+
+def test_changed_source_rebuilds(tmp_path):
+    src = save(tmp_path / "tray.png", (64, 64), (255, 0, 0, 255))
+    assert load_tray_icon(src, px=16).getpixel((8, 8))[:3] == (255, 0, 0)
+    st = os.stat(src)
+    save(tmp_path / "tray.png", (64, 64), (0, 0, 255, 255))
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # 同一秒内改写也要换键
+    assert load_tray_icon(src, px=16).getpixel((8, 8))[:3] == (0, 0, 255)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# ========== 终端行内差分：输出串喂给一个最小的终端模拟，结果必须与整行重画一致 ==========
+import re, unicodedata
+
+import pytest
+
+from tui import CLEAR_EOL, line_diff
+
+def width(ch):
+    if unicodedata.combining(ch): return 0
+    return 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+
+class Term:
+    """单行终端：光标左右移动、回车、清到行尾；宽字符占两格（第二格为 None），组合符并进前一格"""
+    def __init__(self, text=""):
+        self.cells, self.col = [], 0
+        self.feed(text)
+
+    def put(self, ch):
+        w = width(ch)
+        if w == 0:
+            c = self.col - 1
+            if self.cells[c] is None: c -= 1
+            self.cells[c] += ch; return
+        while len(self.cells) < self.col + w: self.cells.append(" ")
+        for c in range(self.col, self.col + w):               # 盖住半个宽字符：整个宽字符都没了
+            if self.cells[c] is None: self.cells[c - 1] = " "
+            elif c + 1 < len(self.cells) and self.cells[c + 1] is None and width(self.cells[c][0]) == 2:
+                self.cells[c + 1] = " "
+        self.cells[self.col] = ch
+        if w == 2: self.cells[self.col + 1] = None
+        self.col += w
+
+    def feed(self, seq):
+        for m in re.finditer(r"\x1b\[(\d*)([CDK])|\r|.", seq, re.S):
+            tok = m.group(0)
+            if tok == "\r": self.col = 0
+            elif m.group(2) == "C": self.col += int(m.group(1) or 1)
+            elif m.group(2) == "D": self.col -= int(m.group(1) or 1)
+            elif m.group(2) == "K": del self.cells[self.col:]
+            else: self.put(tok)
+        return self
+
+    @property
+    def text(self):
+        return "".join(c for c in self.cells if c is not None).rstrip(" ")
+
+def apply(old, new):
+    t = Term(old)
+    seq, col = line_diff(old, new, t.col)
+    t.feed(seq)
+    assert t.text == new.rstrip(" ") and t.col == col
+    return seq
+
+def test_same_line_writes_nothing():
+    assert line_diff("12:34 Focus", "12:34 Focus", 11) == ("", 11)
+    assert line_diff("", "", 0) == ("", 0)
+
+def test_suffix_change_writes_only_that_char():
+    seq = apply("24:59 Focus running", "24:58 Focus running")
+    assert seq == "\x1b[15D8" or seq == "\r\x1b[4C8"
+    assert line_diff("24:59", "24:58", 5) == ("\x1b[1D8", 5)
+
+def test_nearby_changes_merge():
+    assert line_diff("19:59", "20:00", 5) == ("\r20:00", 5)      # 四处改动相隔很近：一段重写
+
+def test_shorter_line_clears_to_eol():
+    seq = apply("25:00 Focus (paused)", "25:00 Focus")
+    assert seq.endswith(CLEAR_EOL)
+    assert line_diff("abc", "", 3) == ("\r" + CLEAR_EOL, 0)
+    assert CLEAR_EOL not in apply("12:00 Short", "12:00 Longer")
+
+def test_longer_line_appends():
+    assert line_diff("05:00", "05:00 done", 5) == (" done", 10)
+
+@pytest.mark.parametrize("old, new", [
+    ("专注 24:59", "专注 24:58"),
+    ("专注 24:59", "休息 24:59"),
+    ("24:59 专注中", "24:59 专注"),
+    ("Focus 25:00", "专注 25:00"),
+    ("专注 25:00", "Focus 25:00"),
+    ("a中b", "中中b"),
+    ("中x", "abx"),
+    ("abc", "a中"),
+    ("ｆｕｌｌ 01", "ｆｕｌｌ 02"),
+    ("café 01", "cafè 01"),
+])
+def test_wide_and_combining_characters(old, new):
+    apply(old, new)
+
+def test_wide_chars_move_by_columns():
+    seq, col = line_diff("专注 24:59", "专注 24:58", 10)
+    assert seq == "\x1b[1D8" and col == 10                       # 两个汉字占 4 列，不是 2 列
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_lines_match_full_redraw(seed):
+    import random
+    rnd = random.Random(seed)
+    alphabet = "ab :0123456789专注休息ｆ́"
+    def line():
+        s = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 14)))
+        return s.lstrip("́")
+    old = line()
+    for _ in range(10):
+        new = line()
+        apply(old, new)
+        old = new
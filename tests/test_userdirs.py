@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# ========== 原子写：内容完整、失败不留半成品、replace 前后各 fsync 一次 ==========
+import os, stat
+
+import pytest
+
+import userdirs
+from userdirs import atomic_write
+
+def test_atomic_write_replaces(tmp_path):
+    p = tmp_path / "a.bin"
+    p.write_bytes(b"old")
+    atomic_write(str(p), b"new data")
+    assert p.read_bytes() == b"new data"
+    assert [f.name for f in tmp_path.iterdir()] == ["a.bin"]
+
+def test_atomic_write_fsyncs_file_then_dir(tmp_path, monkeypatch):
+    p, calls = str(tmp_path / "a.bin"), []
+    real_fsync, real_replace = os.fsync, os.replace
+    def fsync(fd):
+        calls.append("dir" if stat.S_ISDIR(os.fstat(fd).st_mode) else "file")
+        real_fsync(fd)
+    monkeypatch.setattr(userdirs.os, "fsync", fsync)
+    monkeypatch.setattr(userdirs.os, "replace", lambda a, b: (calls.append("replace"), real_replace(a, b)))
+    atomic_write(p, b"x")
+    want = ["file", "replace", "dir"] if os.name == "posix" else ["file", "replace"]
+    assert calls == want
+
+def test_atomic_write_failure_keeps_old_file(tmp_path, monkeypatch):
+    p = tmp_path / "a.bin"
+    p.write_bytes(b"old")
+    def boom(a, b): raise OSError("disk full")
+    monkeypatch.setattr(userdirs.os, "replace", boom)
+    with pytest.raises(OSError): atomic_write(str(p), b"new")
+    assert p.read_bytes() == b"old"
+    assert [f.name for f in tmp_path.iterdir()] == ["a.bin"]
@@ -1,9 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, sys, platform, shutil, subprocess, threading, base64, io, re
+import os, sys, time, threading, base64, io, re, traceback
+_T0 = time.perf_counter()  # 启动计时起点（见 _startup_probe）
+# 单实例：已有实例在跑就把命令行参数转发过去并立即退出——这之前不导入 tkinter 等重模块（见 instance.py）
+if __name__ == "__main__":
+    from instance import claim_or_forward
+    _INSTANCE_LOCK, _ARGV_COMMANDS = claim_or_forward(sys.argv[1:])
 import tkinter as tk
 from tkinter import messagebox, Toplevel
 
+from engine import TimerEngine, TimerRegistry
+from gifframes import load_bounded_frames, load_gif_frames
+from endpopup import end_popup
+from trayicon import load_tray_icon, TrayBadge
+from audio import AudioController, beep_fallback as _beep_fallback
+from animclock import animation_clock, wakeup_counter
+from viewstate import ViewDiffer
+from history import HistoryLog
+from stats import ProductivityStats, load_stats, save_stats, format_dashboard
+from dispatch import tk_dispatcher
+from control import ControlError, engine_commands
+import metrics
+
 # ========== 资源路径助手：源码 & PyInstaller 兼容 ==========
 def resource_path(rel: str) -> str:
     base = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
@@ -13,202 +31,56 @@ def resource_path(rel: str) -> str:
 END_GIF_PATH   = resource_path("timer Lee.gif")   # 结束弹窗 GIF
 END_AUDIO_PATH = resource_path("alert.mp3")       # 结束时播放的音频
 TRAY_ICON_PATH = resource_path("tray.png")        # ← 托盘 PNG 图标（你自己换路径/文件名）
+TRAY_SHOW_MINUTES = True                          # 计时中托盘图标角标显示剩余分钟
 
 # GIF 缩放策略（二选一）：
-SCALE = None        # 手动比例：None=不用手动；整数>=1=缩小为 1/SCALE；小数<1=放大为 1/SCALE（0.5=放大2倍）
-MAX_GIF_SIZE = 500  # 自动目标尺寸：最长边尽量接近该像素（仅当 SCALE 为 None；≤0 关闭自动）
-ANIM_INTERVAL_MS = 100  # 结束弹窗 GIF 播放间隔
+SCALE = None        # 手动比例：None=不用手动；任意正数，缩放为 1/SCALE（2=缩小一半，1.5=缩到2/3，0.5=放大2倍）
+MAX_GIF_SIZE = 500  # 自动目标尺寸：最长边缩放到该像素（仅当 SCALE 为 None；≤0 关闭自动）
+ANIM_INTERVAL_MS = None  # 结束弹窗 GIF 播放间隔：None=按 GIF 每帧自带延时；填毫秒数则强制固定间隔
+FRAME_MEMORY_BUDGET = 16 * 1024 * 1024  # 结束弹窗 GIF 解码帧的内存上限（字节）；超出时只留播放头附近的帧，其余按需从磁盘缓存载入
+
+# 启动策略：True=先画出主窗口，托盘（pystray/PIL/图标解码）、页眉 GIF、音频后端探测放到首帧之后的空闲时间
+# 设环境变量 PANDA_POMODORO_EAGER=1 可切回一次性全部初始化（对比启动耗时用）
+LAZY_STARTUP = not os.environ.get("PANDA_POMODORO_EAGER")
+
+# 本地控制接口：脚本经套接字 start/pause/skip/订阅状态（见 control.py，命令行 python control.py status）
+# 设环境变量 PANDA_POMODORO_CONTROL=0 关闭
+CONTROL_SOCKET = os.environ.get("PANDA_POMODORO_CONTROL") != "0"
 
 # 页眉内嵌熊猫 GIF（占位 demo，可换成你的 base64）
 PANDA_GIF_B64 = """
 R0lGODlhIAAgAKECAAAAAP///wAAAMLCwgAAACH5BAEKAAIALAAAAAAgACAAAALheLrc/jDKSau9OOvNu/9gKI5kaZ5oqq5s674vq9wFADs=
 """
 
-# ---------- 最兜底蜂鸣 ----------
-def _beep_fallback():
-    try:
-        if platform.system() == "Windows":
-            import winsound
-            winsound.Beep(1000, 300)
-        else:
-            print('\a', end='', flush=True)
-    except Exception:
-        pass
-
-# ---------- 可停止的跨平台音频控制器 ----------
-class AudioController:
-    """
-    macOS:  afplay 进程（可终止）
-    Linux:  paplay/aplay/ffplay 三选一（可终止）
-    Windows: winsound.PlaySound(..., SND_ASYNC)；stop 用 PlaySound(None,0) 停止
-    都不可用或文件缺失：退回一次性蜂鸣
-    """
-    def __init__(self, path):
-        self.path = path
-        self.proc = None
-        self.backend = None   # 'proc' | 'winsound' | 'beep' | None
-
-    def play(self):
-        self.stop()
-        if not self.path or not os.path.exists(self.path):
-            self.backend = 'beep'
-            _beep_fallback()
-            return
-        sysname = platform.system()
-        try:
-            if sysname == "Darwin":  # macOS
-                self.proc = subprocess.Popen(
-                    ["afplay", self.path],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-                self.backend = 'proc'
-            elif sysname == "Linux":
-                player = shutil.which("paplay") or shutil.which("aplay") or shutil.which("ffplay")
-                if player:
-                    if os.path.basename(player) == "ffplay":
-                        self.proc = subprocess.Popen(
-                            [player, "-nodisp", "-autoexit", self.path],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                        )
-                    else:
-                        self.proc = subprocess.Popen(
-                            [player, self.path],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                        )
-                    self.backend = 'proc'
-                else:
-                    self.backend = 'beep'
-                    _beep_fallback()
-            elif sysname == "Windows":
-                import winsound
-                winsound.PlaySound(self.path, winsound.SND_FILENAME | winsound.SND_ASYNC)
-                self.backend = 'winsound'
-            else:
-                self.backend = 'beep'
-                _beep_fallback()
-        except Exception:
-            self.backend = 'beep'
-            _beep_fallback()
-
-    def stop(self):
-        try:
-            if self.backend == 'proc' and self.proc and self.proc.poll() is None:
-                self.proc.terminate()
-            elif self.backend == 'winsound':
-                import winsound
-                winsound.PlaySound(None, 0)  # 停止异步播放
-        except Exception:
-            pass
-        finally:
-            self.proc = None
-            self.backend = None
-
+# ---------- 音频：后端探测/预热/延迟统计见 audio.py ----------
 AUDIO = AudioController(END_AUDIO_PATH)
 
-# ---------- 计算 zoom/subsample（支持放大/缩小） ----------
-def pick_zoom_subsample(orig_w, orig_h, SCALE, MAX_GIF_SIZE):
-    """
-    返回 (zoom, subsample) 两个整数因子，最终缩放比例 = zoom / subsample
-      - 若 SCALE 为数值：
-          * SCALE >= 1 → 缩小为 1/SCALE
-          * SCALE <  1 → 放大为 1/SCALE（例：0.5=放大2倍）
-      - 否则按 MAX_GIF_SIZE 自动缩放，使最长边尽量接近该值（四舍五入，不会缩过头）
-    """
-    z, s = 1, 1
-    if SCALE is not None:
-        SCALE = float(SCALE)
-        if SCALE < 1:
-            z = max(1, int(round(1.0 / SCALE)))
-        else:
-            s = max(1, int(round(SCALE)))
-        return z, s
-
-    if MAX_GIF_SIZE and MAX_GIF_SIZE > 0 and orig_w and orig_h:
-        longest = max(orig_w, orig_h)
-        ratio = MAX_GIF_SIZE / float(longest)
-        if ratio > 1:    # 放大
-            z = max(1, int(round(ratio)))
-        elif ratio < 1:  # 缩小
-            s = max(1, int(round(1.0 / ratio)))
-    return z, s
+# ---------- 指标（metrics.py）：提醒链路各段耗时；python control.py metrics 查看 ----------
+POPUP_BUILD = metrics.histogram("panda_popup_build_seconds", "show_end_gif_popup() total build time")
+POPUP_FRAMES = metrics.histogram("panda_popup_frames_seconds", "End popup GIF frame load/scale time")
+ALERT_DELAY = metrics.histogram("panda_alert_delay_seconds", "Deadline to end popup built (sound starts first)")
+TRAY_INIT = metrics.histogram("panda_tray_init_seconds", "Tray icon load and pystray start")
+ALERTS = metrics.counter("panda_alerts_total", "End popups shown")
+PROFILE_SECONDS = 30   # 托盘菜单 Profile / python control.py profile 的采样时长
 
 # ---------- 结束弹窗：循环播放 GIF（含缩放）；关闭即停止音频 ----------
-def show_end_gif_popup(root):
-    top = Toplevel(root)
-    top.title("Time's up!")
-    top.resizable(False, False)
-    try: top.attributes("-topmost", True)
-    except Exception: pass
-
-    # 载入所有帧（支持放大/缩小）
-    frames, w, h = [], 420, 420
-    try:
-        first_raw = tk.PhotoImage(file=END_GIF_PATH, format="gif -index 0")
-        orig_w, orig_h = first_raw.width(), first_raw.height()
-        z, s = pick_zoom_subsample(orig_w, orig_h, SCALE, MAX_GIF_SIZE)
-
-        def apply_scale(img):
-            if z > 1: img = img.zoom(z)
-            if s > 1: img = img.subsample(s)
-            return img
-
-        first = apply_scale(first_raw)
-        w, h = first.width(), first.height()
-        frames.append(first)
-
-        idx = 1
-        while True:
-            frm_raw = tk.PhotoImage(file=END_GIF_PATH, format=f"gif -index {idx}")
-            frames.append(apply_scale(frm_raw))
-            idx += 1
-    except Exception:
-        pass
-
-    # 居中
-    sw, sh = top.winfo_screenwidth(), top.winfo_screenheight()
-    x, y = (sw - w) // 2, (sh - h) // 3
-    top.geometry(f"+{x}+{y}")
-
-    # 内容
-    body = tk.Frame(top)
-    body.pack(padx=10, pady=(10, 6))
-
-    lbl = tk.Label(body)
-    lbl.pack()
-
-    def animate(i=0):
-        if not frames:
-            lbl.config(text=f"(未找到 GIF: {END_GIF_PATH})")
-        else:
-            lbl.configure(image=frames[i])
-            top.after(ANIM_INTERVAL_MS, animate, (i + 1) % len(frames))
-    animate()
-
-    # 底部按钮
-    btns = tk.Frame(top)
-    btns.pack(pady=(6, 10))
-
-    def close(_=None):
-        try: AUDIO.stop()
-        finally:
-            try: top.destroy()
-            except Exception: pass
-
-    tk.Button(btns, text="Close", width=10, command=close).pack()
-
-    # 播放音频
-    AUDIO.play()
-
-    # 仅允许 Esc / × 关闭；不绑定整窗点击关闭
-    top.bind("<Escape>", close)
-    top.protocol("WM_DELETE_WINDOW", close)
-
-    # 可选：模态
-    try:
-        top.transient(root)
-        top.grab_set()
-    except Exception:
-        pass
+# 一个预先建好的弹窗反复用（endpopup.EndPopup）：关闭只隐藏；开着时再到点只合并计数，不重建、不重放音频
+def _load_end_frames(root):
+    # 载入帧（支持放大/缩小）；整组放得进 FRAME_MEMORY_BUDGET 时全部常驻并在进程内复用，
+    # 放不下（长/大 GIF）时是 FrameStore：只留播放头附近的帧，空闲时预读、按最久未显示淘汰
+    with POPUP_FRAMES.time():
+        return load_bounded_frames(END_GIF_PATH, root, SCALE, MAX_GIF_SIZE, FRAME_MEMORY_BUDGET)
+
+def end_gif_popup(root):
+    return end_popup(root, lambda: _load_end_frames(root), AUDIO, interval=ANIM_INTERVAL_MS,
+                     modal=True, missing=f"(未找到 GIF: {END_GIF_PATH})")
+
+def show_end_gif_popup(root, title="Time's up!"):
+    t0 = time.perf_counter()
+    top = end_gif_popup(root).alert(title)
+    POPUP_BUILD.observe(time.perf_counter() - t0)
+    ALERTS.inc()
+    return top
 
 # ================== 主 App ==================
 class TimerApp:
@@ -217,29 +89,46 @@ class TimerApp:
         self.root.title("Panda Pomodoro")
         self.root.resizable(False, False)
 
-        # 计时状态
-        self.total_seconds = 0
-        self.remaining = 0
-        self.running = False
-        self._tick_job = None
-
-        # 番茄钟状态
-        self.is_pomo = False
-        self.focus_minutes = 25
-        self.short_break = 5
-        self.long_break = 15
-        self.cycles_before_long = 4
-        self.current_cycle = 0
-        self.phase = "Idle"   # "Focus" | "ShortBreak" | "LongBreak" | "Idle"
-        self.auto_loop = tk.BooleanVar(value=True)
+        # 计时 / 番茄钟状态机（engine.TimerEngine，不依赖 Tk）；本类只负责显示与输入
+        # 所有定时回调经 wakeup_counter 排程，便于统计待机时每分钟唤醒次数
+        self.wake = wakeup_counter(root)
+        self.anim = animation_clock(root)
+        self.engine = TimerEngine(self.wake.after, self.wake.cancel)
+        # 视图：_view_model() 算期望状态，ViewDiffer 只下发变化的选项
+        self.view = ViewDiffer()
+        self._display_secs = 30
+        self.engine.on("tick", self._on_tick)
+        self.engine.on("phase", self._set_phase)
+        self.engine.on("state", self._refresh_buttons)
+        self.engine.on("finished", self._on_finished)
+        # 会话历史：每段结束追加一条（history.py），空闲时落盘，退出时 close
+        self.history = HistoryLog()
+        self._history_job = None
+        # 统计：延后载入快照 + 续读新增历史（stats.py），之后随每段结束增量更新
+        self.stats = None
+        self._stats_win = None
+        # 控制套接字：延后启动；tick/阶段/状态变化推给订阅者
+        self.control = None
+        for ev in ("tick", "phase", "state"):
+            self.engine.on(ev, lambda *_, ev=ev: self._publish(ev))
+        self.engine.on("session", self._on_session)
+        # 命名提醒：任意多个，共用一个 after()
+        self.timers = TimerRegistry(self.wake.after, self.wake.cancel, on_fire=self._on_timers_fired)
+        # 导出时才读的现成数字
+        metrics.gauge("panda_idle_wakeups_per_minute", "Scheduled callbacks in the last minute", self.wake.wakeups_per_minute)
+        metrics.gauge("panda_animations_active", "Animations currently scheduled", lambda: self.anim.active)
+        metrics.gauge("panda_animation_frames_dropped", "GIF frames skipped because the loop was late", lambda: self.anim.dropped)
+        self._profile = None
+
+        self.auto_loop = tk.BooleanVar(value=self.engine.auto_loop)
+        self.auto_loop.trace_add("write", lambda *_: setattr(self.engine, "auto_loop", self.auto_loop.get()))
 
         # 顶部：熊猫内嵌 GIF + 时间输入
         top = tk.Frame(root, padx=10, pady=8)
         top.pack(fill="x")
 
-        self.gif_label = tk.Label(top)
+        self.gif_label = tk.Label(top, text="🐼", font=("Helvetica", 20))  # GIF 载入前的占位
         self.gif_label.grid(row=0, column=0, rowspan=2, padx=(0, 8))
-        self._load_embedded_gif(PANDA_GIF_B64)
 
         tk.Label(top, text="Minutes").grid(row=0, column=1, sticky="e")
         self.entry_min = tk.Entry(top, width=5, justify="right"); self.entry_min.insert(0, "0")
@@ -275,19 +164,19 @@ class TimerApp:
         # 番茄参数
         pomo = tk.Frame(root, padx=10, pady=4); pomo.pack()
         tk.Label(pomo, text="Focus").grid(row=0, column=0, sticky="e")
-        self.e_focus = tk.Entry(pomo, width=4, justify="right"); self.e_focus.insert(0, str(self.focus_minutes))
+        self.e_focus = tk.Entry(pomo, width=4, justify="right"); self.e_focus.insert(0, str(self.engine.focus_minutes))
         self.e_focus.grid(row=0, column=1, padx=(4,10))
 
         tk.Label(pomo, text="Short").grid(row=0, column=2, sticky="e")
-        self.e_short = tk.Entry(pomo, width=4, justify="right"); self.e_short.insert(0, str(self.short_break))
+        self.e_short = tk.Entry(pomo, width=4, justify="right"); self.e_short.insert(0, str(self.engine.short_break))
         self.e_short.grid(row=0, column=3, padx=(4,10))
 
         tk.Label(pomo, text="Long").grid(row=0, column=4, sticky="e")
-        self.e_long = tk.Entry(pomo, width=4, justify="right"); self.e_long.insert(0, str(self.long_break))
+        self.e_long = tk.Entry(pomo, width=4, justify="right"); self.e_long.insert(0, str(self.engine.long_break))
         self.e_long.grid(row=0, column=5, padx=(4,10))
 
         tk.Label(pomo, text="Cycles").grid(row=0, column=6, sticky="e")
-        self.e_cycles = tk.Entry(pomo, width=4, justify="right"); self.e_cycles.insert(0, str(self.cycles_before_long))
+        self.e_cycles = tk.Entry(pomo, width=4, justify="right"); self.e_cycles.insert(0, str(self.engine.cycles_before_long))
         self.e_cycles.grid(row=0, column=7, padx=(4,10))
 
         tk.Checkbutton(pomo, text="Auto loop", variable=self.auto_loop).grid(row=0, column=8, padx=(0,8))
@@ -300,13 +189,27 @@ class TimerApp:
         self.btn_pomo_start.grid(row=0, column=0, padx=4)
         self.btn_pomo_skip.grid(row=0, column=1, padx=4)
         self.btn_pomo_stop.grid(row=0, column=2, padx=4)
+        tk.Button(pomo_btns, text="Stats", width=6, command=self._open_stats).grid(row=0, column=3, padx=4)
+
+        # 提醒（多个命名计时器，与番茄钟并行）
+        rem = tk.Frame(root, padx=10, pady=4); rem.pack()
+        tk.Label(rem, text="Reminder").grid(row=0, column=0, sticky="e")
+        self.e_rem_name = tk.Entry(rem, width=10); self.e_rem_name.insert(0, "Tea")
+        self.e_rem_name.grid(row=0, column=1, padx=(4, 10))
+        tk.Label(rem, text="Min").grid(row=0, column=2, sticky="e")
+        self.e_rem_min = tk.Entry(rem, width=4, justify="right"); self.e_rem_min.insert(0, "3")
+        self.e_rem_min.grid(row=0, column=3, padx=(4, 10))
+        tk.Button(rem, text="Add", width=6, command=self._add_reminder).grid(row=0, column=4, padx=4)
+        tk.Button(rem, text="Clear", width=6, command=self.clear_timers).grid(row=0, column=5, padx=4)
+        self.rem_label = tk.Label(root, text="", font=("Helvetica", 10))
+        self.rem_label.pack(pady=(0, 6))
 
         # 快捷键
         root.bind("<space>", self._toggle_pause)
 
         # 托盘（可选）
         self.tray = None
-        self._init_tray()
+        self._tray_badge, self._tray_minutes = None, None
 
         # 关闭按钮：隐藏到托盘（若托盘不可用则退出）
         self.root.protocol("WM_DELETE_WINDOW", self._on_close_to_tray)
@@ -314,36 +217,56 @@ class TimerApp:
         # 初始显示
         self._update_display(30)
 
+        # 非首屏必需的初始化：控制套接字（最先：第二次启动只重试几秒，要尽早能接住转发）、页眉 GIF、托盘、
+        # 音频后端探测、结束弹窗（建好隐藏）、统计快照（可能要从历史重建，最慢，放最后）
+        self._deferred = [self._start_control, lambda: self._load_embedded_gif(PANDA_GIF_B64), self._init_tray,
+                          AUDIO.prepare, lambda: end_gif_popup(self.root).prebuild(), self._ensure_stats]
+        self._deferred_started = False
+        if LAZY_STARTUP:
+            self.root.bind("<Map>", self._on_first_map, add="+")
+            self.root.after(1000, self._start_deferred)   # 窗口一开始就隐藏、收不到 <Map> 时的兜底
+        else:
+            self._start_deferred()
+
+    # ------- 延后初始化：首帧绘制后逐项在空闲时执行，每项之间让出事件循环 -------
+    def _on_first_map(self, e):
+        if e.widget is self.root: self._start_deferred()
+
+    def _start_deferred(self):
+        if self._deferred_started: return
+        self._deferred_started = True
+        if LAZY_STARTUP: self.root.after_idle(self._run_deferred)
+        else:
+            while self._deferred: self._run_deferred()
+
+    def _run_deferred(self):
+        if not self._deferred: return
+        task = self._deferred.pop(0)
+        try: task()
+        except Exception: traceback.print_exc()   # 一项失败不拦后面的，但要看得见（托盘/音频坏了不能悄无声息）
+        if LAZY_STARTUP and self._deferred: self.root.after(1, self._run_deferred)
+
     # ------- 内嵌 GIF（页眉小熊猫；与结束弹窗无关） -------
     def _load_embedded_gif(self, b64string):
-        self.gif_frames, self.gif_index, self._gif_job = [], 0, None
+        self.gif_frames, self._gif_anim = [], None
         b64_clean = (b64string or "").strip()
 
-        def _try_load(data):
-            i = 0
-            while True:
-                try:
-                    frm = tk.PhotoImage(data=data, format=f"gif -index {i}")
-                    self.gif_frames.append(frm); i += 1
-                except Exception:
-                    break
-
-        _try_load(b64_clean)
-        if not self.gif_frames:
-            try:
-                _try_load(base64.b64decode(re.sub(r"\s+", "", b64_clean)))
-            except Exception:
-                pass
+        # 只解码一次 base64、单遍切帧；预缩放帧走磁盘缓存
+        try:
+            data = base64.b64decode(re.sub(r"\s+", "", b64_clean))
+            fs = load_gif_frames(data, self.root)
+            self.gif_frames, self.gif_delays = fs.frames, fs.delays
+        except Exception:
+            pass
         if self.gif_frames:
-            self._animate_gif()
+            self._gif_anim = self.anim.add(self.gif_label, self.gif_frames, self.gif_delays)   # 收进托盘时自动暂停
         else:
             self.gif_label.config(text="🐼", font=("Helvetica", 20))
 
-    def _animate_gif(self):
-        if not self.gif_frames: return
-        self.gif_label.config(image=self.gif_frames[self.gif_index])
-        self.gif_index = (self.gif_index + 1) % len(self.gif_frames)
-        self._gif_job = self.root.after(100, self._animate_gif)
+    def idle_report(self):
+        """待机统计：最近一分钟唤醒次数、在跑/已登记的动画数、累计换帧/跳帧数"""
+        return {"wakeups_per_min": self.wake.wakeups_per_minute(), "animations_active": self.anim.active,
+                "animations": len(self.anim), "frames_shown": self.anim.shown, "frames_dropped": self.anim.dropped}
 
     # ------- 基础计时 -------
     def _parse_input(self):
@@ -358,161 +281,278 @@ class TimerApp:
             messagebox.showerror("Invalid time", "请输入有效时间（秒 0-59，总时长>0）。")
             return None
 
+    # ------- 视图：期望状态 → 差分下发 -------
+    def _view_model(self):
+        """由引擎状态算出各控件应有的选项（纯计算，不碰 Tk）"""
+        m, s = divmod(max(0, int(self._display_secs)), 60)
+        run = self.running
+        on = lambda cond: "normal" if cond else "disabled"
+        if self.is_pomo:
+            start, pause, reset = on(False), on(run), on(False)
+            p_start, p_skip, p_stop = on(not run), on(run), on(True)
+        else:
+            start, pause, reset = on(not run), on(run), on(self.remaining > 0 or self.phase != "Idle")
+            p_start, p_skip, p_stop = on(True), on(False), on(False)
+        return [
+            (self.time_label, {"text": f"{m:02d}:{s:02d}"}),
+            (self.phase_label, {"text": self.phase}),
+            (self.btn_start, {"state": start}),
+            (self.btn_pause, {"state": pause, "text": "Pause"}),
+            (self.btn_reset, {"state": reset}),
+            (self.btn_pomo_start, {"state": p_start}),
+            (self.btn_pomo_skip, {"state": p_skip}),
+            (self.btn_pomo_stop, {"state": p_stop}),
+        ]
+
+    def _render(self):
+        self.view.apply(self._view_model())
+
+    def _on_tick(self, seconds):
+        with self.view.tick():
+            self._update_display(seconds)
+
     def _update_display(self, seconds):
-        m, s = divmod(max(0, int(seconds)), 60)
-        self.time_label.config(text=f"{m:02d}:{s:02d}")
+        self._display_secs = seconds
+        self._render()
+        self._update_tray_icon(seconds)
+
+    def _update_tray_icon(self, seconds=None):
+        """托盘角标：计时中显示剩余分钟（向上取整），分钟数变了才换图；未计时恢复原图标"""
+        if not (self.tray and self._tray_badge): return
+        secs = self.remaining if seconds is None else seconds
+        mins = -(-max(0, int(secs)) // 60) if self.running else None
+        if mins == self._tray_minutes: return
+        self._tray_minutes = mins
+        try:
+            self.tray.icon = self._tray_badge.render(mins)
+        except Exception:
+            pass
 
     def _set_phase(self, name):
-        self.phase = name
-        self.phase_label.config(text=name)
+        self._render()
+
+    # 状态只读转发，方便托盘等处沿用原来的属性名
+    @property
+    def running(self): return self.engine.running
+
+    @property
+    def remaining(self): return self.engine.remaining
+
+    @property
+    def is_pomo(self): return self.engine.is_pomo
+
+    @property
+    def phase(self): return self.engine.phase
 
     def start(self):
-        if self.running and not self.is_pomo: return
-        if self.is_pomo: return
+        if self.is_pomo or self.running: return
+        total = None
         if self.remaining == 0:
             total = self._parse_input()
             if total is None: return
-            self.total_seconds = total
-            self.remaining = total
-        self._set_phase("Manual")
-        self.running = True
-        self._schedule_tick(); self._refresh_buttons()
-
-    def pause(self):
-        if not self.running: return
-        self.running = False
-        if self._tick_job:
-            self.root.after_cancel(self._tick_job); self._tick_job = None
-        self._refresh_buttons()
+        self.engine.start(total)
+
+    def pause(self): self.engine.pause()
 
     def reset(self):
-        self.running = False
-        if self._tick_job:
-            self.root.after_cancel(self._tick_job); self._tick_job = None
-        self.is_pomo = False
-        self._set_phase("Idle")
-        self.remaining = 0
+        self.engine.reset()
         try:
             total = (int(self.entry_min.get() or 0) * 60 + int(self.entry_sec.get() or 0))
         except ValueError:
             total = 0
-        self._update_display(total); self._refresh_buttons()
-
-    def _schedule_tick(self):
-        self._update_display(self.remaining)
-        if not self.running: return
-        if self.remaining <= 0:
-            self.running = False; self._refresh_buttons()
-            self.time_label.config(text="00:00")
-            # 结束动作：弹窗 GIF + 播放音频（关闭即停）
-            show_end_gif_popup(self.root)
-            if self.sound_var.get(): _beep_fallback()  # 可选额外“哔”
-            self._on_phase_finished(); return
-        self._tick_job = self.root.after(1000, self._tick)
-
-    def _tick(self): self.remaining -= 1; self._schedule_tick()
+        self._update_display(total)
+
+    def _on_finished(self, phase, skipped):
+        t0 = time.perf_counter()
+        self._update_display(0)
+        # 结束动作：弹窗 GIF + 播放音频（关闭即停）
+        show_end_gif_popup(self.root)
+        if not skipped: ALERT_DELAY.observe(self.engine.countdown.overdue + time.perf_counter() - t0)
+        if self.sound_var.get(): _beep_fallback()  # 可选额外“哔”
+
+    def _on_session(self, rec):
+        """引擎 "session" 事件：追加到历史日志，合并到空闲时一次 fsync"""
+        try:
+            self.history.append(rec)
+        except (OSError, TypeError, ValueError):
+            return
+        if self.stats is not None:
+            self.stats.add(rec)
+            self._refresh_stats_view()
+        if self.control is not None:
+            self.control.publish("session", rec)
+        if self._history_job is None:
+            self._history_job = self.root.after_idle(self._flush_history)
+
+    def _flush_history(self):
+        self._history_job = None
+        try:
+            self.history.flush()
+            if self.stats is not None: save_stats(self.stats)
+            metrics.write_textfile()
+        except OSError:
+            pass
 
-    def _refresh_buttons(self):
-        if self.is_pomo:
-            self.btn_start.config(state="disabled")
-            self.btn_pause.config(state="normal" if self.running else "disabled", text="Pause")
-            self.btn_reset.config(state="disabled")
-            self.btn_pomo_start.config(state="disabled" if self.running else "normal")
-            self.btn_pomo_skip.config(state="normal" if self.running else "disabled")
-            self.btn_pomo_stop.config(state="normal")
+    # ------- 本地控制接口（control.py / controlserver.py） -------
+    def _start_control(self):
+        """asyncio 线程收发套接字；命令经 dispatcher 交回 Tk 线程执行，界面靠引擎事件自行刷新"""
+        if not CONTROL_SOCKET: return
+        try:
+            from controlserver import ControlServer
+            self.control = ControlServer(self._control_commands(), tk_dispatcher(self.root).call)
+            self.control.start()
+        except (ControlError, OSError):
+            self.control = None
+
+    def _control_commands(self):
+        """引擎命令 + 界面命令（show：第二次启动不带参数时把窗口叫出来）"""
+        cmds = engine_commands(self.engine)
+        def show():
+            self._show_window()
+            return self.engine.snapshot()
+        cmds["show"] = show
+        cmds["metrics"] = metrics.render
+        cmds["profile"] = lambda: {"profile": self._toggle_profile()}
+        return cmds
+
+    def run_commands(self, commands):
+        """主实例自己的命令行参数（instance.parse_args 的结果），启动后直接执行"""
+        table = self._control_commands()
+        for cmd, args in commands:
+            try:
+                table[cmd](**args)
+            except (ControlError, KeyError, TypeError, ValueError) as e:
+                print(f"{cmd}: {e}", file=sys.stderr)
+
+    def _publish(self, event):
+        if self.control is not None:
+            self.control.publish(event, self.engine.snapshot())
+
+    # ------- 统计面板：数字全部来自增量维护的 ProductivityStats，打开不扫历史 -------
+    def _ensure_stats(self):
+        if self.stats is None:
+            try:
+                self.history.flush()   # 缓冲里的记录先落盘，续读才不会漏
+                self.stats, _ = load_stats(self.history.path)
+            except OSError:
+                self.stats = ProductivityStats()
+        return self.stats
+
+    def _open_stats(self):
+        self._ensure_stats()
+        if self._stats_win is not None and self._stats_win.winfo_exists():
+            self._stats_win.deiconify()
+            self._stats_win.lift()
         else:
-            self.btn_start.config(state="disabled" if self.running else "normal")
-            self.btn_pause.config(state="normal" if self.running else "disabled")
-            self.btn_reset.config(state="normal" if self.remaining > 0 or self.phase != "Idle" else "disabled")
-            self.btn_pomo_start.config(state="normal")
-            self.btn_pomo_skip.config(state="disabled")
-            self.btn_pomo_stop.config(state="disabled")
+            self._stats_win = Toplevel(self.root)
+            self._stats_win.title("Stats")
+            self._stats_win.resizable(False, False)
+            self._stats_label = tk.Label(self._stats_win, justify="left", font=("Courier", 12), padx=12, pady=10)
+            self._stats_label.pack()
+        self._refresh_stats_view()
+
+    def _refresh_stats_view(self):
+        if self._stats_win is None or not self._stats_win.winfo_exists(): return
+        now = time.time()
+        self._stats_label.configure(text=format_dashboard(self.stats.dashboard(now), now))
+
+    def _refresh_buttons(self):
+        self._update_tray_icon()
+        self._render()
 
     def _toggle_pause(self, _=None):
         if self.running: self.pause()
-        else:
-            if self.is_pomo:
-                self.running = True; self._schedule_tick(); self._refresh_buttons()
-            else:
-                self.start()
+        elif self.is_pomo: self.engine.resume()
+        else: self.start()
 
     # ------- 番茄钟 -------
-    def _apply_pomo_settings(self):
+    def _read_pomo_settings(self):
         try:
-            self.focus_minutes = max(1, int(self.e_focus.get()))
-            self.short_break   = max(1, int(self.e_short.get()))
-            self.long_break    = max(1, int(self.e_long.get()))
-            self.cycles_before_long = max(1, int(self.e_cycles.get()))
+            return (max(1, int(self.e_focus.get())), max(1, int(self.e_short.get())),
+                    max(1, int(self.e_long.get())), max(1, int(self.e_cycles.get())))
         except ValueError:
             messagebox.showerror("Invalid Pomodoro", "番茄钟参数请输入整数。")
-            return False
-        return True
+            return None
 
     def start_pomodoro(self):
-        if not self._apply_pomo_settings(): return
-        self.is_pomo = True; self.current_cycle = 0
-        self._start_focus(); self._refresh_buttons()
-
-    def stop_pomodoro(self):
-        self.is_pomo = False; self.pause()
-        self._set_phase("Idle"); self.remaining = 0
-        self._update_display(0); self._refresh_buttons()
-
-    def skip_phase(self): self.remaining = 0; self._schedule_tick()
-
-    def _start_focus(self):
-        self._set_phase("Focus"); self.remaining = self.focus_minutes * 60
-        self.running = True; self._schedule_tick()
-
-    def _start_short_break(self):
-        self._set_phase("ShortBreak"); self.remaining = self.short_break * 60
-        self.running = True; self._schedule_tick()
-
-    def _start_long_break(self):
-        self._set_phase("LongBreak"); self.remaining = self.long_break * 60
-        self.running = True; self._schedule_tick()
-
-    def _on_phase_finished(self):
-        if not self.is_pomo: return
-        if self.phase == "Focus":
-            self.current_cycle += 1
-            if self.current_cycle % self.cycles_before_long == 0:
-                self._start_long_break()
-            else:
-                self._start_short_break()
-        elif self.phase in ("ShortBreak", "LongBreak"):
-            if self.auto_loop.get(): self._start_focus()
-            else:
-                self.running = False; self._set_phase("Idle"); self._refresh_buttons()
+        settings = self._read_pomo_settings()
+        if settings is None: return
+        self.engine.start_pomodoro(*settings)
+
+    def stop_pomodoro(self): self.engine.stop_pomodoro()
+
+    def skip_phase(self): self.engine.skip_phase()
+
+    # ------- 提醒（命名计时器） -------
+    def add_timer(self, name, seconds):
+        tid = self.timers.add(name or "Timer", seconds)
+        self._refresh_reminders()
+        return tid
+
+    def cancel_timer(self, tid):
+        ok = self.timers.cancel(tid)
+        self._refresh_reminders()
+        return ok
+
+    def clear_timers(self):
+        self.timers.clear(); self._refresh_reminders()
+
+    def _add_reminder(self):
+        try:
+            mins = float(self.e_rem_min.get())
+            if mins <= 0: raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid reminder", "提醒时长请输入大于 0 的分钟数。")
+            return
+        self.add_timer(self.e_rem_name.get().strip(), mins * 60)
+
+    def _on_timers_fired(self, fired):
+        self._refresh_reminders()
+        names = ", ".join(t.name for t in fired[:3])
+        if len(fired) > 3: names += f" (+{len(fired) - 3})"
+        show_end_gif_popup(self.root, title=f"Time's up: {names}")
+        if self.sound_var.get(): _beep_fallback()
+
+    def _refresh_reminders(self):
+        # 只在增删/到点时刷新：显示数量和下一个提醒的钟点，不做逐秒倒数
+        t = self.timers.next_timer()
+        if t is None:
+            self.view.set(self.rem_label, text=f"{len(self.timers)} reminder(s) paused" if len(self.timers) else "")
+            return
+        at = time.strftime("%H:%M:%S", time.localtime(time.time() + self.timers.remaining(t.id)))
+        self.view.set(self.rem_label, text=f"{len(self.timers)} reminder(s) · next: {t.name} @ {at}")
 
     # ------- 托盘（PNG 文件；可选） -------
     def _init_tray(self):
+        with TRAY_INIT.time():
+            self._start_tray()
+
+    def _start_tray(self):
         try:
             import pystray
-            from PIL import Image
 
-            if not os.path.exists(TRAY_ICON_PATH):
+            # 按平台尺寸预缩放、缓存在用户目录的小图标；只有首次启动才解码 2000px 原图
+            img = load_tray_icon(TRAY_ICON_PATH)
+            if img is None:
                 self.tray = None
                 return
+            self._tray_badge = TrayBadge(img) if TRAY_SHOW_MINUTES else None
 
-            img = Image.open(TRAY_ICON_PATH).convert("RGBA")
-
-            def on_show(icon, item=None): self.root.after(0, self._show_window)
-            def on_hide(icon, item=None): self.root.after(0, self._hide_window)
-            def on_start_pomo(icon, item=None): self.root.after(0, self.start_pomodoro)
-            def on_pause_resume(icon, item=None):
-                self.root.after(0, (self.pause if self.running else self._toggle_pause))
-            def on_stop(icon, item=None): self.root.after(0, self.stop_pomodoro)
-            def on_quit(icon, item=None): self.root.after(0, self._quit_all)
+            # pystray 在自己的线程里回调：只把动作排进调度器，按点击顺序到 Tk 线程执行；
+            # 回调里不碰 Tk、不读 self.running（暂停/继续在 Tk 线程里再判断）
+            post = tk_dispatcher(self.root).post
+            def action(fn): return lambda icon, item=None: post(fn)
 
             menu = pystray.Menu(
-                pystray.MenuItem("Show Window", on_show),
-                pystray.MenuItem("Hide Window", on_hide),
-                pystray.MenuItem("Start Pomodoro", on_start_pomo),
-                pystray.MenuItem("Pause/Resume", on_pause_resume),
-                pystray.MenuItem("Stop Pomodoro", on_stop),
+                pystray.MenuItem("Show Window", action(self._show_window)),
+                pystray.MenuItem("Hide Window", action(self._hide_window)),
+                pystray.MenuItem("Start Pomodoro", action(self.start_pomodoro)),
+                pystray.MenuItem("Pause/Resume", action(self._toggle_pause)),
+                pystray.MenuItem("Stop Pomodoro", action(self.stop_pomodoro)),
+                pystray.MenuItem("Stats", action(self._open_stats)),
+                pystray.MenuItem(f"Profile {PROFILE_SECONDS}s", action(self._toggle_profile)),
                 pystray.Menu.SEPARATOR,
-                pystray.MenuItem("Quit", on_quit)
+                pystray.MenuItem("Quit", action(self._quit_all))
             )
 
             self.tray = pystray.Icon("PandaPomodoro", img, "Panda Pomodoro", menu)
@@ -520,6 +560,24 @@ class TimerApp:
         except Exception:
             self.tray = None
 
+    # ------- 剖析：cProfile 采样 Tk 线程 PROFILE_SECONDS 秒，再触发一次提前结束；返回 "started" 或结果路径 -------
+    def _toggle_profile(self):
+        if self._profile is None:
+            self._profile = (metrics.Profile().start(), self.root.after(PROFILE_SECONDS * 1000, self._toggle_profile))
+            return "started"
+        prof, job = self._profile
+        self._profile = None
+        try: self.root.after_cancel(job)
+        except Exception: pass
+        try: path = prof.stop()
+        except OSError as e: path = f"failed: {e}"
+        print(f"profile: {path}", file=sys.stderr)
+        try:
+            if self.tray: self.tray.notify(f"Profile saved: {path}", "Panda Pomodoro")
+        except Exception:
+            pass
+        return path
+
     def _show_window(self):
         self.root.deiconify()
         self.root.after(50, self.root.lift)
@@ -535,10 +593,35 @@ class TimerApp:
             if self.tray: self.tray.stop()
         except Exception:
             pass
+        try:
+            if self.control: self.control.stop()
+        except Exception:
+            pass
+        AUDIO.close()
+        try:
+            self.history.close()
+            if self.stats is not None: save_stats(self.stats)
+            metrics.write_textfile()
+        except OSError:
+            pass
         self.root.destroy()
 
 # ================== 入口 ==================
+def _startup_probe(root, app):
+    """PANDA_POMODORO_STARTUP_PROBE=1：主窗口首次绘制时往 stderr 打一行，随后退出（bench.py 测首帧用）"""
+    def on_expose(e):
+        if e.widget is not root: return
+        print(f"first-paint {(time.perf_counter() - _T0) * 1e3:.1f}", file=sys.stderr, flush=True)
+        # 只摘掉自己这一条：unbind(seq, funcid) 在 Python 3.13 之前会把 <Expose> 上的绑定全清掉
+        rest = "\n".join(l for l in root.bind("<Expose>").split("\n") if funcid not in l)
+        root.tk.call("bind", root._w, "<Expose>", rest)
+        root.deletecommand(funcid)
+        root.after(300, app._quit_all)
+    funcid = root.bind("<Expose>", on_expose, add="+")
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = TimerApp(root)
+    app.run_commands(_ARGV_COMMANDS)
+    if os.environ.get("PANDA_POMODORO_STARTUP_PROBE"): _startup_probe(root, app)
     root.mainloop()
@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, sys, platform, shutil, subprocess, threading, base64, re
+import os, sys, time, platform, threading, base64, re, traceback
+_T0 = time.perf_counter()  # 启动计时起点（见 _startup_probe）
+# 单实例：已有实例在跑就把命令行参数转发过去并立即退出——这之前不导入 tkinter 等重模块（见 instance.py）
+if __name__ == "__main__":
+    from instance import claim_or_forward
+    _INSTANCE_LOCK, _ARGV_COMMANDS = claim_or_forward(sys.argv[1:])
 import tkinter as tk
 from tkinter import messagebox, Toplevel
 
+from engine import TimerEngine, TimerRegistry
+from gifframes import load_bounded_frames, load_gif_frames
+from endpopup import end_popup
+from trayicon import load_tray_icon, TrayBadge
+from audio import AudioController, beep_fallback as _beep_fallback
+from animclock import animation_clock, wakeup_counter
+from viewstate import ViewDiffer
+from history import HistoryLog
+from stats import ProductivityStats, load_stats, save_stats, format_dashboard
+from dispatch import tk_dispatcher
+from control import ControlError, engine_commands
+import metrics
+
 # ========= 可选开关 =========
 ENABLE_TRAY = False          # macOS 建议先关，稳定；需要托盘改 True
 ENABLE_HEADER_GIF = True     # 顶部小熊猫动图
+LAZY_STARTUP = not os.environ.get("PANDA_POMODORO_EAGER")  # 托盘/页眉 GIF/音频探测放到首帧之后
+CONTROL_SOCKET = os.environ.get("PANDA_POMODORO_CONTROL") != "0"   # 本地控制套接字（control.py），=0 关闭
 
 # ========= 资源路径（优先同目录，其次 _MEIPASS）=========
 def resource_path(rel: str) -> str:
@@ -21,153 +41,42 @@ def resource_path(rel: str) -> str:
 END_GIF_PATH   = resource_path("timer Lee.gif")
 END_AUDIO_PATH = resource_path("alert.mp3")
 TRAY_ICON_PATH = resource_path("tray.png")
+TRAY_SHOW_MINUTES = True   # 计时中托盘图标角标显示剩余分钟
 
 SCALE = None
 MAX_GIF_SIZE = 500
-ANIM_INTERVAL_MS = 100
+ANIM_INTERVAL_MS = None   # None=按 GIF 每帧延时；填毫秒数则固定间隔
+FRAME_MEMORY_BUDGET = 16 * 1024 * 1024   # 弹窗 GIF 解码帧内存上限；超出则只留播放头附近的帧（framestore.py）
 
 PANDA_GIF_B64 = """
 R0lGODlhIAAgAKECAAAAAP///wAAAMLCwgAAACH5BAEKAAIALAAAAAAgACAAAALheLrc/jDKSau9OOvNu/9gKI5kaZ5oqq5s674vq9wFADs=
 """.strip()
 
-# ========= 蜂鸣兜底 =========
-def _beep_fallback():
-    try:
-        if platform.system() == "Windows":
-            import winsound; winsound.Beep(1000, 300)
-        else:
-            print('\a', end='', flush=True)
-    except Exception:
-        pass
-
-# ========= 跨平台音频 =========
-class AudioController:
-    def __init__(self, path): self.path, self.proc, self.backend = path, None, None
-    def play(self):
-        self.stop()
-        if not self.path or not os.path.exists(self.path):
-            self.backend='beep'; _beep_fallback(); return
-        try:
-            sysname = platform.system()
-            if sysname == "Darwin":
-                self.proc = subprocess.Popen(["afplay", self.path],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL); self.backend='proc'
-            elif sysname == "Linux":
-                player = shutil.which("paplay") or shutil.which("aplay") or shutil.which("ffplay")
-                if player:
-                    if os.path.basename(player) == "ffplay":
-                        self.proc = subprocess.Popen([player,"-nodisp","-autoexit",self.path],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    else:
-                        self.proc = subprocess.Popen([player,self.path],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    self.backend='proc'
-                else:
-                    self.backend='beep'; _beep_fallback()
-            elif sysname == "Windows":
-                import winsound; winsound.PlaySound(self.path, winsound.SND_FILENAME|winsound.SND_ASYNC)
-                self.backend='winsound'
-            else:
-                self.backend='beep'; _beep_fallback()
-        except Exception:
-            self.backend='beep'; _beep_fallback()
-    def stop(self):
-        try:
-            if self.backend=='proc' and self.proc and self.proc.poll() is None: self.proc.terminate()
-            elif self.backend=='winsound':
-                import winsound; winsound.PlaySound(None,0)
-        except Exception: pass
-        finally: self.proc=None; self.backend=None
-
+# ========= 音频（后端探测/预热见 audio.py）=========
 AUDIO = AudioController(END_AUDIO_PATH)
 
-# ========= GIF 缩放选择 =========
-def pick_zoom_subsample(orig_w, orig_h, SCALE, MAX_GIF_SIZE):
-    z, s = 1, 1
-    if SCALE is not None:
-        SCALE=float(SCALE); z = max(1,int(round(1.0/SCALE))) if SCALE<1 else 1
-        s = max(1,int(round(SCALE))) if SCALE>=1 else 1
-        return z, s
-    if MAX_GIF_SIZE and MAX_GIF_SIZE>0 and orig_w and orig_h:
-        longest=max(orig_w,orig_h); ratio=MAX_GIF_SIZE/float(longest)
-        if ratio>1: z=max(1,int(round(ratio)))
-        elif ratio<1: s=max(1,int(round(1.0/ratio)))
-    return z, s
-
-# ========= 结束弹窗（多屏修复版）=========
-def show_end_gif_popup(root):
-    top = Toplevel(root)
-    top.title("Time's up!")
-    top.resizable(False, False)
-    try: top.attributes("-topmost", True)
-    except Exception: pass
-
-    # 加载帧（绑定 master=top；并挂到 top 防 GC）
-    frames, w, h = [], 420, 420
-    try:
-        if os.path.exists(END_GIF_PATH):
-            first_raw = tk.PhotoImage(file=END_GIF_PATH, format="gif -index 0", master=top)
-            z, s = pick_zoom_subsample(first_raw.width(), first_raw.height(), SCALE, MAX_GIF_SIZE)
-            def apply_scale(img):
-                if z>1: img=img.zoom(z)
-                if s>1: img=img.subsample(s)
-                return img
-            first = apply_scale(first_raw)
-            w, h = first.width(), first.height()
-            frames.append(first)
-            idx=1
-            while True:
-                frm_raw = tk.PhotoImage(file=END_GIF_PATH, format=f"gif -index {idx}", master=top)
-                frames.append(apply_scale(frm_raw)); idx+=1
-    except Exception:
-        pass
-    top._gif_frames = frames
-    top._gif_idx = 0
-    top._anim_job = None
-
-    # 居中
-    sw, sh = top.winfo_screenwidth(), top.winfo_screenheight()
-    x, y = (sw - w) // 2, (sh - h) // 3
-    top.geometry(f"+{x}+{y}")
-
-    # 内容
-    body = tk.Frame(top); body.pack(padx=10, pady=(10, 6))
-    lbl = tk.Label(body); lbl.pack()
-
-    def animate():
-        if not top._gif_frames:
-            lbl.config(text=f"(未找到 GIF: {END_GIF_PATH})")
-        else:
-            lbl.configure(image=top._gif_frames[top._gif_idx])
-            top._gif_idx = (top._gif_idx + 1) % len(top._gif_frames)
-            top._anim_job = top.after(ANIM_INTERVAL_MS, animate)
-
-    def force_refresh(_=None):
-        if top._gif_frames:
-            lbl.configure(image=top._gif_frames[top._gif_idx])
-
-    # 底部按钮
-    btns = tk.Frame(top); btns.pack(pady=(6,10))
-    def close(_=None):
-        try: AUDIO.stop()
-        except Exception: pass
-        try:
-            if top._anim_job: top.after_cancel(top._anim_job)
-        except Exception: pass
-        try: top.destroy()
-        except Exception: pass
-
-    tk.Button(btns, text="Close", width=10, command=close).pack()
-
-    AUDIO.play()
-    top.bind("<Escape>", close)
-    top.protocol("WM_DELETE_WINDOW", close)
-
-    # 关键：跨屏/缩放/重绘时刷新，不再使用 grab_set（避免多屏卡死）
-    top.bind("<Map>", force_refresh)
-    top.bind("<Configure>", force_refresh)
-
-    animate()
+# ========= 指标（metrics.py）：提醒链路各段耗时，python control.py metrics 查看 =========
+POPUP_BUILD = metrics.histogram("panda_popup_build_seconds", "show_end_gif_popup() total build time")
+POPUP_FRAMES = metrics.histogram("panda_popup_frames_seconds", "End popup GIF frame load/scale time")
+ALERT_DELAY = metrics.histogram("panda_alert_delay_seconds", "Deadline to end popup built (sound starts first)")
+TRAY_INIT = metrics.histogram("panda_tray_init_seconds", "Tray icon load and pystray start")
+ALERTS = metrics.counter("panda_alerts_total", "End popups shown")
+PROFILE_SECONDS = 30   # 托盘菜单 / control.py profile 的采样时长
+
+# ========= 结束弹窗（多屏修复版）：一个预先建好的弹窗反复用，开着时再到点只合并计数 =========
+def _load_end_frames(root):
+    # 进程内缓存（绑定 root 解释器）；超出 FRAME_MEMORY_BUDGET 时按播放头滑动窗口载入
+    with POPUP_FRAMES.time(): return load_bounded_frames(END_GIF_PATH, root, SCALE, MAX_GIF_SIZE, FRAME_MEMORY_BUDGET)
+
+def end_gif_popup(root):
+    # modal=False：不用 grab_set（避免多屏卡死），改为映射/重绘时刷新当前帧
+    return end_popup(root, lambda: _load_end_frames(root), AUDIO, interval=ANIM_INTERVAL_MS,
+                     modal=False, missing=f"(未找到 GIF: {END_GIF_PATH})")
+
+def show_end_gif_popup(root, title="Time's up!"):
+    t0 = time.perf_counter()
+    top = end_gif_popup(root).alert(title)
+    POPUP_BUILD.observe(time.perf_counter() - t0); ALERTS.inc()
     return top
 
 # ========= 主应用 =========
@@ -177,24 +86,36 @@ class TimerApp:
         self.root.title("Panda Pomodoro")
         self.root.resizable(False, False)
 
-        # 状态
-        self.total_seconds = 0
-        self.remaining = 0
-        self.running = False
-        self._tick_job = None
-        self._gif_job = None
-        self._end_popup = None
-
-        # 番茄参数
-        self.is_pomo=False; self.focus_minutes=25; self.short_break=5; self.long_break=15
-        self.cycles_before_long=4; self.current_cycle=0; self.phase="Idle"
-        self.auto_loop = tk.BooleanVar(value=True)
+        # 状态：计时 / 番茄钟状态机在 engine.TimerEngine，本类只做视图
+        # 定时回调都经 wakeup_counter 排程，统计待机唤醒次数
+        self.wake = wakeup_counter(root); self.anim = animation_clock(root)
+        self.engine = TimerEngine(self.wake.after, self.wake.cancel)
+        self.view = ViewDiffer(); self._display_secs = 30   # 视图差分：只下发变化的选项
+        self.engine.on("tick", self._on_tick)
+        self.engine.on("phase", self._set_phase)
+        self.engine.on("state", self._refresh_buttons)
+        self.engine.on("finished", self._on_finished)
+        # 会话历史：每段结束追加一条（history.py），空闲时落盘，退出时 close
+        self.history = HistoryLog(); self._history_job = None
+        self.stats = None; self._stats_win = None   # 统计：延后载入快照（stats.py），之后随每段增量更新
+        self.control = None   # 控制套接字：延后启动；状态变化推给订阅者
+        for ev in ("tick", "phase", "state"): self.engine.on(ev, lambda *_, ev=ev: self._publish(ev))
+        self.engine.on("session", self._on_session)
+        # 命名提醒：任意多个，共用一个 after()
+        self.timers = TimerRegistry(self.wake.after, self.wake.cancel, on_fire=self._on_timers_fired)
+        metrics.gauge("panda_idle_wakeups_per_minute", "Scheduled callbacks in the last minute", self.wake.wakeups_per_minute)
+        metrics.gauge("panda_animations_active", "Animations currently scheduled", lambda: self.anim.active)
+        metrics.gauge("panda_animation_frames_dropped", "GIF frames skipped because the loop was late", lambda: self.anim.dropped)
+        self._profile=None
+        self._gif_anim = None
+
+        self.auto_loop = tk.BooleanVar(value=self.engine.auto_loop)
+        self.auto_loop.trace_add("write", lambda *_: setattr(self.engine, "auto_loop", self.auto_loop.get()))
 
         # 顶部
         top = tk.Frame(root, padx=10, pady=8); top.pack(fill="x")
-        self.gif_label = tk.Label(top); self.gif_label.grid(row=0, column=0, rowspan=2, padx=(0,8))
-        if ENABLE_HEADER_GIF: self._load_embedded_gif(PANDA_GIF_B64)
-        else: self.gif_label.config(text="🐼", font=("Helvetica", 20))
+        self.gif_label = tk.Label(top, text="🐼", font=("Helvetica", 20))  # GIF 载入前/关闭时的占位
+        self.gif_label.grid(row=0, column=0, rowspan=2, padx=(0,8))
 
         tk.Label(top, text="Minutes").grid(row=0, column=1, sticky="e")
         self.entry_min = tk.Entry(top, width=5, justify="right"); self.entry_min.insert(0,"0")
@@ -227,16 +148,16 @@ class TimerApp:
         # 番茄设置
         pomo = tk.Frame(root, padx=10, pady=4); pomo.pack()
         tk.Label(pomo, text="Focus").grid(row=0, column=0, sticky="e")
-        self.e_focus = tk.Entry(pomo, width=4, justify="right"); self.e_focus.insert(0,str(self.focus_minutes))
+        self.e_focus = tk.Entry(pomo, width=4, justify="right"); self.e_focus.insert(0,str(self.engine.focus_minutes))
         self.e_focus.grid(row=0, column=1, padx=(4,10))
         tk.Label(pomo, text="Short").grid(row=0, column=2, sticky="e")
-        self.e_short = tk.Entry(pomo, width=4, justify="right"); self.e_short.insert(0,str(self.short_break))
+        self.e_short = tk.Entry(pomo, width=4, justify="right"); self.e_short.insert(0,str(self.engine.short_break))
         self.e_short.grid(row=0, column=3, padx=(4,10))
         tk.Label(pomo, text="Long").grid(row=0, column=4, sticky="e")
-        self.e_long = tk.Entry(pomo, width=4, justify="right"); self.e_long.insert(0,str(self.long_break))
+        self.e_long = tk.Entry(pomo, width=4, justify="right"); self.e_long.insert(0,str(self.engine.long_break))
         self.e_long.grid(row=0, column=5, padx=(4,10))
         tk.Label(pomo, text="Cycles").grid(row=0, column=6, sticky="e")
-        self.e_cycles = tk.Entry(pomo, width=4, justify="right"); self.e_cycles.insert(0,str(self.cycles_before_long))
+        self.e_cycles = tk.Entry(pomo, width=4, justify="right"); self.e_cycles.insert(0,str(self.engine.cycles_before_long))
         self.e_cycles.grid(row=0, column=7, padx=(4,10))
         tk.Checkbutton(pomo, text="Auto loop", variable=self.auto_loop).grid(row=0, column=8, padx=(0,8))
 
@@ -248,6 +169,19 @@ class TimerApp:
         self.btn_pomo_start.grid(row=0, column=0, padx=4)
         self.btn_pomo_skip.grid(row=0, column=1, padx=4)
         self.btn_pomo_stop.grid(row=0, column=2, padx=4)
+        tk.Button(pomo_btns, text="Stats", width=6, command=self._open_stats).grid(row=0, column=3, padx=4)
+
+        # 提醒（多个命名计时器）
+        rem = tk.Frame(root, padx=10, pady=4); rem.pack()
+        tk.Label(rem, text="Reminder").grid(row=0, column=0, sticky="e")
+        self.e_rem_name = tk.Entry(rem, width=10); self.e_rem_name.insert(0,"Tea")
+        self.e_rem_name.grid(row=0, column=1, padx=(4,10))
+        tk.Label(rem, text="Min").grid(row=0, column=2, sticky="e")
+        self.e_rem_min = tk.Entry(rem, width=4, justify="right"); self.e_rem_min.insert(0,"3")
+        self.e_rem_min.grid(row=0, column=3, padx=(4,10))
+        tk.Button(rem, text="Add", width=6, command=self._add_reminder).grid(row=0, column=4, padx=4)
+        tk.Button(rem, text="Clear", width=6, command=self.clear_timers).grid(row=0, column=5, padx=4)
+        self.rem_label = tk.Label(root, text="", font=("Helvetica",10)); self.rem_label.pack(pady=(0,6))
 
         # 快捷键：空格暂停/恢复；救援关闭弹窗（跨屏丢失时）
         root.bind("<space>", self._toggle_pause)
@@ -255,7 +189,7 @@ class TimerApp:
         root.bind("<Control-Shift-Escape>", self._rescue_close_popup)  # 其他
 
         # 托盘（可选）
-        self.tray=None; self._init_tray()
+        self.tray=None; self._tray_badge=None; self._tray_minutes=None
 
         # 关闭按钮
         self.root.protocol("WM_DELETE_WINDOW", self._on_close_to_tray)
@@ -263,28 +197,49 @@ class TimerApp:
         # 初始显示
         self._update_display(30)
 
+        # 非首屏必需的初始化：控制套接字（最先：第二次启动只重试几秒）、页眉 GIF、托盘、音频后端探测、
+        # 结束弹窗（建好隐藏）、统计快照（可能要从历史重建，放最后）
+        self._deferred = [self._start_control] \
+                         + ([lambda: self._load_embedded_gif(PANDA_GIF_B64)] if ENABLE_HEADER_GIF else []) \
+                         + [self._init_tray, AUDIO.prepare, lambda: end_gif_popup(self.root).prebuild(), self._ensure_stats]
+        self._deferred_started = False
+        if LAZY_STARTUP:
+            self.root.bind("<Map>", self._on_first_map, add="+")
+            self.root.after(1000, self._start_deferred)   # 收不到 <Map> 时的兜底
+        else: self._start_deferred()
+
+    # ====== 延后初始化：首帧后逐项空闲执行，每项之间让出事件循环 ======
+    def _on_first_map(self, e):
+        if e.widget is self.root: self._start_deferred()
+    def _start_deferred(self):
+        if self._deferred_started: return
+        self._deferred_started = True
+        if LAZY_STARTUP: self.root.after_idle(self._run_deferred)
+        else:
+            while self._deferred: self._run_deferred()
+    def _run_deferred(self):
+        if not self._deferred: return
+        task = self._deferred.pop(0)
+        try: task()
+        except Exception: traceback.print_exc()   # 一项失败不拦后面的，但要看得见（托盘/音频坏了不能悄无声息）
+        if LAZY_STARTUP and self._deferred: self.root.after(1, self._run_deferred)
+
     # ====== 顶部内嵌 GIF ======
     def _load_embedded_gif(self, b64string):
-        self.gif_frames, self.gif_index, self._gif_job = [], 0, None
-        def _try_load(data_bytes):
-            i=0
-            while True:
-                try:
-                    frm = tk.PhotoImage(data=data_bytes, format=f"gif -index {i}", master=self.root)
-                    self.gif_frames.append(frm); i+=1
-                except Exception: break
+        self.gif_frames, self._gif_anim = [], None
         data_bytes=None
         try: data_bytes=base64.b64decode(re.sub(r"\s+","",b64string))
         except Exception:
             if isinstance(b64string, bytes): data_bytes=b64string
-        if data_bytes: _try_load(data_bytes)
-        if self.gif_frames: self._animate_gif()
+        if data_bytes:  # 单遍切帧；预缩放帧走磁盘缓存
+            try: fs=load_gif_frames(data_bytes, self.root); self.gif_frames, self.gif_delays = fs.frames, fs.delays
+            except Exception: pass
+        if self.gif_frames: self._gif_anim = self.anim.add(self.gif_label, self.gif_frames, self.gif_delays)  # 收起时自动暂停
         else: self.gif_label.config(text="🐼", font=("Helvetica",20))
-    def _animate_gif(self):
-        if not self.gif_frames: return
-        self.gif_label.config(image=self.gif_frames[self.gif_index])
-        self.gif_index = (self.gif_index+1) % len(self.gif_frames)
-        self._gif_job = self.root.after(100, self._animate_gif)
+    def idle_report(self):
+        """待机统计：最近一分钟唤醒次数、在跑/已登记的动画数、累计换帧/跳帧数"""
+        return {"wakeups_per_min": self.wake.wakeups_per_minute(), "animations_active": self.anim.active,
+                "animations": len(self.anim), "frames_shown": self.anim.shown, "frames_dropped": self.anim.dropped}
 
     # ====== 基础计时 ======
     def _parse_input(self):
@@ -296,168 +251,270 @@ class TimerApp:
             return total
         except ValueError:
             messagebox.showerror("Invalid time","请输入有效时间（秒 0-59，总时长>0）。"); return None
+    # ====== 视图：期望状态 → 差分下发 ======
+    def _view_model(self):
+        """由引擎状态算出各控件应有的选项（纯计算，不碰 Tk）"""
+        m,s=divmod(max(0,int(self._display_secs)),60); run=self.running
+        on=lambda c: "normal" if c else "disabled"
+        if self.is_pomo: st=(on(False),on(run),on(False),on(not run),on(run),on(True))
+        else: st=(on(not run),on(run),on(self.remaining>0 or self.phase!="Idle"),on(True),on(False),on(False))
+        return [(self.time_label,{"text":f"{m:02d}:{s:02d}"}), (self.phase_label,{"text":self.phase}),
+                (self.btn_start,{"state":st[0]}), (self.btn_pause,{"state":st[1],"text":"Pause"}),
+                (self.btn_reset,{"state":st[2]}), (self.btn_pomo_start,{"state":st[3]}),
+                (self.btn_pomo_skip,{"state":st[4]}), (self.btn_pomo_stop,{"state":st[5]})]
+    def _render(self): self.view.apply(self._view_model())
+    def _on_tick(self, seconds):
+        with self.view.tick(): self._update_display(seconds)
     def _update_display(self, seconds):
-        m,s=divmod(max(0,int(seconds)),60); self.time_label.config(text=f"{m:02d}:{s:02d}")
-    def _set_phase(self,name): self.phase=name; self.phase_label.config(text=name)
+        self._display_secs=seconds; self._render(); self._update_tray_icon(seconds)
+    def _update_tray_icon(self, seconds=None):
+        """分钟数变化时才换托盘图标；不在计时则恢复原图标"""
+        if not (self.tray and self._tray_badge): return
+        mins = -(-max(0,int(self.remaining if seconds is None else seconds))//60) if self.running else None
+        if mins == self._tray_minutes: return
+        self._tray_minutes = mins
+        try: self.tray.icon = self._tray_badge.render(mins)
+        except Exception: pass
+    def _set_phase(self,name): self._render()
+
+    @property
+    def running(self): return self.engine.running
+    @property
+    def remaining(self): return self.engine.remaining
+    @property
+    def is_pomo(self): return self.engine.is_pomo
+    @property
+    def phase(self): return self.engine.phase
 
     def start(self):
-        if self.running and not self.is_pomo: return
-        if self.is_pomo: return
+        if self.is_pomo or self.running: return
+        total=None
         if self.remaining==0:
             total=self._parse_input()
             if total is None: return
-            self.total_seconds=total; self.remaining=total
-        self._set_phase("Manual"); self.running=True
-        self._schedule_tick(); self._refresh_buttons()
-    def pause(self):
-        if not self.running: return
-        self.running=False
-        if self._tick_job: self.root.after_cancel(self._tick_job); self._tick_job=None
-        self._refresh_buttons()
+        self.engine.start(total)
+    def pause(self): self.engine.pause()
     def reset(self):
-        self.running=False
-        if self._tick_job: self.root.after_cancel(self._tick_job); self._tick_job=None
-        self.is_pomo=False; self._set_phase("Idle"); self.remaining=0
+        self.engine.reset()
         try: total=int(self.entry_min.get() or 0)*60+int(self.entry_sec.get() or 0)
         except ValueError: total=0
-        self._update_display(total); self._refresh_buttons()
-
-    def _schedule_tick(self):
-        self._update_display(self.remaining)
-        if not self.running: return
-        if self.remaining<=0:
-            self.running=False; self._refresh_buttons()
-            self.time_label.config(text="00:00")
-            self._end_popup = show_end_gif_popup(self.root)
-            if self.sound_var.get(): _beep_fallback()
-            self._on_phase_finished(); return
-        self._tick_job = self.root.after(1000, self._tick)
-    def _tick(self): self.remaining-=1; self._schedule_tick()
+        self._update_display(total)
+
+    def _on_finished(self, phase, skipped):
+        t0 = time.perf_counter()
+        self._update_display(0)
+        show_end_gif_popup(self.root)
+        if not skipped: ALERT_DELAY.observe(self.engine.countdown.overdue + time.perf_counter() - t0)
+        if self.sound_var.get(): _beep_fallback()
+
+    def _on_session(self, rec):
+        try: self.history.append(rec)
+        except (OSError, TypeError, ValueError): return
+        if self.stats is not None: self.stats.add(rec); self._refresh_stats_view()
+        if self.control is not None: self.control.publish("session", rec)
+        if self._history_job is None: self._history_job = self.root.after_idle(self._flush_history)
+
+    def _flush_history(self):
+        self._history_job = None
+        try:
+            self.history.flush()
+            if self.stats is not None: save_stats(self.stats)
+            metrics.write_textfile()
+        except OSError: pass
+
+    # ------- 本地控制接口：asyncio 线程收命令，经 dispatcher 在 Tk 线程执行 -------
+    def _start_control(self):
+        if not CONTROL_SOCKET: return
+        try:
+            from controlserver import ControlServer
+            self.control = ControlServer(self._control_commands(), tk_dispatcher(self.root).call); self.control.start()
+        except (ControlError, OSError): self.control = None
+
+    def _control_commands(self):
+        cmds = engine_commands(self.engine)
+        def show(): self._show_window(); return self.engine.snapshot()
+        cmds["show"] = show
+        cmds["metrics"] = metrics.render
+        cmds["profile"] = lambda: {"profile": self._toggle_profile()}
+        return cmds
+
+    def run_commands(self, commands):
+        """主实例自己的命令行参数（instance.parse_args 的结果）"""
+        table = self._control_commands()
+        for cmd, args in commands:
+            try: table[cmd](**args)
+            except (ControlError, KeyError, TypeError, ValueError) as e: print(f"{cmd}: {e}", file=sys.stderr)
+
+    def _publish(self, event):
+        if self.control is not None: self.control.publish(event, self.engine.snapshot())
+
+    # ------- 统计面板：增量维护，打开不扫历史 -------
+    def _ensure_stats(self):
+        if self.stats is None:
+            try: self.history.flush(); self.stats, _ = load_stats(self.history.path)   # 先落盘，续读才不漏
+            except OSError: self.stats = ProductivityStats()
+        return self.stats
+
+    def _open_stats(self):
+        self._ensure_stats()
+        if self._stats_win is not None and self._stats_win.winfo_exists():
+            self._stats_win.deiconify(); self._stats_win.lift()
+        else:
+            self._stats_win = Toplevel(self.root); self._stats_win.title("Stats"); self._stats_win.resizable(False, False)
+            self._stats_label = tk.Label(self._stats_win, justify="left", font=("Menlo", 12), padx=12, pady=10)
+            self._stats_label.pack()
+        self._refresh_stats_view()
+
+    def _refresh_stats_view(self):
+        if self._stats_win is None or not self._stats_win.winfo_exists(): return
+        now = time.time()
+        self._stats_label.configure(text=format_dashboard(self.stats.dashboard(now), now))
 
     def _refresh_buttons(self):
-        if self.is_pomo:
-            self.btn_start.config(state="disabled")
-            self.btn_pause.config(state="normal" if self.running else "disabled", text="Pause")
-            self.btn_reset.config(state="disabled")
-            self.btn_pomo_start.config(state="disabled" if self.running else "normal")
-            self.btn_pomo_skip.config(state="normal" if self.running else "disabled")
-            self.btn_pomo_stop.config(state="normal")
-        else:
-            self.btn_start.config(state="disabled" if self.running else "normal")
-            self.btn_pause.config(state="normal" if self.running else "disabled")
-            self.btn_reset.config(state="normal" if self.remaining>0 or self.phase!="Idle" else "disabled")
-            self.btn_pomo_start.config(state="normal")
-            self.btn_pomo_skip.config(state="disabled")
-            self.btn_pomo_stop.config(state="disabled")
+        self._update_tray_icon(); self._render()
 
     def _toggle_pause(self,_=None):
         if self.running: self.pause()
-        else:
-            if self.is_pomo:
-                self.running=True; self._schedule_tick(); self._refresh_buttons()
-            else: self.start()
+        elif self.is_pomo: self.engine.resume()
+        else: self.start()
 
     # ====== 番茄钟 ======
-    def _apply_pomo_settings(self):
+    def _read_pomo_settings(self):
         try:
-            self.focus_minutes=max(1,int(self.e_focus.get()))
-            self.short_break  =max(1,int(self.e_short.get()))
-            self.long_break   =max(1,int(self.e_long.get()))
-            self.cycles_before_long=max(1,int(self.e_cycles.get()))
+            return (max(1,int(self.e_focus.get())), max(1,int(self.e_short.get())),
+                    max(1,int(self.e_long.get())), max(1,int(self.e_cycles.get())))
         except ValueError:
-            messagebox.showerror("Invalid Pomodoro","番茄钟参数请输入整数。"); return False
-        return True
+            messagebox.showerror("Invalid Pomodoro","番茄钟参数请输入整数。"); return None
     def start_pomodoro(self):
-        if not self._apply_pomo_settings(): return
-        self.is_pomo=True; self.current_cycle=0
-        self._start_focus(); self._refresh_buttons()
-    def stop_pomodoro(self):
-        self.is_pomo=False; self.pause(); self._set_phase("Idle"); self.remaining=0
-        self._update_display(0); self._refresh_buttons()
-    def skip_phase(self): self.remaining=0; self._schedule_tick()
-    def _start_focus(self): self._set_phase("Focus"); self.remaining=self.focus_minutes*60; self.running=True; self._schedule_tick()
-    def _start_short_break(self): self._set_phase("ShortBreak"); self.remaining=self.short_break*60; self.running=True; self._schedule_tick()
-    def _start_long_break(self): self._set_phase("LongBreak"); self.remaining=self.long_break*60; self.running=True; self._schedule_tick()
-    def _on_phase_finished(self):
-        if not self.is_pomo: return
-        if self.phase=="Focus":
-            self.current_cycle+=1
-            if self.current_cycle % self.cycles_before_long==0: self._start_long_break()
-            else: self._start_short_break()
-        elif self.phase in ("ShortBreak","LongBreak"):
-            if self.auto_loop.get(): self._start_focus()
-            else: self.running=False; self._set_phase("Idle"); self._refresh_buttons()
+        settings=self._read_pomo_settings()
+        if settings is not None: self.engine.start_pomodoro(*settings)
+    def stop_pomodoro(self): self.engine.stop_pomodoro()
+    def skip_phase(self): self.engine.skip_phase()
+
+    # ====== 提醒（命名计时器）======
+    def add_timer(self, name, seconds):
+        tid=self.timers.add(name or "Timer", seconds); self._refresh_reminders(); return tid
+    def cancel_timer(self, tid):
+        ok=self.timers.cancel(tid); self._refresh_reminders(); return ok
+    def clear_timers(self): self.timers.clear(); self._refresh_reminders()
+    def _add_reminder(self):
+        try:
+            mins=float(self.e_rem_min.get())
+            if mins<=0: raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid reminder","提醒时长请输入大于 0 的分钟数。"); return
+        self.add_timer(self.e_rem_name.get().strip(), mins*60)
+    def _on_timers_fired(self, fired):
+        self._refresh_reminders()
+        names=", ".join(t.name for t in fired[:3])
+        if len(fired)>3: names+=f" (+{len(fired)-3})"
+        show_end_gif_popup(self.root, title=f"Time's up: {names}")
+        if self.sound_var.get(): _beep_fallback()
+    def _refresh_reminders(self):
+        t=self.timers.next_timer()
+        if t is None:
+            self.view.set(self.rem_label, text=f"{len(self.timers)} reminder(s) paused" if len(self.timers) else ""); return
+        at=time.strftime("%H:%M:%S", time.localtime(time.time()+self.timers.remaining(t.id)))
+        self.view.set(self.rem_label, text=f"{len(self.timers)} reminder(s) · next: {t.name} @ {at}")
 
     # ====== 托盘（可选）======
     def _init_tray(self):
         if not ENABLE_TRAY: self.tray=None; return
+        with TRAY_INIT.time(): self._start_tray()
+    def _start_tray(self):
         try:
             import pystray
-            from PIL import Image
-            if not os.path.exists(TRAY_ICON_PATH): self.tray=None; return
-            img = Image.open(TRAY_ICON_PATH).convert("RGBA")
-            def on_show(icon,item=None): self.root.after(0,self._show_window)
-            def on_hide(icon,item=None): self.root.after(0,self._hide_window)
-            def on_start_pomo(icon,item=None): self.root.after(0,self.start_pomodoro)
-            def on_pause_resume(icon,item=None): self.root.after(0,(self.pause if self.running else self._toggle_pause))
-            def on_stop(icon,item=None): self.root.after(0,self.stop_pomodoro)
-            def on_quit(icon,item=None): self.root.after(0,self._quit_all)
+            img = load_tray_icon(TRAY_ICON_PATH)   # 缓存里的小尺寸图标；首次启动才解码原图
+            if img is None: self.tray=None; return
+            self._tray_badge = TrayBadge(img) if TRAY_SHOW_MINUTES else None
+            # pystray 回调（Linux/Windows 在托盘线程）只排进调度器，按点击顺序到 Tk 线程执行，不在回调里读 self.running
+            post=tk_dispatcher(self.root).post
+            def action(fn): return lambda icon,item=None: post(fn)
             menu = pystray.Menu(
-                pystray.MenuItem("Show Window", on_show),
-                pystray.MenuItem("Hide Window", on_hide),
-                pystray.MenuItem("Start Pomodoro", on_start_pomo),
-                pystray.MenuItem("Pause/Resume", on_pause_resume),
-                pystray.MenuItem("Stop Pomodoro", on_stop),
+                pystray.MenuItem("Show Window", action(self._show_window)),
+                pystray.MenuItem("Hide Window", action(self._hide_window)),
+                pystray.MenuItem("Start Pomodoro", action(self.start_pomodoro)),
+                pystray.MenuItem("Pause/Resume", action(self._toggle_pause)),
+                pystray.MenuItem("Stop Pomodoro", action(self.stop_pomodoro)),
+                pystray.MenuItem("Stats", action(self._open_stats)),
+                pystray.MenuItem(f"Profile {PROFILE_SECONDS}s", action(self._toggle_profile)),
                 pystray.Menu.SEPARATOR,
-                pystray.MenuItem("Quit", on_quit)
+                pystray.MenuItem("Quit", action(self._quit_all))
             )
             self.tray = pystray.Icon("PandaPomodoro", img, "Panda Pomodoro", menu)
-            if platform.system()=="Darwin": self.tray.run_detached()
+            if platform.system()=="Darwin":
+                # macOS：托盘与 Tk 共用主线程的 NSApplication。run_detached 默认在 setup 线程里设 visible（跨线程碰 AppKit），
+                # 改为排回主线程；退出时也不能 tray.stop()——它会 NSApp.stop_ 连 Tk 的事件循环一起停掉，见 _quit_all
+                self.tray.run_detached(setup=lambda icon: post(setattr, icon, "visible", True))
             else: threading.Thread(target=self.tray.run, daemon=True).start()
         except Exception:
             self.tray=None
 
     # ====== 帮助方法 / 退出清理 ======
+    # ====== 剖析：cProfile 采样 Tk 线程 PROFILE_SECONDS 秒；再触发一次提前结束。返回 "started" 或结果路径 ======
+    def _toggle_profile(self):
+        if self._profile is None:
+            self._profile=(metrics.Profile().start(), self.root.after(PROFILE_SECONDS*1000,self._toggle_profile)); return "started"
+        prof, job = self._profile; self._profile=None
+        try: self.root.after_cancel(job)
+        except Exception: pass
+        try: path=prof.stop()
+        except OSError as e: path=f"failed: {e}"
+        print(f"profile: {path}", file=sys.stderr)
+        try:
+            if self.tray: self.tray.notify(f"Profile saved: {path}", "Panda Pomodoro")
+        except Exception: pass
+        return path
     def _show_window(self): self.root.deiconify(); self.root.after(50,self.root.lift)
     def _hide_window(self): self.root.withdraw()
     def _on_close_to_tray(self):
         if self.tray: self._hide_window()
         else: self._quit_all()
-    def _rescue_close_popup(self,_=None):
-        ep=getattr(self,"_end_popup",None)
-        if ep and ep.winfo_exists():
-            try:
-                if getattr(ep,"_anim_job",None): ep.after_cancel(ep._anim_job)
-            except Exception: pass
-            try: ep.destroy()
-            except Exception: pass
-
+    def _rescue_close_popup(self,_=None): end_gif_popup(self.root).destroy()   # 跨屏丢失：销毁，下次提醒重建并重新居中
     def _quit_all(self):
         try:
-            if self.tray: self.tray.stop()
-        except Exception: pass
-        try: AUDIO.stop()
+            if self.tray:
+                if platform.system()=="Darwin": self.tray.visible=False   # 只移除状态栏图标；Tk 自己退出事件循环
+                else: self.tray.stop()
         except Exception: pass
         try:
-            if getattr(self,"_gif_job",None): self.root.after_cancel(self._gif_job)
+            if self.control: self.control.stop()
         except Exception: pass
-        try:
-            if getattr(self,"_tick_job",None): self.root.after_cancel(self._tick_job)
+        try: AUDIO.stop(); AUDIO.close()
         except Exception: pass
         try:
-            ep=getattr(self,"_end_popup",None)
-            if ep and ep.winfo_exists():
-                try:
-                    if getattr(ep,"_anim_job",None): ep.after_cancel(ep._anim_job)
-                except Exception: pass
-                try: ep.destroy()
-                except Exception: pass
+            self.history.close()
+            if self.stats is not None: save_stats(self.stats)
+            metrics.write_textfile()
+        except OSError: pass
+        try:
+            if self._gif_anim: self._gif_anim.stop()
+        except Exception: pass
+        try: self.engine.pause()
+        except Exception: pass
+        try: self.timers.clear()
+        except Exception: pass
+        try: end_gif_popup(self.root).destroy()
         except Exception: pass
         try: self.root.destroy()
         except Exception: pass
 
 # ========= 入口 =========
+def _startup_probe(root, app):
+    """PANDA_POMODORO_STARTUP_PROBE=1：首次绘制时往 stderr 打一行后退出（bench.py 测首帧用）"""
+    def on_expose(e):
+        if e.widget is not root: return
+        print(f"first-paint {(time.perf_counter() - _T0) * 1e3:.1f}", file=sys.stderr, flush=True)
+        # 只摘掉自己这一条：unbind(seq, funcid) 在 Python 3.13 之前会把 <Expose> 上的绑定全清掉
+        rest = "\n".join(l for l in root.bind("<Expose>").split("\n") if funcid not in l)
+        root.tk.call("bind", root._w, "<Expose>", rest)
+        root.deletecommand(funcid)
+        root.after(300, app._quit_all)
+    funcid = root.bind("<Expose>", on_expose, add="+")
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = TimerApp(root)
+    app.run_commands(_ARGV_COMMANDS)
+    if os.environ.get("PANDA_POMODORO_STARTUP_PROBE"): _startup_probe(root, app)
     root.mainloop()
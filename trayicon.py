@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# ========== 托盘图标：按平台尺寸预缩放并缓存，动态“剩余分钟”角标 ==========
+# tray.png 原图 2000×2000，每次启动整张解码再交给 pystray 既慢又占内存；托盘只需要 16–64px。
+# 首次启动解码一次，把本平台可能用到的尺寸都缩好存成小 PNG（按原图路径 + mtime + 大小命名，不读原图内容），
+# 之后只读需要的那一张。非正方形原图按比例缩进正方形、四周留透明边，不拉伸。
+# PIL 为可选依赖：这里不在模块级导入，缺失时 load_tray_icon 返回 None，调用方按“无托盘”处理。
+import os, io, sys, hashlib
+from collections import OrderedDict
+
+from userdirs import user_cache_dir, atomic_write, evict_lru
+
+# 各平台托盘常见尺寸（含高 DPI）；第一项之外的尺寸随首次解码一起生成，换 DPI 时直接命中缓存
+TRAY_SIZES = {
+    "darwin": (44, 22, 36),           # 菜单栏 22pt，Retina 下 44px
+    "win32":  (32, 16, 20, 24, 48),   # pystray 按 SM_CXSMICON 取，100%–200% 缩放
+    "linux":  (48, 22, 24, 32, 64),   # 各面板实现不一，48 缩到 22–32 仍清晰
+}
+TRAY_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+def _platform_key():
+    if sys.platform == "darwin": return "darwin"
+    if sys.platform.startswith("win"): return "win32"
+    return "linux"
+
+def tray_icon_size():
+    """本平台应加载的图标边长（px）；环境变量 PANDA_POMODORO_TRAY_PX 可覆盖"""
+    try: return int(os.environ["PANDA_POMODORO_TRAY_PX"])
+    except (KeyError, ValueError): return TRAY_SIZES[_platform_key()][0]
+
+def _lanczos(Image):
+    return getattr(Image, "Resampling", Image).LANCZOS
+
+def _source_key(src_path):
+    """(st_mtime_ns, st_size) + 路径的短摘要：只 stat 不读 2000px 原图；原图被替换时 mtime/大小随之变化"""
+    st = os.stat(src_path)
+    ident = f"{os.path.abspath(src_path)}\0{st.st_mtime_ns}\0{st.st_size}"
+    return hashlib.sha1(ident.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+
+def _variant_path(digest, px):
+    return os.path.join(user_cache_dir("tray"), f"{digest}-{px}.png")
+
+def _fit_square(src, px, Image):
+    """按比例缩到长边 = px，居中贴到透明的 px×px 画布上"""
+    w, h = src.size
+    scale = px / max(w, h)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    # 大图先 reduce 到目标的几倍再 LANCZOS，比直接从 2000px 重采样快得多
+    small = src.resize(size, _lanczos(Image), reducing_gap=3.0)
+    if size == (px, px): return small
+    out = Image.new("RGBA", (px, px), (0, 0, 0, 0))
+    out.paste(small, ((px - size[0]) // 2, (px - size[1]) // 2))
+    return out
+
+def _build_variants(src_path, digest, sizes):
+    """整张原图只解码一次，缩出全部尺寸写入缓存；返回 {px: Image}"""
+    from PIL import Image
+    with Image.open(src_path) as im:
+        src = im.convert("RGBA")
+    out = {}
+    for px in sorted(set(sizes), reverse=True):
+        small = _fit_square(src, px, Image)
+        buf = io.BytesIO(); small.save(buf, format="PNG", optimize=True)
+        try: atomic_write(_variant_path(digest, px), buf.getvalue())
+        except OSError: pass
+        out[px] = small
+    del src
+    evict_lru(user_cache_dir("tray"), TRAY_CACHE_MAX_BYTES,
+              keep={os.path.basename(_variant_path(digest, px)) for px in sizes})
+    return out
+
+def load_tray_icon(src_path, px=None):
+    """
+    返回 px×px 的 RGBA PIL.Image（默认 tray_icon_size()）；源文件不存在或没有 PIL 时返回 None。
+    命中缓存时只读一张几 KB 的 PNG，不解码原图。
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    if not src_path or not os.path.exists(src_path): return None
+    px = px or tray_icon_size()
+    digest = _source_key(src_path)
+    path = _variant_path(digest, px)
+    try:
+        with Image.open(path) as im:
+            img = im.convert("RGBA")
+        if img.size == (px, px):
+            try: os.utime(path)  # LRU：命中即更新 mtime
+            except OSError: pass
+            return img
+    except (OSError, ValueError):
+        pass
+    sizes = TRAY_SIZES[_platform_key()]
+    return _build_variants(src_path, digest, sizes + (px,) if px not in sizes else sizes)[px]
+
+# ---------- 动态角标：数字字形只渲染一次，组合结果按文本缓存 ----------
+_BADGE_FONTS = ("DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf", "Helvetica.ttc", "DejaVuSans.ttf")
+
+def _badge_font(px):
+    from PIL import ImageFont
+    for name in _BADGE_FONTS:
+        try: return ImageFont.truetype(name, px)
+        except OSError: continue
+    try: return ImageFont.load_default(size=px)   # Pillow ≥ 10.1
+    except TypeError: return ImageFont.load_default()
+
+class TrayBadge:
+    """
+    在基础图标右下角叠加剩余分钟数。
+    - 字形缓存：0–9 和 '+' 各渲染成一张 L 模式遮罩，之后只做 paste，不再调用字体光栅化
+    - 结果缓存：按显示文本 LRU 缓存整张图标；倒计时每分钟才换一次文本，且同一时长反复出现
+    render() 返回的 Image 不要就地修改（可能被缓存复用）。
+    """
+    GLYPHS = "0123456789+"
+
+    def __init__(self, base, fg=(255, 255, 255, 255), bg=(214, 48, 49, 255), max_cached=64):
+        from PIL import Image, ImageDraw
+        self.base, self.fg, self.bg = base, fg, bg
+        self.max_cached = max_cached
+        self._icons = OrderedDict()
+        s = base.size[0]
+        self._pad = max(1, s // 16)
+        font = _badge_font(max(7, s // 2))
+        # 统一行高：以 '0' 的包围盒为准，所有字形放进同样高的遮罩
+        _, top, _, bottom = font.getbbox("0")
+        self._gh = bottom - top
+        self._glyphs = {}
+        for ch in self.GLYPHS:
+            l, _, r, _ = font.getbbox(ch)
+            mask = Image.new("L", (max(1, r - l), self._gh), 0)
+            ImageDraw.Draw(mask).text((-l, -top), ch, fill=255, font=font)
+            self._glyphs[ch] = mask
+
+    def _text_width(self, text):
+        return sum(self._glyphs[c].size[0] for c in text) + max(0, len(text) - 1)
+
+    def _fit(self, minutes):
+        s = self.base.size[0]
+        for text in (str(minutes), "99+", "9+", "+"):
+            if self._text_width(text) + 2 * self._pad <= s: return text
+        return "+"
+
+    def render(self, minutes):
+        """minutes 为 None 时返回基础图标"""
+        if minutes is None: return self.base
+        text = self._fit(max(0, int(minutes)))
+        img = self._icons.get(text)
+        if img is not None:
+            self._icons.move_to_end(text)
+            return img
+        from PIL import ImageDraw
+        s, pad = self.base.size[0], self._pad
+        tw = self._text_width(text)
+        x0, y0 = s - tw - 2 * pad, s - self._gh - 2 * pad
+        img = self.base.copy()
+        draw = ImageDraw.Draw(img)
+        try: draw.rounded_rectangle((x0, y0, s - 1, s - 1), radius=max(1, pad * 2), fill=self.bg)
+        except AttributeError: draw.rectangle((x0, y0, s - 1, s - 1), fill=self.bg)  # Pillow < 8.2
+        x = x0 + pad
+        for ch in text:
+            g = self._glyphs[ch]
+            img.paste(self.fg, (x, y0 + pad), g)
+            x += g.size[0] + 1
+        self._icons[text] = img
+        if len(self._icons) > self.max_cached: self._icons.popitem(last=False)
+        return img
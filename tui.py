@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ========== 终端前端：SSH / 服务器上用同一个 TimerEngine，不依赖 tkinter ==========
+# 一行状态：MM:SS + 阶段 + 运行状态；每秒只把变了的字符（通常 1–2 个）用光标移动改写，不整行重画。
+# 按键非阻塞（cbreak + select）：空格 暂停/继续（同 Tk 的 <space>），s 跳过，p 开始/停止番茄钟，r 重置，q 退出。
+# 到点：终端响铃（audio.beep_fallback，经 SSH 也会传到本地终端）+ 行尾提示。
+# 空闲近零 CPU：只在显示秒变化（Countdown 按秒边界排程）和按键时醒；暂停/空闲时一直阻塞在 select 里。
+# stdout 不是终端（重定向到文件/日志）时不输出转义序列，只在阶段/状态变化时打一整行。
+#   python tui.py --start 10m        python tui.py --pomodoro 25 5 15 4
+import os, sys, signal, unicodedata
+
+from engine import TimerEngine, SelectLoop
+from control import ControlError, engine_commands
+from audio import beep_fallback
+from instance import parse_args
+
+HIDE_CURSOR, SHOW_CURSOR, CLEAR_EOL = "\x1b[?25l", "\x1b[?25h", "\x1b[K"
+KEYS_HINT = "[space] pause/resume  [s] skip  [p] pomodoro start/stop  [r] reset  [q] quit"
+
+# ---------- 行内差分 ----------
+def _move(col, to):
+    """光标从 col 列移到 to 列的最短序列"""
+    if to == col: return ""
+    if to > col: return f"\x1b[{to - col}C"
+    back = f"\x1b[{col - to}D"
+    home = "\r" + (f"\x1b[{to}C" if to else "")
+    return back if len(back) <= len(home) else home
+
+def _cells(s):
+    """拆成显示单元（基字符 + 其后的组合符）及各自起始列，末尾再加总宽：宽字符/全角占 2 列"""
+    units, cols, c = [], [], 0
+    for ch in s:
+        if units and unicodedata.combining(ch):
+            units[-1] += ch; continue
+        units.append(ch); cols.append(c)
+        c += 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+    cols.append(c)
+    return units, cols
+
+def line_diff(old, new, col):
+    """
+    把终端当前行从 old 改成 new 的输出串；col 为光标当前列。返回 (输出串, 输出后的光标列)。
+    相隔不到 4 个字符的改动合并成一段直接重写（一次光标移动本身就要 3–5 字节）。
+    列按显示宽度算（中文等宽字符占 2 列）：同一个字符（连同组合符）落在同一列才算没变。
+    """
+    (old, oc), (new, nc) = _cells(old), _cells(new)
+    same = lambda i: i < len(old) and old[i] == new[i] and oc[i] == nc[i]
+    runs, i = [], 0
+    while i < len(new):
+        if same(i):
+            i += 1; continue
+        j = i
+        while j < len(new) and not same(j): j += 1
+        if runs and i - runs[-1][1] < 4: runs[-1][1] = j
+        else: runs.append([i, j])
+        i = j
+    out = []
+    for a, b in runs:
+        out.append(_move(col, nc[a])); out.extend(new[a:b]); col = nc[b]
+    if nc[-1] < oc[-1]:
+        out.append(_move(col, nc[-1])); out.append(CLEAR_EOL); col = nc[-1]
+    return "".join(out), col
+
+class LineRenderer:
+    """终端上当前这一行的内容；render() 只写差异。bytes_out / renders 用于统计"""
+    def __init__(self, out):
+        self.out, self.shown, self.col = out, "", 0
+        self.bytes_out = self.renders = 0
+
+    def render(self, text, key=None):
+        seq, self.col = line_diff(self.shown, text, self.col)
+        self.shown = text
+        self.renders += 1
+        if seq:
+            self.out.write(seq); self.out.flush()
+            self.bytes_out += len(seq.encode("utf-8"))
+
+    def close(self):
+        self.out.write("\n" + SHOW_CURSOR); self.out.flush()
+
+class PlainRenderer(LineRenderer):
+    """非终端输出：key（不含秒数的部分）变化时才打一整行"""
+    def __init__(self, out):
+        super().__init__(out)
+        self._key = None
+
+    def render(self, text, key=None):
+        self.renders += 1
+        if key == self._key: return
+        self._key = key
+        line = text.strip() + "\n"
+        self.out.write(line); self.out.flush()
+        self.bytes_out += len(line.encode("utf-8"))
+
+    def close(self): pass
+
+# ---------- 前端 ----------
+class TerminalApp:
+    NOTICE_MS = 10000
+
+    def __init__(self, loop, out=None, tty=True, bell=beep_fallback):
+        self.loop, self.bell = loop, bell
+        self.out = out or sys.stdout
+        self.renderer = (LineRenderer if tty else PlainRenderer)(self.out)
+        self.engine = TimerEngine(loop.after, loop.cancel, clock=loop.clock)
+        self.commands = engine_commands(self.engine)
+        self.commands["show"] = self.engine.snapshot        # 与 Tk 版命令行参数通用；终端里没有窗口可叫
+        self._secs, self.notice, self._notice_job = 0, "", None
+        self.live = False             # run_commands 期间的中间状态不画，show() 之后才开始输出
+        self.tty = tty
+        self.engine.on("tick", self._on_tick)
+        self.engine.on("phase", lambda name: self._render())
+        self.engine.on("state", self._render)
+        self.engine.on("finished", self._on_finished)
+
+    def run_commands(self, commands):
+        for cmd, args in commands:
+            try: self.commands[cmd](**args)
+            except (ControlError, KeyError, TypeError, ValueError) as e: print(f"{cmd}: {e}", file=sys.stderr)
+
+    # ---- 视图 ----
+    def _line(self):
+        """(整行文本, 不含秒数的 key)：同 Tk 版 _update_display 的 MM:SS + 阶段名"""
+        e = self.engine
+        m, s = divmod(max(0, int(self._secs)), 60)
+        state = "running" if e.running else ("paused" if e.remaining > 0 else "")
+        cycle = f"cycle {e.current_cycle % e.cycles_before_long + 1}/{e.cycles_before_long}" if e.is_pomo else ""
+        rest = f"{e.phase:<10} {state:<7} {cycle:<9} {self.notice}"
+        return f" {m:02d}:{s:02d}  {rest}", rest
+
+    def show(self):
+        self.live = True
+        self._render()
+
+    def _render(self):
+        if not self.live: return
+        text, key = self._line()
+        self.renderer.render(text.rstrip(), key.rstrip())
+
+    def _on_tick(self, secs):
+        self._secs = secs
+        self._render()
+
+    def _on_finished(self, phase, skipped):
+        if not self.tty:              # 输出被重定向：不往日志里写响铃，也不用定时清提示
+            self.notice = f"{phase} {'skipped' if skipped else 'done'}"
+            self._render(); self.notice = ""
+            return
+        self.bell()
+        self._set_notice(f"{phase} {'skipped' if skipped else 'done'}")
+
+    def _set_notice(self, text):
+        self.notice = text
+        if self._notice_job is not None: self.loop.cancel(self._notice_job)
+        self._notice_job = self.loop.after(self.NOTICE_MS, self._clear_notice) if text else None
+        self._render()
+
+    def _clear_notice(self):
+        self._notice_job = None
+        self.notice = ""
+        self._render()
+
+    # ---- 输入 ----
+    def on_key(self, ch):
+        e = self.engine
+        if ch == " ":
+            if e.running: e.pause()
+            else: e.resume()
+        elif ch in "sS":
+            if e.is_pomo: e.skip_phase()
+        elif ch in "pP":
+            if e.is_pomo: e.stop_pomodoro()
+            else: e.start_pomodoro()
+        elif ch in "rR": e.reset()
+        elif ch in "qQ\x04": self.loop.stop()
+
+# ---------- 终端模式与按键源 ----------
+def _attach_keys(app, loop, stdin):
+    """把按键接到循环上；返回退出时的恢复函数"""
+    try: fd = stdin.fileno()
+    except (AttributeError, ValueError, OSError): return lambda: None
+    if not os.isatty(fd): return lambda: None
+    if sys.platform.startswith("win"):
+        # Windows 控制台不能 select：退而每 100ms 看一次 kbhit（只在这个平台轮询）
+        import msvcrt
+        def poll():
+            while msvcrt.kbhit(): app.on_key(msvcrt.getwch())
+            loop.after(100, poll)
+        loop.after(100, poll)
+        return lambda: None
+    import termios, tty
+    saved = termios.tcgetattr(fd)
+    tty.setcbreak(fd)
+    def on_readable():
+        data = os.read(fd, 64)
+        if not data: loop.remove_reader(fd); return
+        for ch in data.decode("utf-8", "ignore"): app.on_key(ch)
+    loop.add_reader(fd, on_readable)
+    return lambda: termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+def main(argv=None):
+    commands = parse_args(sys.argv[1:] if argv is None else argv, prog="tui.py")
+    loop = SelectLoop()
+    tty = sys.stdout.isatty()
+    app = TerminalApp(loop, tty=tty)
+    restore = _attach_keys(app, loop, sys.stdin)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if tty: sys.stdout.write(KEYS_HINT + "\n" + HIDE_CURSOR); sys.stdout.flush()
+        app.run_commands(commands)
+        app.show()
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        restore()
+        app.renderer.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# ========== 用户缓存/数据目录 & 原子写 / 容量淘汰（源码运行与 PyInstaller 打包共用） ==========
+# 缓存一律放在用户目录而非 resource_path（打包后 _MEIPASS 是每次启动新建的临时目录）
+import os, sys, time
+# shutil / tempfile 在用到的函数里再导入：单实例转发路径（instance.py）只需要目录函数，省下十来毫秒启动
+
+APP_NAME = "PandaPomodoro"
+
+def user_cache_dir(*sub):
+    """
+    macOS:   ~/Library/Caches/PandaPomodoro
+    Windows: %LOCALAPPDATA%\\PandaPomodoro\\Cache
+    其他:    $XDG_CACHE_HOME/PandaPomodoro（默认 ~/.cache）
+    环境变量 PANDA_POMODORO_CACHE 可整体覆盖；目录不存在时自动创建
+    """
+    base = os.environ.get("PANDA_POMODORO_CACHE")
+    if not base:
+        home = os.path.expanduser("~")
+        if sys.platform == "darwin":
+            base = os.path.join(home, "Library", "Caches", APP_NAME)
+        elif sys.platform.startswith("win"):
+            base = os.path.join(os.environ.get("LOCALAPPDATA") or home, APP_NAME, "Cache")
+        else:
+            base = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache"), APP_NAME)
+    path = os.path.join(base, *sub)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def user_data_dir(*sub):
+    """
+    需要长期保留、不能随缓存清掉的数据（会话历史等）：
+    macOS:   ~/Library/Application Support/PandaPomodoro
+    Windows: %APPDATA%\\PandaPomodoro
+    其他:    $XDG_DATA_HOME/PandaPomodoro（默认 ~/.local/share）
+    环境变量 PANDA_POMODORO_DATA 可整体覆盖；目录不存在时自动创建
+    """
+    base = os.environ.get("PANDA_POMODORO_DATA")
+    if not base:
+        home = os.path.expanduser("~")
+        if sys.platform == "darwin":
+            base = os.path.join(home, "Library", "Application Support", APP_NAME)
+        elif sys.platform.startswith("win"):
+            base = os.path.join(os.environ.get("APPDATA") or home, APP_NAME)
+        else:
+            base = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share"), APP_NAME)
+    path = os.path.join(base, *sub)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def user_runtime_dir(*sub):
+    """
+    运行期的套接字/锁文件：$XDG_RUNTIME_DIR/PandaPomodoro（Linux 会话级 tmpfs），
+    没有时退回 user_cache_dir("run")。目录权限 0700，只有本用户能连进来。
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    path = os.path.join(base, APP_NAME, *sub) if base and os.path.isdir(base) else user_cache_dir("run", *sub)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    try: os.chmod(path, 0o700)
+    except OSError: pass
+    return path
+
+def atomic_write(path, data):
+    """
+    先写同目录临时文件再 os.replace，崩溃时只会留下旧文件或完整新文件。
+    replace 前 fsync 文件（否则断电后可能是改名成功、内容为空）；POSIX 上再 fsync 目录，让改名本身落盘。
+    """
+    import tempfile
+    d = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=d)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+    _fsync_dir(d)
+
+def _fsync_dir(d):
+    """Windows 不能打开目录做 fsync（NTFS 的改名本身有日志），直接跳过；文件系统不支持时也不算失败"""
+    if os.name != "posix": return
+    try: dfd = os.open(d or ".", os.O_RDONLY)
+    except OSError: return
+    try: os.fsync(dfd)
+    except OSError: pass
+    finally: os.close(dfd)
+
+def entry_size(path):
+    if os.path.isfile(path): return os.path.getsize(path)
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError: pass
+    return total
+
+def evict_lru(root, max_bytes, keep=()):
+    """
+    按条目（文件或子目录）mtime 从旧到新删除，直到总大小 ≤ max_bytes；keep 中的条目不删。
+    顺带清理崩溃遗留、超过 1 小时的 .tmp-* 半成品。
+    """
+    import shutil
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    entries, stale = [], time.time() - 3600
+    for name in names:
+        p = os.path.join(root, name)
+        if name.startswith(".tmp-"):
+            try:
+                if os.path.getmtime(p) < stale:
+                    if os.path.isdir(p): shutil.rmtree(p, ignore_errors=True)
+                    else: os.unlink(p)
+            except OSError: pass
+            continue
+        try: entries.append((os.path.getmtime(p), entry_size(p), p))
+        except OSError: pass
+    total = sum(e[1] for e in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes: break
+        if os.path.basename(p) in keep: continue
+        if os.path.isdir(p): shutil.rmtree(p, ignore_errors=True)
+        else:
+            try: os.unlink(p)
+            except OSError: continue
+        total -= size
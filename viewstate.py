@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# ========== 视图状态差分：算出控件“应该是什么样”，只把变了的选项下发给 Tk ==========
+# 以前每个 tick 都重配 time_label，每次状态变化把 6 个按钮和 phase_label 全部 config 一遍，
+# 每次都是一趟 Tcl 往返 + 重绘。ViewDiffer 记住每个控件最后下发的选项值，相同就跳过；
+# tick() 上下文统计每个 tick 实际发出的 configure 次数，稳态下应当只有 1 次（时间标签）。
+from collections import deque
+from contextlib import contextmanager
+
+_MISSING = object()
+
+class ViewDiffer:
+    def __init__(self, window=512):
+        self._last = {}                      # widget -> {选项: 最后下发的值}
+        self.calls = 0                       # 实际发出的 configure 次数
+        self.skipped = 0                     # 因无变化省掉的选项数
+        self._per_tick = deque(maxlen=window)
+
+    def set(self, widget, **opts):
+        """只下发与上次不同的选项；全都没变则不碰 Tk"""
+        last = self._last.get(widget)
+        if last is None: last = self._last[widget] = {}
+        diff = {k: v for k, v in opts.items() if last.get(k, _MISSING) != v}
+        self.skipped += len(opts) - len(diff)
+        if not diff: return False
+        widget.configure(**diff)
+        last.update(diff)
+        self.calls += 1
+        return True
+
+    def apply(self, model):
+        """model：[(widget, {选项: 值}), ...]，通常由 TimerApp._view_model() 给出"""
+        for widget, opts in model: self.set(widget, **opts)
+
+    def forget(self, widget=None):
+        """控件被外部改过或已销毁时丢掉记录（None=全部），下次 set 会完整下发"""
+        if widget is None: self._last.clear()
+        else: self._last.pop(widget, None)
+
+    @contextmanager
+    def tick(self):
+        """包住一次 tick 的处理，记录其间发出的 configure 次数"""
+        start = self.calls
+        try: yield
+        finally: self._per_tick.append(self.calls - start)
+
+    def tick_stats(self):
+        v = sorted(self._per_tick)
+        return {"ticks": len(v), "tk_calls_per_tick_p50": v[len(v) // 2] if v else None,
+                "tk_calls_per_tick_max": v[-1] if v else None,
+                "tk_calls_per_tick_mean": sum(v) / len(v) if v else None,
+                "tk_calls_total": self.calls, "tk_calls_skipped": self.skipped}
+
+    def reset_stats(self):
+        self.calls = self.skipped = 0
+        self._per_tick.clear()